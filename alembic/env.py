@@ -5,6 +5,7 @@ from defi_common.database import db
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
+from src.database import models  # noqa
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,44 @@
+"""add address snapshots
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-19 09:12:41.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2a9d7b10"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "address_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("time_created", sa.DateTime(), nullable=True),
+        sa.Column("time_updated", sa.DateTime(), nullable=True),
+        sa.Column("timestamp", sa.BigInteger(), nullable=False),
+        sa.Column("time", sa.DateTime(), nullable=False),
+        sa.Column("value_usd", sa.Float(), nullable=False),
+        sa.Column("is_keyframe", sa.Boolean(), nullable=False),
+        sa.Column("address_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["address_id"], ["address.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_address_snapshots_address_timestamp",
+        "address_snapshots",
+        ["address_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_address_snapshots_address_timestamp", table_name="address_snapshots"
+    )
+    op.drop_table("address_snapshots")
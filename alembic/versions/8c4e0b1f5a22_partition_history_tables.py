@@ -0,0 +1,84 @@
+"""partition history tables by time
+
+Revision ID: 8c4e0b1f5a22
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-19 11:40:03.529114
+
+Partitions are daily, the default PARTITION_PERIOD. Layout is spelled out
+here, so migration does not change with settings or later code.
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c4e0b1f5a22"
+down_revision = "3f1c2a9d7b10"
+branch_labels = None
+depends_on = None
+
+PARTITIONED_TABLES = {
+    "address_updates": "time",
+    "performance_run_results": "end_time",
+}
+PARTITION_DAYS_AHEAD = 7
+
+
+def _create_partition(table: str, start: datetime) -> None:
+    end = start + timedelta(days=1)
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS {table}_p{start:%Y%m%d} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def _partition_table(table: str, column: str) -> None:
+    old_table = f"{table}_unpartitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+    op.execute(
+        f"ALTER TABLE {old_table} RENAME CONSTRAINT {table}_pkey TO {old_table}_pkey"
+    )
+    op.execute(
+        f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE ({column})"
+    )
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})")
+    op.execute(
+        f"ALTER TABLE {table} ADD FOREIGN KEY (address_id) REFERENCES address (id)"
+    )
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    oldest = op.get_bind().execute(sa.text(f"SELECT min({column}) FROM {old_table}"))
+    now = datetime.now()
+    start = (oldest.scalar() or now).replace(hour=0, minute=0, second=0, microsecond=0)
+    while start <= now + timedelta(days=PARTITION_DAYS_AHEAD):
+        _create_partition(table, start)
+        start += timedelta(days=1)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+    op.execute(f"DROP TABLE {old_table}")
+    op.create_index(f"ix_{table}_address_id_{column}", table, ["address_id", column])
+
+
+def _unpartition_table(table: str) -> None:
+    old_table = f"{table}_unpartitioned"
+    op.execute(f"CREATE TABLE {old_table} (LIKE {table} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {old_table} SELECT * FROM {table}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {old_table}.id")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {old_table} RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    op.execute(
+        f"ALTER TABLE {table} ADD FOREIGN KEY (address_id) REFERENCES address (id)"
+    )
+
+
+def upgrade() -> None:
+    for table, column in PARTITIONED_TABLES.items():
+        _partition_table(table, column)
+
+
+def downgrade() -> None:
+    for table in PARTITIONED_TABLES:
+        _unpartition_table(table)
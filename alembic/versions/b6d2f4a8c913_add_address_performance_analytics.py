@@ -0,0 +1,50 @@
+"""add address performance analytics
+
+Revision ID: b6d2f4a8c913
+Revises: 8c4e0b1f5a22
+Create Date: 2026-10-19 13:05:27.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b6d2f4a8c913"
+down_revision = "8c4e0b1f5a22"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "address_performance_analytics",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("time_created", sa.DateTime(), nullable=True),
+        sa.Column("time_updated", sa.DateTime(), nullable=True),
+        sa.Column("time", sa.DateTime(), nullable=False),
+        sa.Column("ranking_type", sa.String(), nullable=False),
+        sa.Column("window_hours", sa.Integer(), nullable=False),
+        sa.Column("periods", sa.Integer(), nullable=False),
+        sa.Column("compounded_return", sa.Float(), nullable=False),
+        sa.Column("volatility", sa.Float(), nullable=False),
+        sa.Column("max_drawdown", sa.Float(), nullable=False),
+        sa.Column("sharpe_ratio", sa.Float(), nullable=True),
+        sa.Column("sortino_ratio", sa.Float(), nullable=True),
+        sa.Column("address_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["address_id"], ["address.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_address_performance_analytics_time_type",
+        "address_performance_analytics",
+        ["time", "ranking_type"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_address_performance_analytics_time_type",
+        table_name="address_performance_analytics",
+    )
+    op.drop_table("address_performance_analytics")
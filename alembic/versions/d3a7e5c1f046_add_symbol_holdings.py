@@ -0,0 +1,42 @@
+"""add symbol holdings
+
+Revision ID: d3a7e5c1f046
+Revises: b6d2f4a8c913
+Create Date: 2026-10-19 16:42:11.310257
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d3a7e5c1f046"
+down_revision = "b6d2f4a8c913"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "symbol_holdings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("symbol", sa.String(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("timestamp", sa.BigInteger(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("value_usd", sa.Float(), nullable=False),
+        sa.Column("value_pct", sa.Float(), nullable=False),
+        sa.Column("previous_value_pct", sa.Float(), nullable=False),
+        sa.Column("address_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["address_id"], ["address.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "symbol", "bucket", "address_id", name="uq_symbol_holdings_entry"
+        ),
+    )
+    op.create_index("ix_symbol_holdings_bucket", "symbol_holdings", ["bucket"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_symbol_holdings_bucket", table_name="symbol_holdings")
+    op.drop_table("symbol_holdings")
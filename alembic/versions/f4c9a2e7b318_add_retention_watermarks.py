@@ -0,0 +1,31 @@
+"""add retention watermarks
+
+Revision ID: f4c9a2e7b318
+Revises: d3a7e5c1f046
+Create Date: 2026-10-20 09:12:37.804215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f4c9a2e7b318"
+down_revision = "d3a7e5c1f046"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "retention_watermarks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bucket_seconds", sa.Integer(), nullable=False),
+        sa.Column("downsampled_until", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("bucket_seconds"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("retention_watermarks")
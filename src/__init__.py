@@ -1,3 +1,4 @@
 import dotenv
 
+# environment is loaded once here, before any module reads config
 dotenv.load_dotenv()
@@ -6,7 +6,6 @@ import logging
 
 import sqlalchemy.ext.asyncio as sql_asyncio
 
-import data as data
 from src import data, enums, exceptions, http_utils
 from src.database import services
 
@@ -1,10 +1,23 @@
 import asyncio
+import functools
 import logging
+import time
 import typing
 from abc import ABC, abstractmethod
 from datetime import datetime
 
-from src import data, enums, exceptions, http_utils, spec, time_utils
+from src import (
+    data,
+    enums,
+    exceptions,
+    http_utils,
+    metrics,
+    resilience,
+    spec,
+    token_registry,
+    tracing,
+)
+from src.config import config
 from src.exceptions import DebankDataInvalidError, DebankUnknownBlockchainError
 
 log = logging.getLogger(__name__)
@@ -85,25 +98,58 @@ class NansenPortfolioAssetProvider(AggregatedAssetProvider):
             enums.Blockchain.ARB
         ]
 
+    @staticmethod
+    def _project_asset_json(
+            asset_json: dict[str, typing.Any], blockchain: enums.Blockchain
+    ) -> data.AggregatedUsdAsset | None:
+        """
+        Keeps only fields of asset which are used, zero value assets are
+        dropped and dust is left to compaction
+        """
+        balance = float(asset_json["balance"])
+        price = float(asset_json["price"])
+        value_usd = balance * price
+        if value_usd <= 0.0:
+            return None
+        asset_id, symbol = token_registry.get_registry().resolve(
+            blockchain, asset_json.get("address"), asset_json["symbol"]
+        )
+        return data.AggregatedUsdAsset(
+            symbol=symbol,
+            amount=balance,
+            price=price,
+            value_usd=value_usd,
+            asset_id=asset_id,
+        )
+
     def _extract_aggregated_assets(
             self, resp_json: list[dict[str, typing.Any]], blockchain: enums.Blockchain
     ) -> list[data.AggregatedUsdAsset]:
         aggregated_assets = []
         for asset_json in resp_json:
-            symbol = asset_json["symbol"]
-            balance = float(asset_json["balance"])
-            price = float(asset_json["price"])
-            value_usd = balance * price
-            asset = data.AggregatedUsdAsset(
-                symbol=symbol,
-                amount=balance,
-                blockchain=blockchain,
-                price=price,
-                value_usd=value_usd,
-            )
-            aggregated_assets.append(asset)
+            asset = self._project_asset_json(asset_json, blockchain)
+            if asset is not None:
+                aggregated_assets.append(asset)
         return aggregated_assets
 
+    async def _async_request_aggregated_assets(
+            self, url: str, blockchain: enums.Blockchain, blockchain_str: str
+    ) -> list[data.AggregatedUsdAsset]:
+        if config.stream_json:
+            return await http_utils.async_request_json_items(
+                url,
+                functools.partial(self._project_asset_json, blockchain=blockchain),
+                self.headers,
+                provider="nansen",
+                chain=blockchain_str,
+            )
+        resp_json = await http_utils.async_request(
+            url, self.headers, provider="nansen", chain=blockchain_str
+        )
+        if not resp_json:
+            return []
+        return self._extract_aggregated_assets(resp_json, blockchain)
+
     def _get_formatted_blockchain(self, blockchain: enums.Blockchain) -> str:
         match blockchain:
             case blockchain.ETH:
@@ -126,6 +172,7 @@ class NansenPortfolioAssetProvider(AggregatedAssetProvider):
     ) -> data.AddressUpdate | None:
         all_aggregated_usd_assets = []
         for blockchain in self._blockchains_to_run:
+            # failed chain is raised, partial portfolio would look like a sell off
             blockchain_aggregated_usd_assets = await self._extract_single_blockchain_aggregated_assets(
                 address,
                 blockchain)
@@ -140,14 +187,17 @@ class NansenPortfolioAssetProvider(AggregatedAssetProvider):
         address_str = address.address
         blockchain_str = self._get_formatted_blockchain(blockchain)
         url = f"{self.BASE_URL}/{blockchain_str}/{address_str}"
-        try:
-            resp_json = await http_utils.async_request(url, self.headers)
-        except exceptions.InvalidHttpResponseError as e:
-            log.warning(f"Can't request agg assets, add: {address.address}")
-            return []
-        if not resp_json:
-            return []
-        return self._extract_aggregated_assets(resp_json, blockchain)
+        with tracing.span("nansen_fetch", chain=blockchain_str) as fetch_span:
+            try:
+                aggregated_assets = await self._async_request_aggregated_assets(
+                    url, blockchain, blockchain_str
+                )
+            except exceptions.InvalidHttpResponseError as e:
+                log.warning(f"Can't request agg assets, add: {address.address}")
+                fetch_span.set_attribute("error", repr(e))
+                raise
+            fetch_span.set_attribute("rows", len(aggregated_assets))
+            return aggregated_assets
 
     def _create_single_address_update(self,
                                       all_aggregated_assets: list[
@@ -186,11 +236,13 @@ class Debank(AggregatedAssetProvider):
 
     def __init__(
             self,
-            proxy_provider: http_utils.ProxyProvider = http_utils.RedisProxyProvider(),
-            user_agent_provider: http_utils.UserAgentProvider = http_utils.FileUserAgentProvider(),
+            proxy_provider: http_utils.ProxyProvider | None = None,
+            user_agent_provider: http_utils.UserAgentProvider | None = None,
     ):
-        self._proxy_provider = proxy_provider
-        self._user_agent_provider = user_agent_provider
+        self._proxy_provider = proxy_provider or http_utils.get_proxy_provider()
+        self._user_agent_provider = (
+                user_agent_provider or http_utils.get_user_agent_provider()
+        )
 
     def _adjust_headers(self) -> dict[str, typing.Any]:
         headers = Debank.HEADERS.copy()
@@ -202,21 +254,16 @@ class Debank(AggregatedAssetProvider):
             address: data.Address,
     ) -> list[data.AggregatedUsdAsset]:
         url = f"{Debank.DEBANK_URL}asset/classify?user_addr={address.address}"
-        log.info(f"before getting url {url}")
         headers = self._adjust_headers()
-        try:
+        # failed request is raised, so it is not taken for empty wallet
+        with tracing.span("debank_fetch"):
             overall_assets_json = await http_utils.sync_request_with_proxy(
                 url,
                 proxy_provider=self._proxy_provider,
                 headers=headers,
                 randomize_headers=True,
+                provider="debank",
             )
-        except exceptions.InvalidHttpResponseError as e:
-            log.warning(
-                f"Could not receive data for address {address.address}, skipping update, e: {e}"
-            )
-            return []
-        log.info(f"after getting url {url}")
         if "data" not in overall_assets_json:
             raise DebankDataInvalidError()
         wallet_data = overall_assets_json["data"]
@@ -235,8 +282,9 @@ class Debank(AggregatedAssetProvider):
         aggregated_usd_assets = await self._async_get_aggregated_usd_assets(
             address=address
         )
-        if not aggregated_usd_assets:
-            return None
+        aggregated_usd_assets = _sort_by_value_usd(
+            _aggregate_usd_assets(aggregated_usd_assets)
+        )
         acc_sum_value_usd = _calc_sum_usd_value(
             aggregated_usd_assets=aggregated_usd_assets
         )
@@ -255,11 +303,21 @@ class Debank(AggregatedAssetProvider):
             coin: dict[str, typing.Any]
     ) -> data.AggregatedUsdAsset:
         token_amount = coin["amount"]
-        symbol = coin["symbol"]
         price = coin["price"]
         value_usd = token_amount * price
+        try:
+            blockchain = Debank._parse_debank_blockchain(coin.get("chain", ""))
+        except DebankUnknownBlockchainError:
+            blockchain = None
+        asset_id, symbol = token_registry.get_registry().resolve(
+            blockchain, coin.get("id"), coin["symbol"]
+        )
         aggregated_usd_asset = data.AggregatedUsdAsset(
-            symbol=symbol, amount=token_amount, price=price, value_usd=value_usd
+            symbol=symbol,
+            amount=token_amount,
+            price=price,
+            value_usd=value_usd,
+            asset_id=asset_id,
         )
         return aggregated_usd_asset
 
@@ -276,14 +334,128 @@ class Debank(AggregatedAssetProvider):
                 return enums.Blockchain.ARB
             case "matic":
                 return enums.Blockchain.MATIC
+            case "avax":
+                return enums.Blockchain.AVAX
+            case "op":
+                return enums.Blockchain.OPTIMISM
         raise DebankUnknownBlockchainError()
 
 
+class HedgedAssetProvider(AggregatedAssetProvider):
+    """
+    Asks primary provider first, secondary one is started once primary fails
+    or does not answer within its percentile latency, first answer wins.
+    Provider with open circuit is not asked at all
+    """
+
+    def __init__(
+            self,
+            providers: list[tuple[str, AggregatedAssetProvider]],
+    ):
+        self._providers = providers
+        self._breakers = [
+            resilience.CircuitBreaker(name) for name, _provider in providers
+        ]
+        self._latencies = [
+            resilience.LatencyTracker() for _provider in providers
+        ]
+
+    def get_hedge_delay(self, index: int) -> float:
+        latency = self._latencies[index].get_percentile(config.hedge_percentile)
+        return min(max(latency, config.hedge_min_delay), config.hedge_max_delay)
+
+    async def _async_get_provider_assets(
+            self, index: int, address: data.Address, run_time: int
+    ) -> data.AddressUpdate | None:
+        name, provider = self._providers[index]
+        start = time.monotonic()
+        try:
+            address_update = await provider.async_get_assets_for_address(
+                address, run_time
+            )
+        except asyncio.CancelledError:
+            # request which lost race took at least as long as it ran
+            self._latencies[index].record(time.monotonic() - start)
+            raise
+        except Exception as e:
+            log.warning(f"Provider {name} failed for {address.address}, e: {e}")
+            address_update = None
+        if address_update is None:
+            self._breakers[index].record_failure()
+            return None
+        self._breakers[index].record_success()
+        self._latencies[index].record(time.monotonic() - start)
+        return address_update
+
+    async def async_get_assets_for_address(
+            self, address: data.Address, run_time: int
+    ) -> data.AddressUpdate | None:
+        indexes = [
+            index for index, breaker in enumerate(self._breakers)
+            if breaker.allow_request()
+        ]
+        if not indexes:
+            log.warning(f"All provider circuits are open, add: {address.address}")
+            return None
+        last_index = indexes.pop(0)
+        pending = {
+            asyncio.create_task(
+                self._async_get_provider_assets(last_index, address, run_time)
+            )
+        }
+        try:
+            while pending:
+                # hedge is timed by latency of provider started last
+                hedge_delay = self.get_hedge_delay(last_index) if indexes else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    address_update = task.result()
+                    if address_update is not None:
+                        return address_update
+                if indexes:
+                    reason = "failure" if done else "timeout"
+                    metrics.HEDGED_REQUESTS_TOTAL.inc(reason=reason)
+                    last_index = indexes.pop(0)
+                    pending.add(
+                        asyncio.create_task(
+                            self._async_get_provider_assets(
+                                last_index, address, run_time
+                            )
+                        )
+                    )
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def _create_default_provider() -> AggregatedAssetProvider:
+    if not config.provider_hedging:
+        return NansenPortfolioAssetProvider()
+    return HedgedAssetProvider(
+        [("nansen", NansenPortfolioAssetProvider()), ("debank", Debank())]
+    )
+
+
+_default_provider: AggregatedAssetProvider | None = None
+
+
+def get_default_provider() -> AggregatedAssetProvider:
+    """
+    Provider of update pass, built on first use instead of on import
+    """
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = _create_default_provider()
+    return _default_provider
+
+
 async def async_provide_aggregated_assets(
         address: data.Address, run_timestamp: int
 ) -> data.AddressUpdate | None:
-    nansen_portfolio_price_provider = NansenPortfolioAssetProvider()
-    return await nansen_portfolio_price_provider.async_get_assets_for_address(
+    return await get_default_provider().async_get_assets_for_address(
         address, run_timestamp
     )
 
@@ -308,32 +480,28 @@ def _combine_aggregated_usd_assets(
         symbol=symbol,
         price=avg_price,
         value_usd=sum_value_usd,
-        amount=sum_amount
+        amount=sum_amount,
+        asset_id=assets_to_combine[0].asset_id,
     )
 
 
 def _aggregate_usd_assets(all_aggregated_usd_assets: list[data.AggregatedUsdAsset]) -> \
         list[data.AggregatedUsdAsset]:
+    """
+    Merges assets by canonical asset id, which providers resolve when parsing
+    """
+    registry = token_registry.get_registry()
     aggregated_dict: dict[str, data.AggregatedUsdAsset] = {}
     for asset in all_aggregated_usd_assets:
-        lower_asset_symbol = asset.symbol.lower()
-        if lower_asset_symbol not in aggregated_dict:
-            aggregated_dict[lower_asset_symbol] = asset
+        if asset.asset_id is None:
+            asset_id, symbol = registry.resolve(None, None, asset.symbol)
+            asset = asset.copy(update={"symbol": symbol, "asset_id": asset_id})
+        found_agg_asset = aggregated_dict.get(asset.asset_id)
+        if found_agg_asset is None:
+            aggregated_dict[asset.asset_id] = asset
         else:
-            found_agg_asset = aggregated_dict[lower_asset_symbol]
-            combined_asset = _combine_aggregated_usd_assets([found_agg_asset, asset])
-            aggregated_dict[lower_asset_symbol] = combined_asset
+            aggregated_dict[asset.asset_id] = _combine_aggregated_usd_assets(
+                [found_agg_asset, asset]
+            )
 
     return list(aggregated_dict.values())
-
-
-async def main():
-    nansen = NansenPortfolioAssetProvider()
-    result = await nansen.async_get_assets_for_address(
-        address=data.Address(address="0x26fcbd3afebbe28d0a8684f790c48368d21665b5"),
-        run_time=time_utils.get_time_now())
-    print(result)
-
-
-if __name__ == '__main__':
-    asyncio.run(main())
@@ -0,0 +1,197 @@
+"""
+Multi-period risk and return statistics of addresses
+
+Stored single period performances of all addresses are loaded in one query
+per window instead of one query per address, analytics of all of them are
+calculated together over one matrix. Addresses are refreshed in intervals of
+their own, so each period is weighted by its hours: volatility, Sharpe and
+Sortino ratios are hourly, deviations scale with square root of period hours
+and risk free rate is per hour. Returns, volatility and drawdown are in
+percent like performances, ratios are not annualized and both use sample
+deviations.
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import data, enums, tracing
+from src.config import config
+from src.database import services
+
+log = logging.getLogger(__name__)
+
+# guards hourly scaling against periods without length
+MIN_PERIOD_HOURS = 1.0 / 3600.0
+
+
+def _calculate_matrix_analytics(
+    performances: np.ndarray,
+    period_hours: np.ndarray,
+    periods: np.ndarray,
+    risk_free_rate: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Analytics of series given as rows of matrices padded with zero performances
+    and one hour periods after their periods, ratios without any deviation
+    are nan
+    """
+    returns = performances / 100.0
+    hours = np.maximum(period_hours, MIN_PERIOD_HOURS)
+    is_period = np.arange(returns.shape[1]) < periods[:, np.newaxis]
+    # padded zero returns keep equity and its peak unchanged
+    equity = np.cumprod(1.0 + returns, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    max_drawdown = np.maximum((1.0 - equity / peak).max(axis=1), 0.0)
+    hourly_risk_free = risk_free_rate / 100.0
+    mean_return = returns.sum(axis=1) / np.where(is_period, hours, 0.0).sum(axis=1)
+    mean_excess = mean_return - hourly_risk_free
+    # random walk deviation of period grows with square root of its hours
+    deviations = np.where(
+        is_period,
+        (returns - mean_return[:, np.newaxis] * hours) / np.sqrt(hours),
+        0.0,
+    )
+    downsides = np.where(
+        is_period,
+        np.minimum(returns - hourly_risk_free * hours, 0.0) / np.sqrt(hours),
+        0.0,
+    )
+    degrees_of_freedom = np.maximum(periods - 1, 1)
+    has_deviation = periods > 1
+    volatility = np.where(
+        has_deviation,
+        np.sqrt((deviations**2).sum(axis=1) / degrees_of_freedom),
+        0.0,
+    )
+    downside_deviation = np.where(
+        has_deviation,
+        np.sqrt((downsides**2).sum(axis=1) / degrees_of_freedom),
+        0.0,
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = np.where(volatility > 0.0, mean_excess / volatility, np.nan)
+        sortino_ratio = np.where(
+            downside_deviation > 0.0, mean_excess / downside_deviation, np.nan
+        )
+    return (
+        (equity[:, -1] - 1.0) * 100.0,
+        volatility * 100.0,
+        max_drawdown * 100.0,
+        sharpe_ratio,
+        sortino_ratio,
+    )
+
+
+def _get_ratio(ratio: float) -> float | None:
+    return None if math.isnan(ratio) else float(ratio)
+
+
+def calculate_series_analytics(
+    performances: list[float],
+    risk_free_rate: float = config.analytics_risk_free_rate,
+    period_hours: list[float] | None = None,
+) -> tuple[float, float, float, float | None, float | None]:
+    """
+    Returns compounded return, volatility, max drawdown, Sharpe and Sortino
+    ratio of performance series ordered by time, periods are one hour long
+    unless their hours are given
+    """
+    if period_hours is None:
+        period_hours = [1.0] * len(performances)
+    (
+        compounded_return,
+        volatility,
+        max_drawdown,
+        sharpe_ratio,
+        sortino_ratio,
+    ) = _calculate_matrix_analytics(
+        np.array([performances], dtype=float),
+        np.array([period_hours], dtype=float),
+        np.array([len(performances)]),
+        risk_free_rate,
+    )
+    return (
+        float(compounded_return[0]),
+        float(volatility[0]),
+        float(max_drawdown[0]),
+        _get_ratio(sharpe_ratio[0]),
+        _get_ratio(sortino_ratio[0]),
+    )
+
+
+def calculate_analytics(
+    series: dict[data.Address, list[tuple[float, float]]],
+    ranking_type: enums.RunTimeType,
+    query_time: datetime,
+    window_hours: int,
+    risk_free_rate: float = config.analytics_risk_free_rate,
+) -> list[data.PerformanceAnalytics]:
+    """
+    Calculates analytics of all series of performances and their period hours
+    at once over matrices of them
+    """
+    series = {
+        address: performances
+        for address, performances in series.items()
+        if performances
+    }
+    if not series:
+        return []
+    periods = np.array([len(performances) for performances in series.values()])
+    is_period = np.arange(periods.max()) < periods[:, np.newaxis]
+    performances_matrix = np.zeros((len(series), periods.max()))
+    hours_matrix = np.ones((len(series), periods.max()))
+    performances_matrix[is_period], hours_matrix[is_period] = np.concatenate(
+        list(series.values())
+    ).T
+    (
+        compounded_returns,
+        volatilities,
+        max_drawdowns,
+        sharpe_ratios,
+        sortino_ratios,
+    ) = _calculate_matrix_analytics(
+        performances_matrix, hours_matrix, periods, risk_free_rate
+    )
+    return [
+        data.PerformanceAnalytics(
+            address=address,
+            ranking_type=ranking_type,
+            time=query_time,
+            window_hours=window_hours,
+            periods=int(periods[index]),
+            compounded_return=float(compounded_returns[index]),
+            volatility=float(volatilities[index]),
+            max_drawdown=float(max_drawdowns[index]),
+            sharpe_ratio=_get_ratio(sharpe_ratios[index]),
+            sortino_ratio=_get_ratio(sortino_ratios[index]),
+        )
+        for index, address in enumerate(series)
+    ]
+
+
+@tracing.traced_async()
+async def async_save_performance_analytics(
+    ranking_type: enums.RunTimeType,
+    query_time: datetime,
+    end_time: datetime,
+    session: sql_asyncio.AsyncSession,
+    window_hours_list: list[int] = config.analytics_window_hours,
+) -> None:
+    """
+    Saves analytics of every rolling window ending at end of ranking period
+    """
+    analytics: list[data.PerformanceAnalytics] = []
+    for window_hours in window_hours_list:
+        start_time = end_time - timedelta(hours=window_hours)
+        series = await services.async_find_all_performance_periods(
+            start_time, end_time, session
+        )
+        analytics.extend(
+            calculate_analytics(series, ranking_type, query_time, window_hours)
+        )
+    await services.async_save_performance_analytics(analytics, session)
+    log.info(f"Saved {len(analytics)} performance analytics")
@@ -0,0 +1,113 @@
+"""
+Compares commit per row with unit of work batching of update pass writes
+
+Run with python -m src.benchmarks.commits [--url URL], test database is used
+by default. Benchmark addresses and their rows are deleted afterwards.
+"""
+import argparse
+import asyncio
+import time
+
+import dotenv
+import sqlalchemy
+from defi_common.database import db, models
+from defi_common.dbconfig import db_config
+from sqlalchemy import orm
+
+from src import data, metrics
+from src.database import engine, services, unit_of_work
+
+_ADDRESS_PREFIX = "0xbench"
+
+
+def _create_assets(asset_count: int) -> list[data.AggregatedAsset]:
+    return [
+        data.AggregatedAsset(
+            symbol=f"TKN{index}",
+            amount=1.0,
+            price=1.0,
+            value_usd=1.0,
+            value_pct=100.0 / asset_count,
+            timestamp=1,
+        )
+        for index in range(asset_count)
+    ]
+
+
+async def _async_write_pass(
+    session_maker: orm.sessionmaker,
+    addresses: list[data.Address],
+    assets: list[data.AggregatedAsset],
+    use_unit_of_work: bool,
+) -> None:
+    async with session_maker() as session:
+        if not use_unit_of_work:
+            for address in addresses:
+                for asset in assets:
+                    await services.async_save_aggregated_update(asset, address, session)
+            return
+        async with unit_of_work.UnitOfWork(session) as work:
+            for address in addresses:
+                async with work.async_scope(address.address):
+                    for asset in assets:
+                        await services.async_save_aggregated_update(
+                            asset, address, session
+                        )
+
+
+async def _async_cleanup(session_maker: orm.sessionmaker) -> None:
+    async with session_maker() as session:
+        bench_ids = sqlalchemy.select(models.Address.id).where(
+            models.Address.address.startswith(_ADDRESS_PREFIX)
+        )
+        await session.execute(
+            sqlalchemy.delete(models.AggregatedBalanceUpdate)
+            .where(models.AggregatedBalanceUpdate.address_id.in_(bench_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            sqlalchemy.delete(models.Address)
+            .where(models.Address.address.startswith(_ADDRESS_PREFIX))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def async_run_benchmark(url: str, address_count: int, asset_count: int) -> None:
+    bench_engine = engine.create_engine(url)
+    async with bench_engine.begin() as conn:
+        await conn.run_sync(db.Base.metadata.create_all)
+    session_maker = engine.create_session_maker(bench_engine)
+    addresses = [
+        data.Address(address=f"{_ADDRESS_PREFIX}{index}")
+        for index in range(address_count)
+    ]
+    assets = _create_assets(asset_count)
+    rows = address_count * asset_count
+    print(f"{'mode':<16}{'rows':>7}{'commits':>9}{'seconds':>9}{'rows/s':>9}")
+    for mode, use_unit_of_work in (("commit per row", False), ("unit of work", True)):
+        await _async_cleanup(session_maker)
+        commits = metrics.DB_COMMITS_TOTAL.get()
+        start = time.perf_counter()
+        await _async_write_pass(session_maker, addresses, assets, use_unit_of_work)
+        seconds = time.perf_counter() - start
+        commits = metrics.DB_COMMITS_TOTAL.get() - commits
+        print(
+            f"{mode:<16}{rows:>7}{commits:>9.0f}{seconds:>9.2f}{rows / seconds:>9.0f}"
+        )
+    await _async_cleanup(session_maker)
+    await bench_engine.dispose()
+
+
+def main() -> None:
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=db_config.test_db_url)
+    parser.add_argument("--addresses", type=int, default=100)
+    parser.add_argument("--assets", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(async_run_benchmark(args.url, args.addresses, args.assets))
+
+
+if __name__ == "__main__":
+    main()
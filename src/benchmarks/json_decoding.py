@@ -0,0 +1,132 @@
+"""
+Compares full and streaming decoding of portfolio responses
+
+Run with python -m src.benchmarks.json_decoding [payload.json ...], without
+arguments recorded debank payload and synthetic whale payload are used.
+"""
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+import typing
+
+from src import json_stream
+from src.config import config
+
+_WHALE_TOKENS = 20_000
+_DUST_SHARE = 0.9
+
+
+def create_whale_payload(token_count: int = _WHALE_TOKENS, seed: int = 1) -> bytes:
+    """
+    Nansen like token array where most tokens are airdropped dust
+    """
+    rnd = random.Random(seed)
+    tokens = []
+    for index in range(token_count):
+        is_dust = rnd.random() < _DUST_SHARE
+        tokens.append(
+            {
+                "symbol": f"TKN{index}",
+                "name": f"Token {index}",
+                "address": f"0x{rnd.getrandbits(160):040x}",
+                "balance": str(rnd.uniform(0.0, 1e-6 if is_dust else 1e4)),
+                "price": str(rnd.uniform(0.0, 1e-3 if is_dust else 1e3)),
+                "decimals": 18,
+                "logo": f"https://example.com/logo/{index}.png",
+                "tags": ["erc20", "airdrop" if is_dust else "verified"],
+            }
+        )
+    return json.dumps(tokens).encode()
+
+
+def _project(item: dict[str, typing.Any]) -> tuple[str, float, float] | None:
+    amount = float(item.get("balance", item.get("amount", 0.0)))
+    price = float(item.get("price") or 0.0)
+    if amount * price <= 0.0:
+        return None
+    return item["symbol"], amount, price
+
+
+def _decode_full(payload: bytes, path: tuple[str, ...]) -> list[typing.Any]:
+    decoded = json.loads(payload)
+    for key in path:
+        decoded = decoded[key]
+    return [item for item in map(_project, decoded) if item is not None]
+
+
+def _decode_streaming(payload: bytes, path: tuple[str, ...]) -> list[typing.Any]:
+    chunk_size = config.stream_chunk_size
+    chunks = (
+        payload[start : start + chunk_size]
+        for start in range(0, len(payload), chunk_size)
+    )
+    items = map(_project, json_stream.decode_array_items(chunks, path))
+    return [item for item in items if item is not None]
+
+
+def _measure(
+    decode: typing.Callable[[bytes, tuple[str, ...]], list[typing.Any]],
+    payload: bytes,
+    path: tuple[str, ...],
+    repeats: int,
+) -> tuple[float, float, int]:
+    best_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        items = decode(payload, path)
+        best_time = min(best_time, time.perf_counter() - start)
+    tracemalloc.start()
+    decode(payload, path)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best_time, peak / 1024 / 1024, len(items)
+
+
+def run_benchmark(
+    payloads: list[tuple[str, bytes, tuple[str, ...]]], repeats: int = 5
+) -> None:
+    print(
+        f"{'payload':<30}{'mode':<11}{'MiB in':>8}{'ms':>9}{'peak MiB':>10}{'kept':>7}"
+    )
+    for name, payload, path in payloads:
+        size = len(payload) / 1024 / 1024
+        for mode, decode in (("full", _decode_full), ("streaming", _decode_streaming)):
+            seconds, peak, kept = _measure(decode, payload, path, repeats)
+            print(
+                f"{name:<30}{mode:<11}{size:>8.2f}{seconds * 1000:>9.1f}"
+                f"{peak:>10.2f}{kept:>7}"
+            )
+
+
+def load_default_payloads() -> list[tuple[str, bytes, tuple[str, ...]]]:
+    with open(
+        os.path.join(config.test_data_dir, "debank_balances.json"), "rb"
+    ) as payload_file:
+        payload = payload_file.read()
+    return [
+        ("debank_balances.json", payload, ("data",)),
+        ("synthetic whale", create_whale_payload(), ()),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("payloads", nargs="*", help="recorded JSON payloads")
+    parser.add_argument(
+        "--path", default="", help="dot separated keys leading to token array"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    path = tuple(filter(None, args.path.split(".")))
+    payloads: list[tuple[str, bytes, tuple[str, ...]]] = []
+    for payload_path in args.payloads:
+        with open(payload_path, "rb") as payload_file:
+            payloads.append((os.path.basename(payload_path), payload_file.read(), path))
+    run_benchmark(payloads or load_default_payloads(), args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures import time and time to first job of entry modules
+
+Run with python -m src.benchmarks.startup [--repeats N]. Every measurement
+runs in fresh interpreter, first job time covers import and lazily built
+state which first job of module needs, without running the job itself.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# module and statements preparing its first job
+_TARGETS = {
+    "src.main": (
+        "from src import aggregated_assets; from src.database import engine; "
+        "engine.get_session_maker(); aggregated_assets.get_default_provider()"
+    ),
+    "src.runner": "from src.database import engine; engine.get_session_maker()",
+    "src.performance": "from src.database import engine; engine.get_session_maker()",
+    "src.coin_changes": "from src.database import engine; engine.get_session_maker()",
+    "src.cli": "from src import cli; cli.create_parser()",
+    "src.aggregated_assets": (
+        "from src import aggregated_assets; aggregated_assets.get_default_provider()"
+    ),
+}
+
+_CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+exec(sys.argv[2])
+print(json.dumps([imported - start, time.perf_counter() - start]))
+"""
+
+
+def _measure(module: str, setup: str) -> tuple[float, float, float]:
+    """
+    Returns import, first job and whole process seconds
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, module, setup],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    process_seconds = time.perf_counter() - start
+    import_seconds, first_job_seconds = json.loads(result.stdout.splitlines()[-1])
+    return import_seconds, first_job_seconds, process_seconds
+
+
+def run_benchmark(repeats: int) -> None:
+    print(f"{'module':<24}{'import ms':>11}{'first job ms':>14}{'process ms':>12}")
+    for module, setup in _TARGETS.items():
+        samples = [_measure(module, setup) for _ in range(repeats)]
+        import_ms, first_job_ms, process_ms = (
+            statistics.median(sample[index] for sample in samples) * 1000
+            for index in range(3)
+        )
+        print(f"{module:<24}{import_ms:>11.0f}{first_job_ms:>14.0f}{process_ms:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.repeats)
+
+
+if __name__ == "__main__":
+    main()
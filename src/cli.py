@@ -0,0 +1,278 @@
+"""
+Command line entry point for one-off runs, rankings, benchmarks, profiling and
+seeding of synthetic wallets
+
+Run with python -m src.cli <command> --help. Modules of each command are
+imported only when it runs, so short commands start fast. With --dry-run
+sessions flush instead of committing, so nothing is written to database.
+"""
+import argparse
+import asyncio
+import logging
+import typing
+import zlib
+from datetime import datetime, timedelta
+
+from src import data, enums
+from src.config import config
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy import orm
+
+    from src import spec
+
+log = logging.getLogger(__name__)
+
+_RANKING_PERIODS = {
+    enums.RunTimeType.HOUR: timedelta(hours=1),
+    enums.RunTimeType.DAY: timedelta(days=1),
+}
+_OFFLINE_BENCHMARKS = ("json_decoding", "startup")
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Shard must be INDEX/COUNT")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("Shard index must be lower than count")
+    return index, count
+
+
+def is_in_shard(address: data.Address, index: int, count: int) -> bool:
+    """
+    Stable assignment of address to one of count shards
+    """
+    return zlib.crc32(address.address.lower().encode()) % count == index
+
+
+def _create_session_maker(args: argparse.Namespace) -> "orm.sessionmaker":
+    from src.database import engine
+
+    return engine.create_session_maker(engine.create_engine(), dry_run=args.dry_run)
+
+
+async def _async_find_addresses(
+    args: argparse.Namespace, session_maker: "orm.sessionmaker"
+) -> list[data.Address]:
+    from src.database import services
+
+    async with session_maker() as session:
+        addresses = [
+            services.convert_address_model(address_model)
+            for address_model in await services.async_find_all_addresses(session)
+        ]
+    if args.address:
+        wanted = {address.lower() for address in args.address}
+        addresses = [
+            address for address in addresses if address.address.lower() in wanted
+        ]
+        if len(addresses) < len(wanted):
+            log.warning("Some of given addresses are not stored, skipping them")
+    if args.shard:
+        index, count = args.shard
+        addresses = [
+            address for address in addresses if is_in_shard(address, index, count)
+        ]
+    return addresses
+
+
+def _create_asset_provider(args: argparse.Namespace) -> "spec.AssetProvider":
+    if args.synthetic_seed is None:
+        from src import aggregated_assets
+
+        return aggregated_assets.async_provide_aggregated_assets
+    from src import synthetic
+
+    population = synthetic.SyntheticPopulation(
+        args.synthetic_seed, args.synthetic_wallets
+    )
+    provider = synthetic.SyntheticAssetProvider(population, args.synthetic_step)
+    return provider.async_get_assets_for_address
+
+
+async def _async_run_update(args: argparse.Namespace) -> None:
+    from src import runner
+
+    session_maker = _create_session_maker(args)
+    addresses = await _async_find_addresses(args, session_maker)
+    log.info(f"Updating {len(addresses)} addresses, dry run: {args.dry_run}")
+    await runner.async_update_all_addresses(
+        session_maker,
+        provide_assets=_create_asset_provider(args),
+        sleep_time=args.sleep,
+        addresses=addresses,
+        fetch_workers=args.fetch_workers,
+        write_workers=args.write_workers,
+        batch_size=args.batch_size,
+    )
+
+
+async def _async_run_rankings(args: argparse.Namespace) -> None:
+    from src import runner
+
+    session_maker = _create_session_maker(args)
+    ranking_type = enums.RunTimeType(args.type)
+    start = args.start or datetime.now()
+    end = args.end or start
+    current_time = start
+    while current_time <= end:
+        log.info(f"Running {ranking_type.value} rankings of {current_time}")
+        if "address" in args.jobs:
+            await runner.async_run_address_ranking(
+                ranking_type, session_maker, current_time
+            )
+        if "coin" in args.jobs:
+            await runner.async_run_coin_change_ranking(
+                ranking_type, session_maker, current_time
+            )
+        current_time += _RANKING_PERIODS[ranking_type]
+
+
+async def _async_run_seed(args: argparse.Namespace) -> None:
+    from src import synthetic
+
+    population = synthetic.SyntheticPopulation(args.seed, args.wallets)
+    end = args.end or datetime.now()
+    timestamps = [
+        int((end - timedelta(hours=args.step_hours * step)).timestamp())
+        for step in reversed(range(args.steps))
+    ]
+    log.info(f"Seeding {args.wallets} wallets with {args.steps} snapshots each")
+    await synthetic.async_seed_database(
+        population, timestamps, _create_session_maker(args), args.chunk_size
+    )
+
+
+def _run_benchmarks(args: argparse.Namespace) -> None:
+    for name in args.only or _OFFLINE_BENCHMARKS:
+        print(f"\n{name}")
+        if name == "json_decoding":
+            from src.benchmarks import json_decoding
+
+            json_decoding.run_benchmark(
+                json_decoding.load_default_payloads(), args.repeats
+            )
+        elif name == "startup":
+            from src.benchmarks import startup
+
+            startup.run_benchmark(args.repeats)
+
+
+async def _async_run_profile(args: argparse.Namespace) -> None:
+    from src import profiling
+
+    profiling.request_next_run()
+    await _async_run_update(args)
+    log.info(f"Profiles are in {config.profile_dir}")
+
+
+def _add_database_flags(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--dry-run", action="store_true", help="roll back all database writes"
+    )
+
+
+def _add_update_flags(parser: argparse.ArgumentParser) -> None:
+    _add_database_flags(parser)
+    parser.add_argument(
+        "--address", action="append", help="address to update, can be repeated"
+    )
+    parser.add_argument(
+        "--shard", type=_parse_shard, help="update only shard INDEX/COUNT"
+    )
+    parser.add_argument(
+        "--fetch-workers", type=int, default=config.pipeline_fetch_workers
+    )
+    parser.add_argument(
+        "--write-workers", type=int, default=config.pipeline_write_workers
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=config.unit_of_work_batch_size
+    )
+    parser.add_argument(
+        "--sleep", type=int, default=15, help="seconds between fetches of worker"
+    )
+    parser.add_argument(
+        "--synthetic-seed",
+        type=int,
+        help="serve seeded synthetic wallets instead of portfolio APIs",
+    )
+    parser.add_argument("--synthetic-wallets", type=int, default=10_000)
+    parser.add_argument(
+        "--synthetic-step", type=int, default=1, help="step of first fetch of wallet"
+    )
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = commands.add_parser("update", help="update addresses once")
+    _add_update_flags(update_parser)
+
+    rank_parser = commands.add_parser("rank", help="run rankings of time window")
+    _add_database_flags(rank_parser)
+    rank_parser.add_argument(
+        "--type",
+        choices=[time_type.value for time_type in enums.RunTimeType],
+        required=True,
+    )
+    rank_parser.add_argument(
+        "--start", type=datetime.fromisoformat, help="first run time, now by default"
+    )
+    rank_parser.add_argument(
+        "--end", type=datetime.fromisoformat, help="last run time, start by default"
+    )
+    rank_parser.add_argument(
+        "--jobs", nargs="+", choices=("address", "coin"), default=["address", "coin"]
+    )
+
+    bench_parser = commands.add_parser("bench", help="run offline benchmarks")
+    bench_parser.add_argument(
+        "--only", nargs="+", choices=_OFFLINE_BENCHMARKS, help="all by default"
+    )
+    bench_parser.add_argument("--repeats", type=int, default=5)
+
+    seed_parser = commands.add_parser("seed", help="write synthetic wallets")
+    _add_database_flags(seed_parser)
+    seed_parser.add_argument("--wallets", type=int, default=10_000)
+    seed_parser.add_argument("--seed", type=int, default=0)
+    seed_parser.add_argument(
+        "--steps", type=int, default=2, help="snapshots of every wallet"
+    )
+    seed_parser.add_argument("--step-hours", type=float, default=1.0)
+    seed_parser.add_argument(
+        "--end", type=datetime.fromisoformat, help="last snapshot time, now by default"
+    )
+    seed_parser.add_argument("--chunk-size", type=int, default=1000)
+
+    profile_parser = commands.add_parser(
+        "profile", help="update addresses once with sampling profiler"
+    )
+    _add_update_flags(profile_parser)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = create_parser().parse_args(argv)
+    logging.basicConfig(
+        format="[%(levelname)s] %(message)s (%(filename)s, %(funcName)s(), line %(lineno)d)",
+        level=logging.INFO,
+    )
+    match args.command:
+        case "update":
+            asyncio.run(_async_run_update(args))
+        case "rank":
+            asyncio.run(_async_run_rankings(args))
+        case "bench":
+            _run_benchmarks(args)
+        case "profile":
+            asyncio.run(_async_run_profile(args))
+        case "seed":
+            asyncio.run(_async_run_seed(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
-import asyncio
 import logging
 from datetime import datetime
 import src  # noqa
-from defi_common.database import db
 
 import sqlalchemy.ext.asyncio as sql_asyncio
 
-from src import data, enums, time_utils
+from src import (
+    compaction,
+    data,
+    enums,
+    holdings,
+    time_utils,
+    token_registry,
+    tracing,
+)
+from src.config import config
 from src.data import AssetOwnedChange
 from src.database import services
 from src.time_utils import get_times_for_comparison
@@ -17,9 +24,19 @@ log = logging.getLogger(__name__)
 def _agg_update_list_to_dict(
     updates: list[data.AggregatedAsset],
 ) -> dict[str, data.AggregatedAsset]:
-    result = {}
+    result: dict[str, data.AggregatedAsset] = {}
     for update in updates:
-        result[update.symbol] = update
+        # bucket of collapsed dust is not a coin
+        if update.symbol == compaction.OTHER_SYMBOL:
+            continue
+        # snapshots stored before symbols were normalized keep provider casing
+        symbol = token_registry.normalize_symbol(update.symbol)
+        stored_update = result.get(symbol)
+        if stored_update is not None:
+            update = stored_update.copy(
+                update={"value_pct": stored_update.value_pct + update.value_pct}
+            )
+        result[symbol] = update
     return result
 
 
@@ -100,6 +117,7 @@ async def async_extract_coin_changes(
             _add_sum_value_to_dict(symbol, second_pct, coin_change_sums)
 
 
+@tracing.traced_async()
 async def async_calculate_averaged_coin_changes(
     start_time: datetime,
     end_time: datetime,
@@ -133,37 +151,57 @@ async def async_calculate_averaged_coin_changes(
     return _create_asset_owned_changes(sorted_coin_changes, end_time, run_time_type)
 
 
+@tracing.traced_async()
+async def async_calculate_indexed_coin_changes(
+    start_time: datetime,
+    end_time: datetime,
+    run_time_type: enums.RunTimeType,
+    session: sql_asyncio.AsyncSession,
+) -> list[data.AssetOwnedChange]:
+    """
+    Coin changes summed from symbol holdings index, without reading balance
+    history of addresses
+    """
+    first_bucket, last_bucket = holdings.get_window_buckets(start_time, end_time)
+    coin_change_sums = await services.async_find_symbol_changes(
+        first_bucket, last_bucket, session
+    )
+    address_count = await services.async_count_addresses(session)
+    sorted_coin_changes = dict(
+        sorted(
+            (
+                (symbol, coin_change_sum / address_count)
+                for symbol, coin_change_sum in coin_change_sums.items()
+            ),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+    )
+    return _create_asset_owned_changes(sorted_coin_changes, end_time, run_time_type)
+
+
 async def async_run_coin_ranking(
     time_type: enums.RunTimeType,
     current_time: datetime,
     session: sql_asyncio.AsyncSession,
 ) -> None:
     start_dt, end_dt = get_times_for_comparison(time_type, current_time)
-    coin_changes = await async_calculate_averaged_coin_changes(
-        start_time=start_dt, end_time=end_dt, run_time_type=time_type, session=session
-    )
-    log.info(f"coin ranking, coin changes len: {len(coin_changes)}")
-    await services.async_save_coin_changes(
-        coin_changes, save_time=current_time, run_time_type=time_type, session=session
-    )
-    log.info(f"Saved coin ranking")
-
-
-async def main():
-    time_type = enums.RunTimeType.HOUR
-    async with db.async_session() as session:
-        start_dt, end_dt = get_times_for_comparison(
-            time_type, datetime(2022, 12, 29, 13, 1, 0)
+    if config.coin_ranking_from_index:
+        coin_changes = await async_calculate_indexed_coin_changes(
+            start_time=start_dt,
+            end_time=end_dt,
+            run_time_type=time_type,
+            session=session,
         )
-        print(f"start {start_dt}, end {end_dt}")
+    else:
         coin_changes = await async_calculate_averaged_coin_changes(
             start_time=start_dt,
             end_time=end_dt,
             run_time_type=time_type,
             session=session,
         )
-        [print(coin_change) for coin_change in coin_changes]
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
+    log.info(f"coin ranking, coin changes len: {len(coin_changes)}")
+    await services.async_save_coin_changes(
+        coin_changes, save_time=current_time, run_time_type=time_type, session=session
+    )
+    log.info(f"Saved coin ranking")
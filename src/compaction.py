@@ -0,0 +1,65 @@
+"""
+Compaction of wallet holdings before saving
+
+Assets worth less than threshold in USD or in share of wallet, and assets
+beyond top N, are collapsed into single OTHER bucket. Bucket keeps their
+summed value with amount equal to value and price 1, so wallet totals stay
+exact and bucket never contributes price performance.
+"""
+from src import data
+from src.config import config
+
+OTHER_SYMBOL = "OTHER"
+
+
+def _is_kept(
+    asset: data.AggregatedAsset,
+    index: int,
+    min_value_usd: float,
+    min_value_pct: float,
+    top_n: int,
+) -> bool:
+    if asset.symbol == OTHER_SYMBOL:
+        return False
+    if top_n and index >= top_n:
+        return False
+    return asset.value_usd >= min_value_usd and asset.value_pct >= min_value_pct
+
+
+def compact_assets(
+    assets: list[data.AggregatedAsset],
+    min_value_usd: float = config.compact_min_value_usd,
+    min_value_pct: float = config.compact_min_value_pct,
+    top_n: int = config.compact_top_n,
+) -> list[data.AggregatedAsset]:
+    sorted_assets = sorted(assets, key=lambda x: x.value_usd, reverse=True)
+    kept_assets: list[data.AggregatedAsset] = []
+    collapsed_assets: list[data.AggregatedAsset] = []
+    for index, asset in enumerate(sorted_assets):
+        if _is_kept(asset, index, min_value_usd, min_value_pct, top_n):
+            kept_assets.append(asset)
+        else:
+            collapsed_assets.append(asset)
+    if not collapsed_assets:
+        return kept_assets
+    other_value_usd = sum(asset.value_usd for asset in collapsed_assets)
+    kept_assets.append(
+        data.AggregatedAsset(
+            symbol=OTHER_SYMBOL,
+            amount=other_value_usd,
+            price=1.0,
+            value_usd=other_value_usd,
+            value_pct=sum(asset.value_pct for asset in collapsed_assets),
+            timestamp=collapsed_assets[0].timestamp,
+        )
+    )
+    kept_assets.sort(key=lambda x: x.value_usd, reverse=True)
+    return kept_assets
+
+
+def compact_address_update(address_update: data.AddressUpdate) -> data.AddressUpdate:
+    if not config.compaction:
+        return address_update
+    return address_update.copy(
+        update={"aggregated_assets": compact_assets(address_update.aggregated_assets)}
+    )
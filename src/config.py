@@ -1,8 +1,6 @@
 import os
 
-import dotenv
-
-dotenv.load_dotenv()
+from src import enums
 
 
 class Config:
@@ -11,6 +9,91 @@ class Config:
     covalent_key = os.getenv("COVALENT_API_KEY")
     root_dir = os.path.dirname(os.path.abspath(__file__)).replace("src", "")
     test_data_dir = os.path.join(root_dir, "tests", "test_data")
+    refresh_min_interval = int(os.getenv("REFRESH_MIN_INTERVAL", 15 * 60))
+    refresh_max_interval = int(os.getenv("REFRESH_MAX_INTERVAL", 30 * 60))
+    refresh_active_change_pct = float(os.getenv("REFRESH_ACTIVE_CHANGE_PCT", 5.0))
+    refresh_whale_value_usd = float(os.getenv("REFRESH_WHALE_VALUE_USD", 1_000_000.0))
+    # passes starting late by up to this many seconds still refresh due addresses
+    refresh_tolerance = int(os.getenv("REFRESH_TOLERANCE", 2 * 60))
+    delta_storage = os.getenv("DELTA_STORAGE", "0") == "1"
+    delta_keyframe_interval = int(os.getenv("DELTA_KEYFRAME_INTERVAL", 60 * 60))
+    delta_threshold_pct = float(os.getenv("DELTA_THRESHOLD_PCT", 0.5))
+    holdings_index = os.getenv("HOLDINGS_INDEX", "1") == "1"
+    # index covers only snapshots saved since it was enabled
+    coin_ranking_from_index = os.getenv("COIN_RANKING_FROM_INDEX", "0") == "1"
+    partition_period = enums.PartitionPeriod(os.getenv("PARTITION_PERIOD", "DAY"))
+    partitions_ahead = int(os.getenv("PARTITIONS_AHEAD", 7))
+    # downsampling keeps first snapshot of each bucket, which is the keyframe
+    # in delta storage as long as keyframe interval divides an hour
+    retention_hourly_after_days = int(os.getenv("RETENTION_HOURLY_AFTER_DAYS", 7))
+    retention_daily_after_days = int(os.getenv("RETENTION_DAILY_AFTER_DAYS", 30))
+    retention_drop_after_days = int(os.getenv("RETENTION_DROP_AFTER_DAYS", 365))
+    provider_hedging = os.getenv("PROVIDER_HEDGING", "0") == "1"
+    hedge_percentile = float(os.getenv("HEDGE_PERCENTILE", 95.0))
+    hedge_min_delay = float(os.getenv("HEDGE_MIN_DELAY", 2.0))
+    hedge_max_delay = float(os.getenv("HEDGE_MAX_DELAY", 20.0))
+    breaker_failure_threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    breaker_reset_seconds = float(os.getenv("BREAKER_RESET_SECONDS", 60.0))
+    governor_rate = float(os.getenv("GOVERNOR_RATE", 5.0))
+    governor_burst = float(os.getenv("GOVERNOR_BURST", 10.0))
+    governor_concurrency = int(os.getenv("GOVERNOR_CONCURRENCY", 4))
+    stream_json = os.getenv("STREAM_JSON", "1") == "1"
+    stream_chunk_size = int(os.getenv("STREAM_CHUNK_SIZE", 64 * 1024))
+    token_registry_path = os.getenv(
+        "TOKEN_REGISTRY_PATH", os.path.join(root_dir, "resources", "token_registry.csv")
+    )
+    analytics_window_hours = [
+        int(hours) for hours in os.getenv("ANALYTICS_WINDOW_HOURS", "24,168").split(",")
+    ]
+    # risk free return per hour in percent
+    analytics_risk_free_rate = float(os.getenv("ANALYTICS_RISK_FREE_RATE", 0.0))
+    compaction = os.getenv("COMPACTION", "1") == "1"
+    compact_min_value_usd = float(os.getenv("COMPACT_MIN_VALUE_USD", 1.0))
+    compact_min_value_pct = float(os.getenv("COMPACT_MIN_VALUE_PCT", 0.01))
+    # 0 keeps every asset above thresholds
+    compact_top_n = int(os.getenv("COMPACT_TOP_N", 0))
+    ranking_api_page_size = int(os.getenv("RANKING_API_PAGE_SIZE", 100))
+    ranking_api_max_page_size = int(os.getenv("RANKING_API_MAX_PAGE_SIZE", 1000))
+    ranking_cache_size = int(os.getenv("RANKING_CACHE_SIZE", 256))
+    db_pool_size = int(os.getenv("DB_POOL_SIZE", 10))
+    db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 30.0))
+    db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", 30 * 60))
+    db_command_timeout = float(os.getenv("DB_COMMAND_TIMEOUT", 60.0))
+    # asyncpg statement cache and prepared statements reused by sqlalchemy
+    db_statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+    db_prepared_statement_cache_size = int(
+        os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 100)
+    )
+    # update pass fetches and writes addresses in concurrent stages
+    pipeline_fetch_workers = int(os.getenv("PIPELINE_FETCH_WORKERS", 1))
+    pipeline_write_workers = int(os.getenv("PIPELINE_WRITE_WORKERS", 1))
+    pipeline_queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", 50))
+    # writes wait for full batch, as fetches are spaced by sleep of update pass
+    pipeline_batch_wait = float(os.getenv("PIPELINE_BATCH_WAIT", "inf"))
+    # addresses written in single transaction of update pass
+    unit_of_work_batch_size = int(os.getenv("UNIT_OF_WORK_BATCH_SIZE", 20))
+    metrics_port = int(os.getenv("METRICS_PORT", 8081))
+    profile_jobs = set(filter(None, os.getenv("PROFILE_JOBS", "").split(",")))
+    profile_dir = os.getenv("PROFILE_DIR", os.path.join(root_dir, "profiles"))
+    profile_interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", 5.0))
+    profile_slow_callback_ms = float(os.getenv("PROFILE_SLOW_CALLBACK_MS", 100.0))
+    trace_exporter = enums.TraceExporterType(os.getenv("TRACE_EXPORTER", "NONE"))
+    trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+    trace_file = os.getenv("TRACE_FILE", os.path.join(root_dir, "traces.jsonl"))
+    trace_otlp_endpoint = os.getenv(
+        "TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+    )
+    trace_service_name = os.getenv("TRACE_SERVICE_NAME", "crypto_platform")
+    export_dir = os.getenv("EXPORT_DIR", os.path.join(root_dir, "export"))
+    export_batch_size = int(os.getenv("EXPORT_BATCH_SIZE", 50_000))
+    export_lag_minutes = int(os.getenv("EXPORT_LAG_MINUTES", 60))
+    snapshot_store_path = os.getenv("SNAPSHOT_STORE_PATH")
+    snapshot_store_compact_factor = int(os.getenv("SNAPSHOT_STORE_COMPACT_FACTOR", 4))
+    # update pass writes to spool and drainer loads it, disabled when empty
+    spool_dir = os.getenv("SPOOL_DIR", "")
+    spool_segment_size = int(os.getenv("SPOOL_SEGMENT_SIZE", 16 * 1024 * 1024))
+    spool_sync = os.getenv("SPOOL_SYNC", "1") == "1"
 
 
 config = Config()
@@ -1,8 +1,5 @@
 from datetime import datetime
 
-import dotenv
-
-dotenv.load_dotenv()
 import pydantic
 
 from src import enums
@@ -30,6 +27,7 @@ class AggregatedUsdAsset(UsdValue):
     symbol: str
     amount: float
     price: float
+    asset_id: str | None = None
 
 
 class AggregatedAsset(AggregatedUsdAsset, PctValue):
@@ -43,10 +41,22 @@ class BlockchainAsset(UsdValue):
     price: float
 
 
+class RegisteredToken(pydantic.BaseModel):
+    blockchain: enums.Blockchain
+    contract: str
+    asset_id: str
+    symbol: str
+
+
 class AddressUpdate(UsdValue):
     aggregated_assets: list[AggregatedAsset]
 
 
+class StoredAddressUpdate(pydantic.BaseModel):
+    address: Address
+    address_update: AddressUpdate
+
+
 class PerformanceResult(pydantic.BaseModel):
     performance: float
     end_time: datetime
@@ -54,6 +64,13 @@ class PerformanceResult(pydantic.BaseModel):
     address: Address
 
 
+class SpooledRecord(pydantic.BaseModel):
+    address: Address
+    timestamp: int
+    address_update: AddressUpdate | None = None
+    performance: PerformanceResult | None = None
+
+
 class AddressPerformanceRank(pydantic.BaseModel):
     address: Address
     ranking_type: enums.RunTimeType
@@ -62,9 +79,32 @@ class AddressPerformanceRank(pydantic.BaseModel):
     rank: int
 
 
+class PerformanceAnalytics(pydantic.BaseModel):
+    address: Address
+    ranking_type: enums.RunTimeType
+    time: datetime
+    window_hours: int
+    periods: int
+    compounded_return: float
+    volatility: float
+    max_drawdown: float
+    sharpe_ratio: float | None
+    sortino_ratio: float | None
+
+
 class AssetOwnedChange(pydantic.BaseModel):
     time: datetime
     rank: int
     symbol: str
     pct_change: float
     run_type: enums.RunTimeType
+
+
+class SymbolHolding(UsdValue, PctValue):
+    address: Address
+    symbol: str
+    bucket: datetime
+    amount: float
+    # allocation before first snapshot of bucket
+    previous_value_pct: float
+    timestamp: int
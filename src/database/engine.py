@@ -0,0 +1,91 @@
+"""
+Database engine and session maker of this project
+
+Wraps engine of defi_common with configurable pool, asyncpg statement caches
+and timeouts. Pool reports how long checkouts wait for a connection, so
+exhausted pool shows up in metrics instead of as slow jobs.
+"""
+import logging
+import time
+import typing
+
+import sqlalchemy
+from defi_common.dbconfig import db_config
+from sqlalchemy import orm, pool
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import metrics
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+
+class TimedQueuePool(pool.AsyncAdaptedQueuePool):
+    def _do_get(self) -> typing.Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS_TOTAL.inc()
+            log.warning(f"Database pool exhausted, status: {self.status()}")
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+def create_engine(
+    url: str | None = None,
+    pool_size: int = config.db_pool_size,
+    max_overflow: int = config.db_max_overflow,
+    pool_timeout: float = config.db_pool_timeout,
+) -> sql_asyncio.AsyncEngine:
+    engine_url = sqlalchemy.engine.make_url(url or db_config.db_url)
+    engine_url = engine_url.update_query_dict(
+        {"prepared_statement_cache_size": str(config.db_prepared_statement_cache_size)}
+    )
+    return sql_asyncio.create_async_engine(
+        engine_url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=True,
+        connect_args={
+            "statement_cache_size": config.db_statement_cache_size,
+            "command_timeout": config.db_command_timeout,
+        },
+    )
+
+
+class DryRunSession(sql_asyncio.AsyncSession):
+    """
+    Session which flushes instead of committing, so all its writes are rolled
+    back when it is closed
+    """
+
+    async def commit(self) -> None:
+        await self.flush()
+
+
+def create_session_maker(
+    engine: sql_asyncio.AsyncEngine, dry_run: bool = False
+) -> orm.sessionmaker:
+    return orm.sessionmaker(
+        engine,
+        class_=DryRunSession if dry_run else sql_asyncio.AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+_session_maker: orm.sessionmaker | None = None
+
+
+def get_session_maker() -> orm.sessionmaker:
+    """
+    Shared session maker, every job or worker opens its own session from it
+    """
+    global _session_maker
+    if _session_maker is None:
+        _session_maker = create_session_maker(create_engine())
+    return _session_maker
@@ -0,0 +1,92 @@
+"""
+Tables owned by this project, shared tables live in defi_common
+"""
+from datetime import datetime
+
+import sqlalchemy
+from defi_common.database import db
+from defi_common.database import models  # noqa, registers shared tables
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+
+
+class AddressSnapshot(db.Base):  # type: ignore
+    """
+    Header of single balance snapshot of address, written in delta storage mode
+    """
+
+    __tablename__ = "address_snapshots"
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_address_snapshots_address_timestamp", "address_id", "timestamp"
+        ),
+    )
+    id = Column(Integer, primary_key=True)  # noqa
+    time_created = Column(DateTime(), default=datetime.now())
+    time_updated = Column(DateTime(), default=datetime.now())
+    timestamp = Column(sqlalchemy.BigInteger, nullable=False)
+    time = Column(DateTime, nullable=False)
+    value_usd = Column(Float, nullable=False)
+    is_keyframe = Column(Boolean, nullable=False)
+    address_id = Column(Integer, ForeignKey("address.id"), nullable=False)
+
+
+class AddressPerformanceAnalytics(db.Base):  # type: ignore
+    """
+    Risk and return statistics of address over rolling window, saved with
+    address ranking
+    """
+
+    __tablename__ = "address_performance_analytics"
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_address_performance_analytics_time_type", "time", "ranking_type"
+        ),
+    )
+    id = Column(Integer, primary_key=True)  # noqa
+    time_created = Column(DateTime(), default=datetime.now())
+    time_updated = Column(DateTime(), default=datetime.now())
+    time = Column(DateTime(), nullable=False)
+    ranking_type = Column(String, nullable=False)
+    window_hours = Column(Integer, nullable=False)
+    periods = Column(Integer, nullable=False)
+    compounded_return = Column(Float, nullable=False)
+    volatility = Column(Float, nullable=False)
+    max_drawdown = Column(Float, nullable=False)
+    sharpe_ratio = Column(Float, nullable=True)
+    sortino_ratio = Column(Float, nullable=True)
+    address_id = Column(Integer, ForeignKey("address.id"), nullable=False)
+
+
+class SymbolHolding(db.Base):  # type: ignore
+    """
+    Entry of symbol holdings index, allocation of symbol in last snapshot of
+    address within hour bucket, maintained when snapshots are saved
+    """
+
+    __tablename__ = "symbol_holdings"
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint(
+            "symbol", "bucket", "address_id", name="uq_symbol_holdings_entry"
+        ),
+        sqlalchemy.Index("ix_symbol_holdings_bucket", "bucket"),
+    )
+    id = Column(Integer, primary_key=True)  # noqa
+    symbol = Column(String, nullable=False)
+    bucket = Column(DateTime(), nullable=False)
+    timestamp = Column(sqlalchemy.BigInteger, nullable=False)
+    amount = Column(Float, nullable=False)
+    value_usd = Column(Float, nullable=False)
+    value_pct = Column(Float, nullable=False)
+    previous_value_pct = Column(Float, nullable=False)
+    address_id = Column(Integer, ForeignKey("address.id"), nullable=False)
+
+
+class RetentionWatermark(db.Base):  # type: ignore
+    """
+    Time up to which history is already downsampled to buckets of given size
+    """
+
+    __tablename__ = "retention_watermarks"
+    id = Column(Integer, primary_key=True)  # noqa
+    bucket_seconds = Column(Integer, nullable=False, unique=True)
+    downsampled_until = Column(DateTime(), nullable=False)
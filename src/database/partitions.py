@@ -0,0 +1,150 @@
+"""
+Time based range partitions of history tables
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+
+import sqlalchemy
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import enums, exceptions
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = {
+    "address_updates": "time",
+    "performance_run_results": "end_time",
+}
+_BOUNDS_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def get_partition_start(
+    at_time: datetime, period: enums.PartitionPeriod = config.partition_period
+) -> datetime:
+    day_start = at_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == enums.PartitionPeriod.WEEK:
+        return day_start - timedelta(days=day_start.weekday())
+    return day_start
+
+
+def get_partition_end(
+    start: datetime, period: enums.PartitionPeriod = config.partition_period
+) -> datetime:
+    match period:
+        case enums.PartitionPeriod.DAY:
+            return start + timedelta(days=1)
+        case enums.PartitionPeriod.WEEK:
+            return start + timedelta(weeks=1)
+    raise exceptions.UnknownEnumError()
+
+
+def get_partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m%d}"
+
+
+def create_partition_sql(
+    table: str, start: datetime, period: enums.PartitionPeriod = config.partition_period
+) -> str:
+    end = get_partition_end(start, period)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {get_partition_name(table, start)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def get_partition_starts(
+    start_time: datetime,
+    end_time: datetime,
+    period: enums.PartitionPeriod = config.partition_period,
+) -> list[datetime]:
+    starts: list[datetime] = []
+    start = get_partition_start(start_time, period)
+    while start <= end_time:
+        starts.append(start)
+        start = get_partition_end(start, period)
+    return starts
+
+
+def parse_partition_bounds(bounds_expression: str) -> tuple[datetime, datetime] | None:
+    """
+    Parses range bounds from pg_get_expr, default partition has none
+    """
+    match = _BOUNDS_PATTERN.search(bounds_expression)
+    if not match:
+        return None
+    return datetime.fromisoformat(match.group(1)), datetime.fromisoformat(
+        match.group(2)
+    )
+
+
+async def _async_is_partitioned(table: str, session: sql_asyncio.AsyncSession) -> bool:
+    query = sqlalchemy.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid "
+        "WHERE pg_class.relname = :table)"
+    )
+    partitioned_exec = await session.execute(query, {"table": table})
+    return bool(partitioned_exec.scalar())
+
+
+async def async_find_partitions(
+    table: str, session: sql_asyncio.AsyncSession
+) -> list[tuple[str, datetime, datetime]]:
+    query = sqlalchemy.text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+        "FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    )
+    partitions_exec = await session.execute(query, {"table": table})
+    partitions: list[tuple[str, datetime, datetime]] = []
+    for name, bounds_expression in partitions_exec.all():
+        bounds = parse_partition_bounds(bounds_expression)
+        if bounds:
+            partitions.append((name, *bounds))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def async_ensure_partitions(
+    at_time: datetime,
+    session: sql_asyncio.AsyncSession,
+    periods_ahead: int = config.partitions_ahead,
+) -> None:
+    """
+    Creates partitions from at_time up to periods_ahead periods in future
+    """
+    partitioned_tables = [
+        table
+        for table in PARTITIONED_TABLES
+        if await _async_is_partitioned(table, session)
+    ]
+    start = get_partition_start(at_time)
+    for _ in range(periods_ahead + 1):
+        for table in partitioned_tables:
+            await session.execute(sqlalchemy.text(create_partition_sql(table, start)))
+        start = get_partition_end(start)
+    await session.commit()
+
+
+async def async_drop_expired_partitions(
+    before: datetime, session: sql_asyncio.AsyncSession
+) -> list[str]:
+    """
+    Detaches and drops whole partitions ending before given time
+    """
+    dropped: list[str] = []
+    for table in PARTITIONED_TABLES:
+        for name, _start, end in await async_find_partitions(table, session):
+            if end > before:
+                continue
+            await session.execute(
+                sqlalchemy.text(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            )
+            await session.execute(sqlalchemy.text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    await session.commit()
+    log.info(f"Dropped expired partitions: {dropped}")
+    return dropped
@@ -2,12 +2,18 @@ from datetime import datetime
 
 import sqlalchemy
 from defi_common.database import models
+from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext import asyncio as sql_asyncio
 
-from src import data, enums, exceptions, time_utils
+from src import data, enums, exceptions, metrics, snapshots, time_utils, tracing
+from src.database import models as platform_models
+from src.database import unit_of_work
 from src.exceptions import AddressAlreadyExistsError, AddressNotCreatedError
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_address(
     address: data.Address, session: sql_asyncio.AsyncSession
 ) -> models.Address | None:
@@ -20,6 +26,8 @@ async def async_find_address(
     return found.scalars().first()
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_save_address(
     address: data.Address, session: sql_asyncio.AsyncSession
 ) -> None:
@@ -30,22 +38,27 @@ async def async_save_address(
     if existing_address:
         raise AddressAlreadyExistsError()
     session.add(address_model)
-    await session.commit()
+    await unit_of_work.async_commit(session)
 
 
-async def async_save_aggregated_update(
-    update: data.AggregatedAsset,
-    address: data.Address,
-    session: sql_asyncio.AsyncSession,
-) -> None:
+@tracing.traced_async()
+async def _async_find_or_create_address(
+    address: data.Address, session: sql_asyncio.AsyncSession
+) -> models.Address:
     existing_address = await async_find_address(address, session)
     if not existing_address:
         await async_save_address(address, session)
         existing_address = await async_find_address(address, session)
     if not existing_address:
         raise AddressNotCreatedError()
+    return existing_address
+
+
+def _create_aggregated_model(
+    update: data.AggregatedAsset, address_model: models.Address
+) -> models.AggregatedBalanceUpdate:
     time_now = time_utils.get_datetime_from_ts(update.timestamp)
-    update_model = models.AggregatedBalanceUpdate(
+    return models.AggregatedBalanceUpdate(
         symbol=update.symbol,
         amount=update.amount,
         price=update.price,
@@ -55,13 +68,92 @@ async def async_save_aggregated_update(
         time_created=time_now,
         time_updated=time_now,
         time=time_now,
-        address=existing_address,
-        address_id=existing_address.id,
+        address=address_model,
+        address_id=address_model.id,
     )
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_aggregated_update(
+    update: data.AggregatedAsset,
+    address: data.Address,
+    session: sql_asyncio.AsyncSession,
+) -> None:
+    existing_address = await _async_find_or_create_address(address, session)
+    update_model = _create_aggregated_model(update, existing_address)
     session.add(update_model)
-    await session.commit()
+    await unit_of_work.async_commit(session)
 
 
+@tracing.traced_async()
+async def _async_find_last_snapshot(
+    address_id: int, session: sql_asyncio.AsyncSession
+) -> platform_models.AddressSnapshot | None:
+    query = (
+        sqlalchemy.select(platform_models.AddressSnapshot)
+        .where(platform_models.AddressSnapshot.address_id == address_id)
+        .order_by(platform_models.AddressSnapshot.timestamp.desc())
+        .limit(1)
+    )
+    snapshot_exec = await session.execute(query)
+    return snapshot_exec.scalars().first()  # type: ignore
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_delta_aggregated_updates(
+    updates: list[data.AggregatedAsset],
+    previous_updates: list[data.AggregatedAsset],
+    address: data.Address,
+    timestamp: int,
+    session: sql_asyncio.AsyncSession,
+) -> list[data.AggregatedAsset]:
+    """
+    Saves snapshot header and only assets which changed since previous snapshot,
+    full snapshot is written as keyframe once per keyframe interval. Returns
+    snapshot as it will be reconstructed from storage
+    """
+    existing_address = await _async_find_or_create_address(address, session)
+    last_snapshot = await _async_find_last_snapshot(existing_address.id, session)
+    previous_timestamp = previous_updates[0].timestamp if previous_updates else None
+    is_keyframe = (
+        last_snapshot is None
+        or snapshots.is_keyframe(timestamp, last_snapshot.timestamp)
+        # previous snapshot was written without delta storage
+        or previous_timestamp not in (None, last_snapshot.timestamp)
+    )
+    if is_keyframe:
+        updates_to_save = updates
+    else:
+        updates_to_save = snapshots.extract_changed_assets(
+            previous_updates, updates, timestamp
+        )
+    snapshot_time = time_utils.get_datetime_from_ts(timestamp)
+    snapshot_model = platform_models.AddressSnapshot(
+        timestamp=timestamp,
+        time=snapshot_time,
+        time_created=snapshot_time,
+        time_updated=snapshot_time,
+        value_usd=sum(update.value_usd for update in updates),
+        is_keyframe=is_keyframe,
+        address_id=existing_address.id,
+    )
+    session.add(snapshot_model)
+    session.add_all(
+        [
+            _create_aggregated_model(update, existing_address)
+            for update in updates_to_save
+        ]
+    )
+    await unit_of_work.async_commit(session)
+    if is_keyframe:
+        return updates
+    return snapshots.reconstruct_assets(previous_updates + updates_to_save, timestamp)
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_all_addresses(
     session: sql_asyncio.AsyncSession,
 ) -> list[models.Address]:
@@ -77,6 +169,8 @@ def convert_address_model(address_model: models.Address) -> data.Address:
     )
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_all_converted_addresses(
     session: sql_asyncio.AsyncSession,
 ) -> list[data.Address]:
@@ -86,6 +180,84 @@ async def async_find_all_converted_addresses(
     ]
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_address_ids(
+    session: sql_asyncio.AsyncSession,
+) -> dict[data.Address, int]:
+    """
+    Ids of all addresses read as plain rows, without loading models
+    """
+    query = sqlalchemy.select(
+        models.Address.address, models.Address.blockchain_type, models.Address.id
+    )
+    rows = await session.execute(query)
+    return {
+        data.Address(
+            address=address, blockchain_type=enums.BlockchainType(blockchain_type)
+        ): address_id
+        for address, blockchain_type, address_id in rows
+    }
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_addresses(
+    addresses: list[data.Address], session: sql_asyncio.AsyncSession
+) -> None:
+    """
+    Inserts addresses which are not stored yet in single statement
+    """
+    if not addresses:
+        return
+    time_now = datetime.now()
+    await session.execute(
+        sqlalchemy.insert(models.Address),
+        [
+            {
+                "address": address.address.lower(),
+                "blockchain_type": str(address.blockchain_type.value),
+                "time_created": time_now,
+                "time_updated": time_now,
+            }
+            for address in addresses
+        ],
+    )
+    await unit_of_work.async_commit(session)
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_aggregated_updates(
+    address_updates: list[tuple[data.Address, list[data.AggregatedAsset]]],
+    address_ids: dict[data.Address, int],
+    session: sql_asyncio.AsyncSession,
+) -> None:
+    """
+    Inserts assets of many addresses in single statement
+    """
+    rows = [
+        {
+            "symbol": update.symbol,
+            "amount": update.amount,
+            "price": update.price,
+            "value_usd": update.value_usd,
+            "value_pct": update.value_pct,
+            "timestamp": update.timestamp,
+            "time": time_utils.get_datetime_from_ts(update.timestamp),
+            "time_created": time_utils.get_datetime_from_ts(update.timestamp),
+            "time_updated": time_utils.get_datetime_from_ts(update.timestamp),
+            "address_id": address_ids[address],
+        }
+        for address, updates in address_updates
+        for update in updates
+    ]
+    if not rows:
+        return
+    await session.execute(sqlalchemy.insert(models.AggregatedBalanceUpdate), rows)
+    await unit_of_work.async_commit(session)
+
+
 def convert_aggregated_model(
     aggregated_balance_model: models.AggregatedBalanceUpdate,
 ) -> data.AggregatedAsset:
@@ -99,12 +271,92 @@ def convert_aggregated_model(
     )
 
 
+@tracing.traced_async()
+async def _async_find_reconstructed_updates(
+    address_id: int,
+    snapshot: platform_models.AddressSnapshot,
+    session: sql_asyncio.AsyncSession,
+) -> list[data.AggregatedAsset]:
+    keyframe_query = sqlalchemy.select(
+        sqlalchemy.func.max(platform_models.AddressSnapshot.timestamp)
+    ).where(
+        platform_models.AddressSnapshot.address_id == address_id,
+        platform_models.AddressSnapshot.is_keyframe.is_(True),
+        platform_models.AddressSnapshot.timestamp <= snapshot.timestamp,
+    )
+    keyframe_exec = await session.execute(keyframe_query)
+    keyframe_timestamp = keyframe_exec.scalar() or 0
+    # bounds on time let postgres prune partitions
+    stored_query = (
+        sqlalchemy.select(models.AggregatedBalanceUpdate)
+        .where(
+            models.AggregatedBalanceUpdate.address_id == address_id,
+            models.AggregatedBalanceUpdate.time
+            >= time_utils.get_datetime_from_ts(keyframe_timestamp),
+            models.AggregatedBalanceUpdate.time <= snapshot.time,
+            models.AggregatedBalanceUpdate.timestamp >= keyframe_timestamp,
+            models.AggregatedBalanceUpdate.timestamp <= snapshot.timestamp,
+        )
+        .order_by(
+            models.AggregatedBalanceUpdate.timestamp.asc(),
+            models.AggregatedBalanceUpdate.id.asc(),
+        )
+    )
+    stored_exec = await session.execute(stored_query)
+    stored_assets = [
+        convert_aggregated_model(model) for model in stored_exec.scalars().all()
+    ]
+    return snapshots.reconstruct_assets(stored_assets, snapshot.timestamp)
+
+
+@tracing.traced_async()
+async def _async_find_delta_snapshot(
+    address_id: int,
+    session: sql_asyncio.AsyncSession,
+    at_timestamp: float | None = None,
+) -> platform_models.AddressSnapshot | None:
+    """
+    Finds last snapshot header which is not older than last stored asset rows,
+    if there is none, snapshot was saved without delta storage
+    """
+    last_stored_query = sqlalchemy.select(
+        sqlalchemy.func.max(models.AggregatedBalanceUpdate.timestamp)
+    ).where(models.AggregatedBalanceUpdate.address_id == address_id)
+    query = sqlalchemy.select(platform_models.AddressSnapshot).where(
+        platform_models.AddressSnapshot.address_id == address_id
+    )
+    if at_timestamp is not None:
+        last_stored_query = last_stored_query.where(
+            models.AggregatedBalanceUpdate.time
+            <= time_utils.get_datetime_from_ts(at_timestamp),
+            models.AggregatedBalanceUpdate.timestamp <= at_timestamp,
+        )
+        query = query.where(platform_models.AddressSnapshot.timestamp <= at_timestamp)
+    query = (
+        query.where(
+            platform_models.AddressSnapshot.timestamp
+            >= sqlalchemy.func.coalesce(last_stored_query.scalar_subquery(), 0)
+        )
+        .order_by(platform_models.AddressSnapshot.timestamp.desc())
+        .limit(1)
+    )
+    snapshot_exec = await session.execute(query)
+    return snapshot_exec.scalars().first()  # type: ignore
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_address_last_aggregated_updates(
     address: data.Address, session: sql_asyncio.AsyncSession
 ) -> list[data.AggregatedAsset]:
     address_model = await async_find_address(address, session)
     if not address_model:
         raise exceptions.AddressNotFoundError()
+    delta_snapshot = await _async_find_delta_snapshot(address_model.id, session)
+    if delta_snapshot:
+        return await _async_find_reconstructed_updates(
+            address_model.id, delta_snapshot, session
+        )
     last_update_query = (
         sqlalchemy.select(models.AggregatedBalanceUpdate)
         .where(models.AggregatedBalanceUpdate.address_id == address_model.id)
@@ -117,6 +369,7 @@ async def async_find_address_last_aggregated_updates(
         return []
     last_update_time = last_update.timestamp
     all_last_time_query = sqlalchemy.select(models.AggregatedBalanceUpdate).where(
+        models.AggregatedBalanceUpdate.time == last_update.time,
         models.AggregatedBalanceUpdate.timestamp == last_update_time,
         models.AggregatedBalanceUpdate.address_id == address_model.id,
     )
@@ -125,15 +378,107 @@ async def async_find_address_last_aggregated_updates(
     return [convert_aggregated_model(model) for model in unconverted]
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_all_last_aggregated_updates(
+    session: sql_asyncio.AsyncSession,
+) -> dict[data.Address, list[data.AggregatedAsset]]:
+    """
+    Finds last snapshot of every address in one query, snapshots saved in delta
+    storage are reconstructed from rows since their keyframe
+    """
+    updates = models.AggregatedBalanceUpdate
+    snapshot = platform_models.AddressSnapshot
+    last_stored = (
+        sqlalchemy.select(
+            updates.address_id,
+            sqlalchemy.func.max(updates.timestamp).label("timestamp"),
+        )
+        .group_by(updates.address_id)
+        .subquery()
+    )
+    last_header = (
+        sqlalchemy.select(
+            snapshot.address_id,
+            sqlalchemy.func.max(snapshot.timestamp).label("timestamp"),
+        )
+        .group_by(snapshot.address_id)
+        .subquery()
+    )
+    last_keyframe = (
+        sqlalchemy.select(
+            snapshot.address_id,
+            sqlalchemy.func.max(snapshot.timestamp).label("timestamp"),
+        )
+        .where(snapshot.is_keyframe.is_(True))
+        .group_by(snapshot.address_id)
+        .subquery()
+    )
+    is_delta = last_header.c.timestamp >= last_stored.c.timestamp
+    query = (
+        sqlalchemy.select(updates, models.Address, last_header.c.timestamp)
+        .join(models.Address, models.Address.id == updates.address_id)
+        .join(last_stored, last_stored.c.address_id == updates.address_id)
+        .outerjoin(last_header, last_header.c.address_id == updates.address_id)
+        .outerjoin(last_keyframe, last_keyframe.c.address_id == updates.address_id)
+        .where(
+            sqlalchemy.or_(
+                sqlalchemy.and_(
+                    is_delta,
+                    updates.timestamp
+                    >= sqlalchemy.func.coalesce(last_keyframe.c.timestamp, 0),
+                ),
+                sqlalchemy.and_(
+                    sqlalchemy.not_(sqlalchemy.func.coalesce(is_delta, False)),
+                    updates.timestamp == last_stored.c.timestamp,
+                ),
+            )
+        )
+        .order_by(updates.address_id, updates.timestamp, updates.id)
+    )
+    updates_exec = await session.execute(query)
+    stored_by_address: dict[data.Address, list[data.AggregatedAsset]] = {}
+    delta_timestamps: dict[data.Address, int] = {}
+    for update_model, address_model, header_timestamp in updates_exec.all():
+        address = convert_address_model(address_model)
+        stored_by_address.setdefault(address, []).append(
+            convert_aggregated_model(update_model)
+        )
+        if header_timestamp is not None and header_timestamp >= update_model.timestamp:
+            delta_timestamps[address] = header_timestamp
+    last_updates: dict[data.Address, list[data.AggregatedAsset]] = {}
+    for address, stored_assets in stored_by_address.items():
+        if address in delta_timestamps:
+            last_updates[address] = snapshots.reconstruct_assets(
+                stored_assets, delta_timestamps[address]
+            )
+        else:
+            last_updates[address] = stored_assets
+    return last_updates
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_aggregated_updates(
     address: data.Address, at_time: datetime, session: sql_asyncio.AsyncSession
 ) -> list[data.AggregatedAsset]:
     address_model = await async_find_address(address, session)
     if not address_model:
         raise exceptions.AddressNotFoundError()
+    delta_snapshot = await _async_find_delta_snapshot(
+        address_model.id, session, at_timestamp=at_time.timestamp()
+    )
+    if delta_snapshot:
+        return await _async_find_reconstructed_updates(
+            address_model.id, delta_snapshot, session
+        )
     update_time_closest_to_wanted_time_query = (
         sqlalchemy.select(models.AggregatedBalanceUpdate)
-        .where(models.AggregatedBalanceUpdate.timestamp <= at_time.timestamp())
+        .where(
+            models.AggregatedBalanceUpdate.address_id == address_model.id,
+            models.AggregatedBalanceUpdate.time <= at_time,
+            models.AggregatedBalanceUpdate.timestamp <= at_time.timestamp(),
+        )
         .order_by(models.AggregatedBalanceUpdate.timestamp.desc())
         .limit(1)
     )
@@ -145,12 +490,15 @@ async def async_find_aggregated_updates(
     wanted_time = time_update.timestamp
     updates_query = sqlalchemy.select(models.AggregatedBalanceUpdate).where(
         models.AggregatedBalanceUpdate.address_id == address_model.id,
+        models.AggregatedBalanceUpdate.time == time_update.time,
         models.AggregatedBalanceUpdate.timestamp == wanted_time,
     )
     updates_exec = await session.execute(updates_query)
     return [convert_aggregated_model(model) for model in updates_exec.scalars().all()]
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_save_performance_result(
     performance_data: data.PerformanceResult, session: sql_asyncio.AsyncSession
 ) -> None:
@@ -164,7 +512,32 @@ async def async_save_performance_result(
         performance=performance_data.performance,
     )
     session.add(performance_model)
-    await session.commit()
+    await unit_of_work.async_commit(session)
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_performance_results(
+    performances: list[data.PerformanceResult],
+    session: sql_asyncio.AsyncSession,
+    address_ids: dict[data.Address, int] | None = None,
+) -> None:
+    if address_ids is None:
+        address_ids = await async_find_address_ids(session)
+    session.add_all(
+        [
+            models.PerformanceRunResult(
+                time_created=datetime.now(),
+                time_updated=datetime.now(),
+                start_time=performance_data.start_time,
+                end_time=performance_data.end_time,
+                address_id=address_ids[performance_data.address],
+                performance=performance_data.performance,
+            )
+            for performance_data in performances
+        ]
+    )
+    await unit_of_work.async_commit(session)
 
 
 def convert_performance_model(
@@ -179,6 +552,8 @@ def convert_performance_model(
     )
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_performance_results(
     address: data.Address,
     start_datetime: datetime,
@@ -188,10 +563,15 @@ async def async_find_performance_results(
     model_address = await async_find_address(address, session)
     if not model_address:
         raise exceptions.AddressNotFoundError()
-    query = sqlalchemy.select(models.PerformanceRunResult).where(
-        models.PerformanceRunResult.address_id == model_address.id,
-        models.PerformanceRunResult.start_time >= start_datetime,
-        models.PerformanceRunResult.end_time <= end_datetime,
+    query = (
+        sqlalchemy.select(models.PerformanceRunResult)
+        .options(orm.joinedload(models.PerformanceRunResult.address))
+        .where(
+            models.PerformanceRunResult.address_id == model_address.id,
+            models.PerformanceRunResult.start_time >= start_datetime,
+            models.PerformanceRunResult.end_time >= start_datetime,
+            models.PerformanceRunResult.end_time <= end_datetime,
+        )
     )
     exec_stmt = await session.execute(query)
 
@@ -202,6 +582,160 @@ async def async_find_performance_results(
     ]
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_all_performance_series(
+    start_datetime: datetime,
+    end_datetime: datetime,
+    session: sql_asyncio.AsyncSession,
+) -> dict[data.Address, list[float]]:
+    """
+    Performances of all addresses within time range ordered by end time,
+    loaded in single query
+    """
+    query = (
+        sqlalchemy.select(models.Address, models.PerformanceRunResult.performance)
+        .join(
+            models.PerformanceRunResult,
+            models.PerformanceRunResult.address_id == models.Address.id,
+        )
+        .where(
+            models.PerformanceRunResult.start_time >= start_datetime,
+            models.PerformanceRunResult.end_time >= start_datetime,
+            models.PerformanceRunResult.end_time <= end_datetime,
+        )
+        .order_by(models.Address.id, models.PerformanceRunResult.end_time)
+    )
+    exec_stmt = await session.execute(query)
+    series: dict[data.Address, list[float]] = {}
+    for address_model, performance in exec_stmt.all():
+        address = convert_address_model(address_model)
+        series.setdefault(address, []).append(performance)
+    return series
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_all_performance_periods(
+    start_datetime: datetime,
+    end_datetime: datetime,
+    session: sql_asyncio.AsyncSession,
+) -> dict[data.Address, list[tuple[float, float]]]:
+    """
+    Performances of all addresses with hours of their periods within time
+    range ordered by end time, loaded in single query
+    """
+    query = (
+        sqlalchemy.select(
+            models.Address.address,
+            models.Address.blockchain_type,
+            models.PerformanceRunResult.performance,
+            models.PerformanceRunResult.start_time,
+            models.PerformanceRunResult.end_time,
+        )
+        .join(
+            models.PerformanceRunResult,
+            models.PerformanceRunResult.address_id == models.Address.id,
+        )
+        .where(
+            models.PerformanceRunResult.start_time >= start_datetime,
+            models.PerformanceRunResult.end_time >= start_datetime,
+            models.PerformanceRunResult.end_time <= end_datetime,
+        )
+        .order_by(models.Address.id, models.PerformanceRunResult.end_time)
+    )
+    exec_stmt = await session.execute(query)
+    series: dict[data.Address, list[tuple[float, float]]] = {}
+    for address, blockchain_type, performance, start_time, end_time in exec_stmt:
+        series.setdefault(
+            data.Address(
+                address=address, blockchain_type=enums.BlockchainType(blockchain_type)
+            ),
+            [],
+        ).append((performance, (end_time - start_time).total_seconds() / 3600.0))
+    return series
+
+
+def convert_performance_analytics_model(
+    analytics_model: platform_models.AddressPerformanceAnalytics,
+    address_model: models.Address,
+) -> data.PerformanceAnalytics:
+    return data.PerformanceAnalytics(
+        address=convert_address_model(address_model),
+        ranking_type=enums.RunTimeType(analytics_model.ranking_type),
+        time=analytics_model.time,
+        window_hours=analytics_model.window_hours,
+        periods=analytics_model.periods,
+        compounded_return=analytics_model.compounded_return,
+        volatility=analytics_model.volatility,
+        max_drawdown=analytics_model.max_drawdown,
+        sharpe_ratio=analytics_model.sharpe_ratio,
+        sortino_ratio=analytics_model.sortino_ratio,
+    )
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_performance_analytics(
+    ranking_type: enums.RunTimeType,
+    time: datetime,
+    session: sql_asyncio.AsyncSession,
+) -> list[data.PerformanceAnalytics]:
+    query = (
+        sqlalchemy.select(platform_models.AddressPerformanceAnalytics, models.Address)
+        .join(
+            models.Address,
+            platform_models.AddressPerformanceAnalytics.address_id == models.Address.id,
+        )
+        .where(
+            platform_models.AddressPerformanceAnalytics.time == time,
+            platform_models.AddressPerformanceAnalytics.ranking_type
+            == ranking_type.value,
+        )
+    )
+    exec_stmt = await session.execute(query)
+    return [
+        convert_performance_analytics_model(analytics_model, address_model)
+        for analytics_model, address_model in exec_stmt.all()
+    ]
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_performance_analytics(
+    analytics: list[data.PerformanceAnalytics], session: sql_asyncio.AsyncSession
+) -> None:
+    exec_stmt = await session.execute(
+        sqlalchemy.select(
+            models.Address.address, models.Address.blockchain_type, models.Address.id
+        )
+    )
+    address_ids = {
+        data.Address(
+            address=address, blockchain_type=enums.BlockchainType(blockchain_type)
+        ): address_id
+        for address, blockchain_type, address_id in exec_stmt
+    }
+    session.add_all(
+        [
+            platform_models.AddressPerformanceAnalytics(
+                time=single_analytics.time,
+                ranking_type=str(single_analytics.ranking_type.value),
+                window_hours=single_analytics.window_hours,
+                periods=single_analytics.periods,
+                compounded_return=single_analytics.compounded_return,
+                volatility=single_analytics.volatility,
+                max_drawdown=single_analytics.max_drawdown,
+                sharpe_ratio=single_analytics.sharpe_ratio,
+                sortino_ratio=single_analytics.sortino_ratio,
+                address_id=address_ids[single_analytics.address],
+            )
+            for single_analytics in analytics
+        ]
+    )
+    await unit_of_work.async_commit(session)
+
+
 def convert_address_rank_model(
     rank_model: models.AddressPerformanceRank,
 ) -> data.AddressPerformanceRank:
@@ -214,20 +748,78 @@ def convert_address_rank_model(
     )
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_address_rankings(
     ranking_type: enums.RunTimeType,
     time: datetime,
     session: sql_asyncio.AsyncSession,
+    after_rank: int = 0,
+    limit: int | None = None,
+) -> list[data.AddressPerformanceRank]:
+    """
+    Ranks ordered from best, page starts after given rank
+    """
+    query = (
+        sqlalchemy.select(models.AddressPerformanceRank)
+        .options(orm.joinedload(models.AddressPerformanceRank.address))
+        .where(
+            models.AddressPerformanceRank.time == time,
+            models.AddressPerformanceRank.ranking_type == ranking_type.value,
+            models.AddressPerformanceRank.rank > after_rank,
+        )
+        .order_by(models.AddressPerformanceRank.rank)
+        .limit(limit)
+    )
+    query_exec = await session.execute(query)
+    rank_models = query_exec.scalars().all()
+    return [convert_address_rank_model(rank_model) for rank_model in rank_models]
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_last_address_ranking_time(
+    ranking_type: enums.RunTimeType, session: sql_asyncio.AsyncSession
+) -> datetime | None:
+    query = sqlalchemy.select(
+        sqlalchemy.func.max(models.AddressPerformanceRank.time)
+    ).where(models.AddressPerformanceRank.ranking_type == ranking_type.value)
+    return (await session.execute(query)).scalar()
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_address_rank_history(
+    address: data.Address,
+    ranking_type: enums.RunTimeType,
+    session: sql_asyncio.AsyncSession,
+    before: datetime | None = None,
+    limit: int | None = None,
 ) -> list[data.AddressPerformanceRank]:
-    query = sqlalchemy.select(models.AddressPerformanceRank).where(
-        models.AddressPerformanceRank.time == time,
-        models.AddressPerformanceRank.ranking_type == ranking_type.value,
+    """
+    Ranks of address from newest, page starts before given time
+    """
+    query = (
+        sqlalchemy.select(models.AddressPerformanceRank)
+        .join(models.AddressPerformanceRank.address)
+        .options(orm.contains_eager(models.AddressPerformanceRank.address))
+        .where(
+            models.Address.address == address.address.lower(),
+            models.Address.blockchain_type == str(address.blockchain_type.value),
+            models.AddressPerformanceRank.ranking_type == ranking_type.value,
+        )
+        .order_by(models.AddressPerformanceRank.time.desc())
+        .limit(limit)
     )
+    if before is not None:
+        query = query.where(models.AddressPerformanceRank.time < before)
     query_exec = await session.execute(query)
     rank_models = query_exec.scalars().all()
     return [convert_address_rank_model(rank_model) for rank_model in rank_models]
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_convert_address_rank_to_model(
     address_rank: data.AddressPerformanceRank, session: sql_asyncio.AsyncSession
 ) -> models.AddressPerformanceRank:
@@ -244,6 +836,8 @@ async def async_convert_address_rank_to_model(
     )
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_save_address_ranks(
     address_ranks: list[data.AddressPerformanceRank], session: sql_asyncio.AsyncSession
 ) -> None:
@@ -252,9 +846,11 @@ async def async_save_address_ranks(
         for address_rank in address_ranks
     ]
     session.add_all(rank_models)
-    await session.commit()
+    await unit_of_work.async_commit(session)
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_save_coin_changes(
     coin_changes_list: list[data.AssetOwnedChange],
     save_time: datetime,
@@ -272,7 +868,7 @@ async def async_save_coin_changes(
         )
         to_save.append(coin_change_rank)
     session.add_all(to_save)
-    await session.commit()
+    await unit_of_work.async_commit(session)
 
 
 def convert_coin_change_model(model: models.CoinChangeRank) -> data.AssetOwnedChange:
@@ -285,12 +881,178 @@ def convert_coin_change_model(model: models.CoinChangeRank) -> data.AssetOwnedCh
     )
 
 
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
 async def async_find_coin_ranking_by_time(
-    at_time: datetime, session: sql_asyncio.AsyncSession
+    at_time: datetime,
+    session: sql_asyncio.AsyncSession,
+    ranking_type: enums.RunTimeType | None = None,
+    after_rank: int = 0,
+    limit: int | None = None,
 ) -> list[data.AssetOwnedChange]:
-    query = sqlalchemy.select(models.CoinChangeRank).where(
-        models.CoinChangeRank.time == at_time
+    query = (
+        sqlalchemy.select(models.CoinChangeRank)
+        .where(
+            models.CoinChangeRank.time == at_time,
+            models.CoinChangeRank.rank > after_rank,
+        )
+        .order_by(models.CoinChangeRank.rank)
+        .limit(limit)
     )
+    if ranking_type is not None:
+        query = query.where(models.CoinChangeRank.ranking_type == ranking_type.value)
     coin_change_exec = await session.execute(query)
     coin_rank_models = coin_change_exec.scalars().all()
     return [convert_coin_change_model(model) for model in coin_rank_models]
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_last_coin_ranking_time(
+    ranking_type: enums.RunTimeType, session: sql_asyncio.AsyncSession
+) -> datetime | None:
+    query = sqlalchemy.select(sqlalchemy.func.max(models.CoinChangeRank.time)).where(
+        models.CoinChangeRank.ranking_type == ranking_type.value
+    )
+    return (await session.execute(query)).scalar()
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_symbol_holdings(
+    holdings: list[data.SymbolHolding],
+    session: sql_asyncio.AsyncSession,
+    address_ids: dict[data.Address, int] | None = None,
+) -> None:
+    """
+    Upserts index entries, later snapshot of bucket overwrites allocation but
+    keeps allocation from before bucket
+    """
+    if not holdings:
+        return
+    if address_ids is None:
+        address_ids = {}
+        for holding in holdings:
+            if holding.address not in address_ids:
+                address_model = await _async_find_or_create_address(
+                    holding.address, session
+                )
+                address_ids[holding.address] = address_model.id
+    table = platform_models.SymbolHolding.__table__
+    insert = postgresql.insert(table)
+    upsert = insert.on_conflict_do_update(
+        constraint="uq_symbol_holdings_entry",
+        set_={
+            "timestamp": insert.excluded.timestamp,
+            "amount": insert.excluded.amount,
+            "value_usd": insert.excluded.value_usd,
+            "value_pct": insert.excluded.value_pct,
+        },
+        where=table.c.timestamp <= insert.excluded.timestamp,
+    )
+    await session.execute(
+        upsert,
+        [
+            {
+                "symbol": holding.symbol,
+                "bucket": holding.bucket,
+                "timestamp": holding.timestamp,
+                "amount": holding.amount,
+                "value_usd": holding.value_usd,
+                "value_pct": holding.value_pct,
+                "previous_value_pct": holding.previous_value_pct,
+                "address_id": address_ids[holding.address],
+            }
+            for holding in holdings
+        ],
+    )
+    await unit_of_work.async_commit(session)
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_symbol_holdings(
+    symbol: str, bucket: datetime, session: sql_asyncio.AsyncSession
+) -> list[data.SymbolHolding]:
+    """
+    Index entries of symbol in bucket, largest holders first
+    """
+    holding = platform_models.SymbolHolding
+    query = (
+        sqlalchemy.select(
+            holding, models.Address.address, models.Address.blockchain_type
+        )
+        .join(models.Address, models.Address.id == holding.address_id)
+        .where(holding.symbol == symbol, holding.bucket == bucket)
+        .order_by(holding.value_usd.desc())
+    )
+    return [
+        data.SymbolHolding(
+            address=data.Address(
+                address=address, blockchain_type=enums.BlockchainType(blockchain_type)
+            ),
+            symbol=model.symbol,
+            bucket=model.bucket,
+            amount=model.amount,
+            value_usd=model.value_usd,
+            value_pct=model.value_pct,
+            previous_value_pct=model.previous_value_pct,
+            timestamp=model.timestamp,
+        )
+        for model, address, blockchain_type in await session.execute(query)
+    ]
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_symbol_changes(
+    first_bucket: datetime, last_bucket: datetime, session: sql_asyncio.AsyncSession
+) -> dict[str, float]:
+    """
+    Sums of allocation changes of every symbol over buckets between both ones
+    """
+    holding = platform_models.SymbolHolding
+    query = (
+        sqlalchemy.select(
+            holding.symbol,
+            sqlalchemy.func.sum(holding.value_pct - holding.previous_value_pct),
+        )
+        .where(holding.bucket >= first_bucket, holding.bucket <= last_bucket)
+        .group_by(holding.symbol)
+    )
+    return {symbol: change for symbol, change in await session.execute(query)}
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_count_addresses(session: sql_asyncio.AsyncSession) -> int:
+    query = sqlalchemy.select(sqlalchemy.func.count()).select_from(models.Address)
+    return (await session.execute(query)).scalar()  # type: ignore
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_find_downsampled_until(
+    bucket_seconds: int, session: sql_asyncio.AsyncSession
+) -> datetime | None:
+    query = sqlalchemy.select(
+        platform_models.RetentionWatermark.downsampled_until
+    ).where(platform_models.RetentionWatermark.bucket_seconds == bucket_seconds)
+    return (await session.execute(query)).scalar()
+
+
+@metrics.timed_async(metrics.DB_QUERY_SECONDS)
+@tracing.traced_async()
+async def async_save_downsampled_until(
+    bucket_seconds: int, downsampled_until: datetime, session: sql_asyncio.AsyncSession
+) -> None:
+    insert = postgresql.insert(platform_models.RetentionWatermark.__table__).values(
+        bucket_seconds=bucket_seconds, downsampled_until=downsampled_until
+    )
+    await session.execute(
+        insert.on_conflict_do_update(
+            index_elements=["bucket_seconds"],
+            set_={"downsampled_until": insert.excluded.downsampled_until},
+        )
+    )
+    await unit_of_work.async_commit(session)
@@ -0,0 +1,117 @@
+"""
+Grouping of service writes into shared transactions
+
+While unit of work is open on session, services flush instead of committing.
+Writes of each address run in savepoint, so failed address is rolled back
+alone, and transaction is committed once every batch_size addresses.
+In-memory effects of writes are deferred until transaction holding them is
+committed and dropped when their writes are rolled back.
+"""
+import contextlib
+import logging
+import typing
+
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import metrics
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+_SESSION_KEY = "unit_of_work"
+
+
+def is_active(session: sql_asyncio.AsyncSession) -> bool:
+    return _SESSION_KEY in session.info
+
+
+async def async_commit(session: sql_asyncio.AsyncSession) -> None:
+    """
+    Commits session, inside unit of work only flushes pending writes
+    """
+    if is_active(session):
+        await session.flush()
+        return
+    await session.commit()
+    metrics.DB_COMMITS_TOTAL.inc()
+
+
+def defer(session: sql_asyncio.AsyncSession, effect: typing.Callable[[], None]) -> None:
+    """
+    Runs effect once writes made so far on session are committed, outside of
+    unit of work they already are
+    """
+    if is_active(session):
+        session.info[_SESSION_KEY].defer(effect)
+        return
+    effect()
+
+
+class UnitOfWork:
+    def __init__(
+        self,
+        session: sql_asyncio.AsyncSession,
+        batch_size: int = config.unit_of_work_batch_size,
+    ) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.failed_count = 0
+        self._pending_count = 0
+        self._pending_effects: list[typing.Callable[[], None]] = []
+        self._scope_effects: list[typing.Callable[[], None]] | None = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session.info[_SESSION_KEY] = self
+        return self
+
+    async def __aexit__(self, exc_type: typing.Any, *args: typing.Any) -> None:
+        del self.session.info[_SESSION_KEY]
+        if exc_type is not None:
+            self._pending_effects.clear()
+            await self.session.rollback()
+            return
+        await self.async_commit()
+
+    def defer(self, effect: typing.Callable[[], None]) -> None:
+        if self._scope_effects is not None:
+            self._scope_effects.append(effect)
+        else:
+            self._pending_effects.append(effect)
+
+    async def async_commit(self) -> None:
+        effects = self._pending_effects
+        self._pending_effects = []
+        if self._pending_count == 0 and not self.session.in_transaction():
+            for effect in effects:
+                effect()
+            return
+        await self.session.commit()
+        metrics.DB_COMMITS_TOTAL.inc()
+        self._pending_count = 0
+        for effect in effects:
+            effect()
+
+    @contextlib.asynccontextmanager
+    async def async_scope(self, name: str) -> typing.AsyncIterator[None]:
+        """
+        Runs writes of scope in savepoint, exception of scope rolls back just
+        this scope and is logged
+        """
+        savepoint = await self.session.begin_nested()
+        self._scope_effects = []
+        try:
+            yield
+            await self.session.flush()
+        except Exception as e:
+            await savepoint.rollback()
+            self.failed_count += 1
+            log.error(f"Rolled back writes of {name}, e: {e!r}")
+            return
+        finally:
+            scope_effects = self._scope_effects
+            self._scope_effects = None
+        await savepoint.commit()
+        self._pending_effects.extend(scope_effects)
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            await self.async_commit()
@@ -21,3 +21,20 @@ class BlockchainType(str, enum.Enum):
 class RunTimeType(str, enum.Enum):
     HOUR = "HOUR"
     DAY = "DAY"
+
+
+class PartitionPeriod(str, enum.Enum):
+    DAY = "DAY"
+    WEEK = "WEEK"
+
+
+class TraceExporterType(str, enum.Enum):
+    NONE = "NONE"
+    FILE = "FILE"
+    OTLP = "OTLP"
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
@@ -18,6 +18,10 @@ class InvalidHttpResponseError(Exception):
     pass
 
 
+class CircuitOpenError(InvalidHttpResponseError):
+    pass
+
+
 class UnknownEnumError(Exception):
     pass
 
@@ -0,0 +1,341 @@
+"""
+Incremental export of history tables to day partitioned parquet files, so
+offline analytics never have to query production database
+
+Rows are streamed with server side cursor in batches, each table keeps
+watermark of last exported id. Rows are selected by id alone, up to highest id
+seen at least export lag ago, so rows inserted late with old time or committed
+out of order are still exported. Files are laid out as
+<export_dir>/<table>/date=YYYY-MM-DD/part-<first id>-<last id>.parquet
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import pyarrow
+import sqlalchemy
+from defi_common.database import models
+from pyarrow import parquet
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import data, enums, snapshots
+from src.config import config
+from src.database import models as platform_models
+
+log = logging.getLogger(__name__)
+
+WATERMARKS_FILE = "_watermarks.json"
+
+
+class ExportedTable:
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        time_column: str,
+        columns: list[Any],
+        with_address: bool = True,
+    ) -> None:
+        self.name = name
+        self.model = model
+        self.time_column = time_column
+        self.columns = columns
+        self.with_address = with_address
+
+    def create_query(self, last_id: int, settled_id: int) -> Any:
+        columns = [self.model.id, *self.columns]
+        if self.with_address:
+            columns += [models.Address.address, models.Address.blockchain_type]
+        query = sqlalchemy.select(*columns)
+        if self.with_address:
+            query = query.join(
+                models.Address, models.Address.id == self.model.address_id
+            )
+        query = query.where(self.model.id > last_id, self.model.id <= settled_id)
+        return query.order_by(self.model.id)
+
+
+EXPORTED_TABLES = [
+    ExportedTable(
+        "address_updates",
+        models.AggregatedBalanceUpdate,
+        "time",
+        [
+            models.AggregatedBalanceUpdate.symbol,
+            models.AggregatedBalanceUpdate.amount,
+            models.AggregatedBalanceUpdate.price,
+            models.AggregatedBalanceUpdate.value_usd,
+            models.AggregatedBalanceUpdate.value_pct,
+            models.AggregatedBalanceUpdate.timestamp,
+            models.AggregatedBalanceUpdate.time,
+        ],
+    ),
+    ExportedTable(
+        "address_snapshots",
+        platform_models.AddressSnapshot,
+        "time",
+        [
+            platform_models.AddressSnapshot.timestamp,
+            platform_models.AddressSnapshot.time,
+            platform_models.AddressSnapshot.value_usd,
+            platform_models.AddressSnapshot.is_keyframe,
+        ],
+    ),
+    ExportedTable(
+        "performance_run_results",
+        models.PerformanceRunResult,
+        "end_time",
+        [
+            models.PerformanceRunResult.performance,
+            models.PerformanceRunResult.start_time,
+            models.PerformanceRunResult.end_time,
+        ],
+    ),
+    ExportedTable(
+        "address_performance_rank",
+        models.AddressPerformanceRank,
+        "time",
+        [
+            models.AddressPerformanceRank.performance,
+            models.AddressPerformanceRank.time,
+            models.AddressPerformanceRank.ranking_type,
+            models.AddressPerformanceRank.rank,
+        ],
+    ),
+    ExportedTable(
+        "coin_rank",
+        models.CoinChangeRank,
+        "time",
+        [
+            models.CoinChangeRank.symbol,
+            models.CoinChangeRank.rank,
+            models.CoinChangeRank.time,
+            models.CoinChangeRank.pct_change,
+            models.CoinChangeRank.ranking_type,
+        ],
+        with_address=False,
+    ),
+]
+
+
+def _read_watermarks(export_dir: str) -> dict[str, dict[str, Any]]:
+    path = os.path.join(export_dir, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as watermarks_file:
+        return json.load(watermarks_file)  # type: ignore
+
+
+def _write_watermarks(export_dir: str, watermarks: dict[str, dict[str, Any]]) -> None:
+    path = os.path.join(export_dir, WATERMARKS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as watermarks_file:
+        json.dump(watermarks, watermarks_file)
+    os.replace(tmp_path, path)
+
+
+def write_batch(
+    export_dir: str, table: str, time_column: str, rows: list[dict[str, Any]]
+) -> list[str]:
+    """
+    Writes batch of rows into one parquet file per day
+    """
+    rows_by_day: dict[date, list[dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        rows_by_day[row[time_column].date()].append(row)
+    written: list[str] = []
+    for day, day_rows in rows_by_day.items():
+        day_dir = os.path.join(export_dir, table, f"date={day.isoformat()}")
+        os.makedirs(day_dir, exist_ok=True)
+        path = os.path.join(
+            day_dir, f"part-{day_rows[0]['id']}-{day_rows[-1]['id']}.parquet"
+        )
+        parquet.write_table(pyarrow.Table.from_pylist(day_rows), path)
+        written.append(path)
+    return written
+
+
+async def async_export_table(
+    exported_table: ExportedTable,
+    session: sql_asyncio.AsyncSession,
+    export_dir: str = config.export_dir,
+    batch_size: int = config.export_batch_size,
+    now: datetime | None = None,
+) -> int:
+    """
+    Exports rows newer than watermark up to highest id seen export_lag_minutes
+    ago, transactions which were still in flight then have committed since
+    """
+    if not now:
+        now = datetime.now()
+    watermarks = _read_watermarks(export_dir)
+    watermark = watermarks.get(exported_table.name, {"id": 0})
+    max_id_exec = await session.execute(
+        sqlalchemy.select(sqlalchemy.func.max(exported_table.model.id))
+    )
+    settled_since = now - timedelta(minutes=config.export_lag_minutes)
+    seen_ids = [
+        *watermark.get("seen_ids", []),
+        [max_id_exec.scalar() or 0, now.isoformat()],
+    ]
+    settled_id = max(
+        (
+            seen_id
+            for seen_id, seen_time in seen_ids
+            if datetime.fromisoformat(seen_time) <= settled_since
+        ),
+        default=watermark["id"],
+    )
+    watermark = {
+        "id": watermark["id"],
+        "seen_ids": [
+            [seen_id, seen_time]
+            for seen_id, seen_time in seen_ids
+            if datetime.fromisoformat(seen_time) > settled_since
+        ],
+    }
+    watermarks[exported_table.name] = watermark
+    query = exported_table.create_query(watermark["id"], settled_id)
+    exported = 0
+    stream = await session.stream(query.execution_options(yield_per=batch_size))
+    async for partition in stream.mappings().partitions(batch_size):
+        rows = [dict(row) for row in partition]
+        write_batch(export_dir, exported_table.name, exported_table.time_column, rows)
+        watermark["id"] = rows[-1]["id"]
+        _write_watermarks(export_dir, watermarks)
+        exported += len(rows)
+    _write_watermarks(export_dir, watermarks)
+    log.info(f"Exported {exported} rows of {exported_table.name}")
+    return exported
+
+
+async def async_export_all_tables(
+    session: sql_asyncio.AsyncSession, export_dir: str = config.export_dir
+) -> None:
+    os.makedirs(export_dir, exist_ok=True)
+    for exported_table in EXPORTED_TABLES:
+        await async_export_table(exported_table, session, export_dir)
+
+
+def _read_rows(
+    export_dir: str, table: str, start_date: date, end_date: date
+) -> list[dict[str, Any]]:
+    table_dir = os.path.join(export_dir, table)
+    rows_by_id: dict[int, dict[str, Any]] = {}
+    day = start_date
+    while day <= end_date:
+        day_dir = os.path.join(table_dir, f"date={day.isoformat()}")
+        if os.path.isdir(day_dir):
+            for file_name in sorted(os.listdir(day_dir)):
+                for row in parquet.read_table(
+                    os.path.join(day_dir, file_name)
+                ).to_pylist():
+                    rows_by_id[row["id"]] = row  # re-exported batches overlap
+        day += timedelta(days=1)
+    return [rows_by_id[row_id] for row_id in sorted(rows_by_id)]
+
+
+def _create_address(row: dict[str, Any]) -> data.Address:
+    return data.Address(
+        address=row["address"],
+        blockchain_type=enums.BlockchainType(row["blockchain_type"]),
+    )
+
+
+def load_address_snapshots(
+    start_date: date, end_date: date, export_dir: str = config.export_dir
+) -> dict[data.Address, dict[int, list[data.AggregatedAsset]]]:
+    """
+    Loads full snapshots of every address keyed by snapshot timestamp, snapshots
+    saved in delta storage are reconstructed from their keyframe
+    """
+    headers: dict[data.Address, dict[int, bool]] = defaultdict(dict)
+    for row in _read_rows(export_dir, "address_snapshots", start_date, end_date):
+        headers[_create_address(row)][row["timestamp"]] = row["is_keyframe"]
+    stored: dict[data.Address, dict[int, list[data.AggregatedAsset]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for row in _read_rows(export_dir, "address_updates", start_date, end_date):
+        stored[_create_address(row)][row["timestamp"]].append(
+            data.AggregatedAsset(
+                symbol=row["symbol"],
+                amount=row["amount"],
+                price=row["price"],
+                value_usd=row["value_usd"],
+                value_pct=row["value_pct"],
+                timestamp=row["timestamp"],
+            )
+        )
+    result: dict[data.Address, dict[int, list[data.AggregatedAsset]]] = {}
+    for address in stored.keys() | headers.keys():
+        address_headers = headers.get(address, {})
+        address_stored = stored.get(address, {})
+        address_snapshots: dict[int, list[data.AggregatedAsset]] = {}
+        delta_assets: list[data.AggregatedAsset] | None = None
+        for timestamp in sorted(address_stored.keys() | address_headers.keys()):
+            assets = address_stored.get(timestamp, [])
+            if timestamp not in address_headers:
+                address_snapshots[timestamp] = assets
+                delta_assets = None
+                continue
+            if address_headers[timestamp]:
+                delta_assets = []
+            if delta_assets is None:
+                continue  # keyframe of this delta snapshot was not loaded
+            delta_assets.extend(assets)
+            address_snapshots[timestamp] = snapshots.reconstruct_assets(
+                delta_assets, timestamp
+            )
+        result[address] = address_snapshots
+    return result
+
+
+def load_performance_results(
+    start_date: date, end_date: date, export_dir: str = config.export_dir
+) -> list[data.PerformanceResult]:
+    return [
+        data.PerformanceResult(
+            performance=row["performance"],
+            start_time=row["start_time"],
+            end_time=row["end_time"],
+            address=_create_address(row),
+        )
+        for row in _read_rows(
+            export_dir, "performance_run_results", start_date, end_date
+        )
+    ]
+
+
+def load_address_ranks(
+    start_date: date, end_date: date, export_dir: str = config.export_dir
+) -> list[data.AddressPerformanceRank]:
+    return [
+        data.AddressPerformanceRank(
+            address=_create_address(row),
+            ranking_type=enums.RunTimeType(row["ranking_type"]),
+            time=row["time"],
+            avg_performance=row["performance"],
+            rank=row["rank"],
+        )
+        for row in _read_rows(
+            export_dir, "address_performance_rank", start_date, end_date
+        )
+    ]
+
+
+def load_coin_ranks(
+    start_date: date, end_date: date, export_dir: str = config.export_dir
+) -> list[data.AssetOwnedChange]:
+    return [
+        data.AssetOwnedChange(
+            time=row["time"],
+            rank=row["rank"],
+            symbol=row["symbol"],
+            pct_change=row["pct_change"],
+            run_type=enums.RunTimeType(row["ranking_type"]),
+        )
+        for row in _read_rows(export_dir, "coin_rank", start_date, end_date)
+    ]
@@ -0,0 +1,105 @@
+"""
+Symbol holdings index, answering who holds symbol and how allocations changed
+without reading balance history
+
+Entry of (symbol, hour bucket, address) holds allocation of symbol in last
+snapshot of address in that bucket, together with allocation before first
+snapshot of bucket. Bucket of snapshot is the hour it ends, so snapshot at
+full hour closes that hour. Change of allocation over window is then sum of
+changes of its buckets. Symbol dropped from snapshot gets entry with zero
+allocation, first snapshot of address only sets baseline without change.
+"""
+import math
+from datetime import datetime, timedelta
+
+from src import compaction, data, time_utils, token_registry
+
+BUCKET_SECONDS = 60 * 60
+
+
+def get_bucket_time(timestamp: int) -> datetime:
+    return time_utils.get_datetime_from_ts(
+        math.ceil(timestamp / BUCKET_SECONDS) * BUCKET_SECONDS
+    )
+
+
+def get_window_buckets(
+    start_time: datetime, end_time: datetime
+) -> tuple[datetime, datetime]:
+    """
+    Returns first and last bucket of changes between times, windows are
+    rounded down to whole buckets
+    """
+    start_bucket = start_time.replace(minute=0, second=0, microsecond=0)
+    end_bucket = end_time.replace(minute=0, second=0, microsecond=0)
+    return start_bucket + timedelta(seconds=BUCKET_SECONDS), end_bucket
+
+
+def _get_allocations(
+    assets: list[data.AggregatedAsset],
+) -> dict[str, data.AggregatedAsset]:
+    allocations: dict[str, data.AggregatedAsset] = {}
+    for asset in assets:
+        # bucket of collapsed dust is not a symbol
+        if asset.symbol == compaction.OTHER_SYMBOL:
+            continue
+        symbol = token_registry.normalize_symbol(asset.symbol)
+        allocation = allocations.get(symbol)
+        if allocation is not None:
+            asset = allocation.copy(
+                update={
+                    "amount": allocation.amount + asset.amount,
+                    "value_usd": allocation.value_usd + asset.value_usd,
+                    "value_pct": allocation.value_pct + asset.value_pct,
+                }
+            )
+        allocations[symbol] = asset
+    return allocations
+
+
+def create_symbol_holdings(
+    address: data.Address,
+    new_assets: list[data.AggregatedAsset],
+    previous_assets: list[data.AggregatedAsset] | None,
+    timestamp: int,
+) -> list[data.SymbolHolding]:
+    """
+    Index entries of snapshot, previous allocation is kept by entry which
+    already exists for bucket
+    """
+    bucket = get_bucket_time(timestamp)
+    new_allocations = _get_allocations(new_assets)
+    holdings = [
+        data.SymbolHolding(
+            address=address,
+            symbol=symbol,
+            bucket=bucket,
+            amount=asset.amount,
+            value_usd=asset.value_usd,
+            value_pct=asset.value_pct,
+            previous_value_pct=asset.value_pct,
+            timestamp=timestamp,
+        )
+        for symbol, asset in new_allocations.items()
+    ]
+    if not previous_assets:
+        return holdings
+    previous_allocations = _get_allocations(previous_assets)
+    for holding in holdings:
+        previous = previous_allocations.get(holding.symbol)
+        holding.previous_value_pct = previous.value_pct if previous else 0.0
+    holdings.extend(
+        data.SymbolHolding(
+            address=address,
+            symbol=symbol,
+            bucket=bucket,
+            amount=0.0,
+            value_usd=0.0,
+            value_pct=0.0,
+            previous_value_pct=previous.value_pct,
+            timestamp=timestamp,
+        )
+        for symbol, previous in previous_allocations.items()
+        if symbol not in new_allocations
+    )
+    return holdings
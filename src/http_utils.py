@@ -1,20 +1,22 @@
 import abc
 import asyncio
+import contextlib
 import logging
 import os
 import random
-import time
 import typing
 
 import aiohttp
 import requests
 from aiohttp import client_exceptions
 
-from src import exceptions
+from src import exceptions, json_stream, metrics, resilience, tracing
 from src.config import config
 
 log = logging.getLogger(__name__)
 
+T = typing.TypeVar("T")
+
 
 class ProxyProvider(abc.ABC):
     @abc.abstractmethod
@@ -53,22 +55,102 @@ class ListProxyProvider(ProxyProvider):
         return self._proxies[rnd.randint(0, max_index)]
 
 
+def _record_response(
+    governor: resilience.HostGovernor,
+    status: int,
+    retry_after: str | None,
+    provider: str,
+) -> None:
+    """
+    Feeds response status to host governor, client errors say nothing about
+    health of host
+    """
+    if status == 200:
+        governor.record_success()
+    elif status == 429:
+        metrics.HTTP_RATE_LIMITED_TOTAL.inc(provider=provider)
+        governor.record_rate_limited(resilience.parse_retry_after(retry_after))
+    elif status >= 500:
+        governor.record_failure(resilience.parse_retry_after(retry_after))
+
+
+@contextlib.asynccontextmanager
+async def _async_open_response(
+    url: str,
+    headers: dict[str, str],
+    proxy: str | None,
+    params: dict[str, typing.Any],
+    provider: str,
+    chain: str,
+) -> typing.AsyncIterator[aiohttp.ClientResponse]:
+    """
+    Opens successful response through governor of host
+    """
+    governor = resilience.get_governor(url)
+    async with governor.async_limit():
+        try:
+            with metrics.HTTP_REQUEST_SECONDS.time(
+                provider=provider, chain=chain, proxy=metrics.get_proxy_label(proxy)
+            ):
+                async with aiohttp.ClientSession(headers=headers) as session:
+                    async with session.get(url, proxy=proxy, params=params) as response:
+                        _record_response(
+                            governor,
+                            response.status,
+                            response.headers.get("Retry-After"),
+                            provider,
+                        )
+                        if response.status != 200:
+                            log.warning(f"Got response status {response.status}")
+                            raise exceptions.InvalidHttpResponseError()
+                        yield response
+        except client_exceptions.ClientError:
+            # failing proxy is not failure of host
+            if not proxy:
+                governor.record_failure()
+            raise
+
+
 async def async_request(
     url: str,
     headers: dict[str, str] | None = None,
     proxy: str | None = None,
     params: dict[str, typing.Any] | None = None,
+    provider: str = "unknown",
+    chain: str = "none",
 ) -> typing.Any:
-    if not headers:
-        headers = {}
-    if not params:
-        params = {}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, proxy=proxy, params=params) as response:
-            if response.status != 200:
-                log.warning(f"Got response status {response.status}")
-                raise exceptions.InvalidHttpResponseError()
-            return await response.json()
+    async with _async_open_response(
+        url, headers or {}, proxy, params or {}, provider, chain
+    ) as response:
+        return await response.json()
+
+
+async def async_request_json_items(
+    url: str,
+    project: typing.Callable[[typing.Any], T | None],
+    headers: dict[str, str] | None = None,
+    path: tuple[str, ...] = (),
+    proxy: str | None = None,
+    params: dict[str, typing.Any] | None = None,
+    provider: str = "unknown",
+    chain: str = "none",
+) -> list[T]:
+    """
+    Streams JSON array found at path of response, each item is projected as
+    soon as it is decoded and dropped when projection returns None
+    """
+    stream = json_stream.JsonArrayStream(path)
+    projected_items: list[T] = []
+    async with _async_open_response(
+        url, headers or {}, proxy, params or {}, provider, chain
+    ) as response:
+        async for chunk in response.content.iter_chunked(config.stream_chunk_size):
+            for item in stream.feed(chunk):
+                projected_item = project(item)
+                if projected_item is not None:
+                    projected_items.append(projected_item)
+    stream.close()
+    return projected_items
 
 
 async def async_request_with_proxy(
@@ -76,18 +158,32 @@ async def async_request_with_proxy(
     proxy_provider: ProxyProvider,
     headers: dict[str, str] | None = None,
     max_retries: int = 5,
+    provider: str = "unknown",
+    chain: str = "none",
 ) -> typing.Any:
     retries = 0
     while retries < max_retries:
         proxy = proxy_provider.get_proxy()
-        try:
-            return await async_request(url, headers, proxy)
-        except (
-            exceptions.InvalidHttpResponseError,
-            client_exceptions.ClientError,
-        ) as e:
-            log.warning(e)
-            retries += 1
+        with tracing.span(
+            "proxy_attempt",
+            proxy=metrics.get_proxy_label(proxy),
+            chain=chain,
+            attempt=retries,
+        ) as attempt_span:
+            try:
+                return await async_request(
+                    url, headers, proxy, provider=provider, chain=chain
+                )
+            except exceptions.CircuitOpenError:
+                raise
+            except (
+                exceptions.InvalidHttpResponseError,
+                client_exceptions.ClientError,
+            ) as e:
+                log.warning(e)
+                attempt_span.set_attribute("error", repr(e))
+                retries += 1
+                metrics.HTTP_RETRIES_TOTAL.inc(provider=provider)
     raise exceptions.InvalidHttpResponseError()
 
 
@@ -106,16 +202,35 @@ class FileUserAgentProvider(UserAgentProvider):
             return [line.strip("\n") for line in user_agents_file]
 
     def __init__(self) -> None:
-        self._headers = self._load_user_agents_from_file()
+        # read on first use, so constructing provider touches no files
+        self._headers: list[str] = []
         self._random = random.Random()
 
     def get_user_agent(self) -> str:
         if not self._headers:
-            self._load_user_agents_from_file()
+            self._headers = self._load_user_agents_from_file()
         random_num = self._random.randint(0, len(self._headers) - 1)
         return self._headers[random_num]
 
 
+_proxy_provider: ProxyProvider | None = None
+_user_agent_provider: UserAgentProvider | None = None
+
+
+def get_proxy_provider() -> ProxyProvider:
+    global _proxy_provider
+    if _proxy_provider is None:
+        _proxy_provider = RedisProxyProvider()
+    return _proxy_provider
+
+
+def get_user_agent_provider() -> UserAgentProvider:
+    global _user_agent_provider
+    if _user_agent_provider is None:
+        _user_agent_provider = FileUserAgentProvider()
+    return _user_agent_provider
+
+
 def _randomize_headers(
     headers: dict[str, str], user_agent_provider: UserAgentProvider
 ) -> dict[str, str]:
@@ -129,48 +244,56 @@ async def sync_request_with_proxy(
     headers: dict[str, str] | None = None,
     max_retries: int = 8,
     randomize_headers: bool = False,
-    user_agent_provider: UserAgentProvider = FileUserAgentProvider(),
+    user_agent_provider: UserAgentProvider | None = None,
+    provider: str = "unknown",
+    chain: str = "none",
 ) -> typing.Any:
     if not headers:
         headers = {}
     if randomize_headers:
-        headers = _randomize_headers(headers, user_agent_provider)
+        headers = _randomize_headers(
+            headers, user_agent_provider or get_user_agent_provider()
+        )
+    governor = resilience.get_governor(url)
     retries = 0
     while retries < max_retries:
         proxy = proxy_provider.get_proxy()
         try:
-            response = requests.get(
-                url, headers=headers, proxies={"https": proxy}, timeout=5
-            )
+            async with governor.async_limit():
+                with metrics.HTTP_REQUEST_SECONDS.time(
+                    provider=provider,
+                    chain=chain,
+                    proxy=metrics.get_proxy_label(proxy),
+                ), tracing.span(
+                    "proxy_attempt",
+                    proxy=metrics.get_proxy_label(proxy),
+                    chain=chain,
+                    attempt=retries,
+                ) as attempt_span:
+                    # in worker thread, so blocking request does not block loop
+                    response = await asyncio.to_thread(
+                        requests.get,
+                        url,
+                        headers=headers,
+                        proxies={"https": proxy},
+                        timeout=5,
+                    )
+                    attempt_span.set_attribute("status", response.status_code)
             status_code = response.status_code
             if status_code == 429:
                 log.warning(f"Received 429 from url: {url}")
+            _record_response(
+                governor, status_code, response.headers.get("Retry-After"), provider
+            )
             if status_code != 200:
                 retries += 1
+                metrics.HTTP_RETRIES_TOTAL.inc(provider=provider)
                 continue
             return response.json()
+        except exceptions.CircuitOpenError:
+            raise
         except Exception as e:
             # log.warning(e)
             retries += 1
+            metrics.HTTP_RETRIES_TOTAL.inc(provider=provider)
     raise exceptions.InvalidHttpResponseError()
-
-
-if __name__ == "__main__":
-    list_proxy_provider = RedisProxyProvider()
-    counter = 0
-    while counter < 20:
-        while True:
-            try:
-                result = asyncio.run(
-                    sync_request_with_proxy(
-                        "",
-                        RedisProxyProvider(),
-                        randomize_headers=True,
-                    )
-                )
-                print(result)
-                counter += 1
-                time.sleep(5)
-                break
-            except Exception as e:
-                print(e, e.__class__.__name__)
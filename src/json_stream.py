@@ -0,0 +1,167 @@
+"""
+Incremental decoding of JSON array of objects from chunked response body
+
+Array can be nested in objects, path gives keys leading to it. Values of
+other keys and items of array are decoded one at a time by C decoder, so
+whole document is never held in memory. Empty body, null or {} in place
+of array are read as empty array.
+"""
+import codecs
+import json
+import re
+import typing
+
+from src import exceptions
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SEPARATORS = re.compile(r"[ \t\n\r,]*")
+_TERMINATORS = frozenset(",]}:")
+_EMPTY_STARTS = frozenset("n{")
+
+
+class JsonArrayStream:
+    def __init__(self, path: tuple[str, ...] = ()) -> None:
+        self.path = path
+        self.is_done = False
+        self._depth = 0
+        self._in_object = False
+        self._in_array = False
+        self._buffer = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+        self._utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def _skip(self, pos: int, pattern: re.Pattern[str] = _WHITESPACE) -> int:
+        return pattern.match(self._buffer, pos).end()  # type: ignore
+
+    def _decode_value(self, pos: int) -> tuple[typing.Any, int] | None:
+        """
+        Decodes value at pos, None when it is not complete yet. Value counts as
+        complete only when separator follows, so numbers are not cut
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            return None
+        end = self._skip(end)
+        if end >= len(self._buffer) or self._buffer[end] not in _TERMINATORS:
+            return None
+        return value, end
+
+    def _step_open(self) -> bool:
+        pos = self._skip(self._pos)
+        if pos >= len(self._buffer):
+            return False
+        expected = "{" if self._depth < len(self.path) else "["
+        if expected == "[" and self._buffer[pos] in _EMPTY_STARTS:
+            # null or {} instead of array, known only once body ends
+            self._pos = pos
+            return False
+        if self._buffer[pos] != expected:
+            raise exceptions.InvalidHttpResponseError()
+        self._pos = pos + 1
+        if expected == "{":
+            self._in_object = True
+        else:
+            self._in_array = True
+        return True
+
+    def _step_key(self) -> bool:
+        pos = self._skip(self._pos, _SEPARATORS)
+        if pos >= len(self._buffer):
+            return False
+        if self._buffer[pos] == "}":
+            # key of path is missing
+            raise exceptions.InvalidHttpResponseError()
+        decoded_key = self._decode_value(pos)
+        if decoded_key is None:
+            return False
+        key, pos = decoded_key
+        if self._buffer[pos] != ":":
+            raise exceptions.InvalidHttpResponseError()
+        pos = self._skip(pos + 1)
+        if key == self.path[self._depth]:
+            self._depth += 1
+            self._in_object = False
+            self._pos = pos
+            return True
+        decoded_value = self._decode_value(pos)
+        if decoded_value is None:
+            return False
+        self._pos = decoded_value[1]
+        return True
+
+    def _step_items(self, items: list[typing.Any]) -> bool:
+        """
+        Decodes all complete items in buffer in one tight loop
+        """
+        buffer = self._buffer
+        buffer_end = len(buffer)
+        raw_decode = self._decoder.raw_decode
+        skip_separators = _SEPARATORS.match
+        skip_whitespace = _WHITESPACE.match
+        pos = self._pos
+        try:
+            while True:
+                pos = skip_separators(buffer, pos).end()  # type: ignore
+                if pos >= buffer_end:
+                    break
+                if buffer[pos] == "]":
+                    self.is_done = True
+                    break
+                item, end = raw_decode(buffer, pos)
+                end = skip_whitespace(buffer, end).end()  # type: ignore
+                if end >= buffer_end or buffer[end] not in _TERMINATORS:
+                    # number might continue in next chunk
+                    break
+                items.append(item)
+                pos = end
+        except json.JSONDecodeError:
+            pass
+        self._pos = pos
+        return False
+
+    def feed(self, chunk: bytes) -> list[typing.Any]:
+        """
+        Returns items of array completed by chunk
+        """
+        self._buffer = self._buffer[self._pos :] + self._utf8_decoder.decode(chunk)
+        self._pos = 0
+        items: list[typing.Any] = []
+        while not self.is_done:
+            if self._in_array:
+                has_progressed = self._step_items(items)
+            elif self._in_object:
+                has_progressed = self._step_key()
+            else:
+                has_progressed = self._step_open()
+            if not has_progressed:
+                break
+        return items
+
+    def close(self) -> None:
+        if self.is_done:
+            return
+        rest = self._buffer[self._pos :].strip()
+        if self._in_array or self._in_object:
+            raise exceptions.InvalidHttpResponseError()
+        if not rest and self._depth == 0:
+            return
+        if not rest or self._depth < len(self.path):
+            raise exceptions.InvalidHttpResponseError()
+        try:
+            # rest of enclosing objects is ignored, as after end of array
+            value = self._decoder.raw_decode(rest)[0]
+        except json.JSONDecodeError:
+            raise exceptions.InvalidHttpResponseError()
+        if value not in (None, {}):
+            raise exceptions.InvalidHttpResponseError()
+
+
+def decode_array_items(
+    chunks: typing.Iterable[bytes], path: tuple[str, ...] = ()
+) -> typing.Iterator[typing.Any]:
+    stream = JsonArrayStream(path)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    stream.close()
@@ -3,42 +3,80 @@ import logging
 import src  # noqa
 from apscheduler.schedulers import asyncio as asyncio_scheduler
 from apscheduler.triggers import cron
-from defi_common.database import db
+from sqlalchemy import orm
 from sqlalchemy.ext import asyncio as sql_asyncio
 
-from src import addresses, enums, runner
+from src import (
+    addresses,
+    enums,
+    metrics,
+    profiling,
+    ranking_api,
+    runner,
+    scheduling,
+    snapshot_store,
+    spooling,
+)
+from src.config import config
+from src.database import engine
 
 
-def run_executor(event_loop: asyncio.AbstractEventLoop) -> None:
+def run_executor(
+    event_loop: asyncio.AbstractEventLoop,
+    store: snapshot_store.SnapshotStore,
+    session_maker: orm.sessionmaker,
+    spool: spooling.Spool | None = None,
+) -> None:
     scheduler = asyncio_scheduler.AsyncIOScheduler(event_loop=event_loop)
+    refresh_queue = scheduling.RefreshQueue()
     scheduler.add_job(
         runner.async_update_all_addresses,
-        kwargs={"session_maker": db.async_session},
+        kwargs={
+            "session_maker": session_maker,
+            "refresh_queue": refresh_queue,
+            "store": store,
+            "spool": spool,
+        },
         trigger=cron.CronTrigger.from_crontab("*/15 * * * *"),
     )
+    if spool is not None:
+        scheduler.add_job(
+            runner.async_drain_spool,
+            kwargs={"spool": spool, "session_maker": session_maker},
+            trigger=cron.CronTrigger.from_crontab("* * * * *"),
+        )
     scheduler.add_job(
         runner.async_run_address_ranking,
-        kwargs={"session_maker": db.async_session, "time_type": enums.RunTimeType.HOUR},
+        kwargs={"session_maker": session_maker, "time_type": enums.RunTimeType.HOUR},
         trigger=cron.CronTrigger.from_crontab("1 * * * *"),
     )
     scheduler.add_job(
         runner.async_run_coin_change_ranking,
-        kwargs={"session_maker": db.async_session, "time_type": enums.RunTimeType.HOUR},
+        kwargs={"session_maker": session_maker, "time_type": enums.RunTimeType.HOUR},
         trigger=cron.CronTrigger.from_crontab("1 * * * *"),
     )
     scheduler.add_job(
         runner.async_run_address_ranking,
-        kwargs={"session_maker": db.async_session, "time_type": enums.RunTimeType.DAY},
+        kwargs={"session_maker": session_maker, "time_type": enums.RunTimeType.DAY},
         trigger=cron.CronTrigger.from_crontab("1 0 * * *"),
     )
+    scheduler.add_job(
+        runner.async_run_retention,
+        kwargs={"session_maker": session_maker},
+        trigger=cron.CronTrigger.from_crontab("30 0 * * *"),
+    )
+    scheduler.add_job(
+        runner.async_run_export,
+        kwargs={"session_maker": session_maker},
+        trigger=cron.CronTrigger.from_crontab("10 * * * *"),
+    )
     scheduler.start()
     event_loop.run_forever()
 
 
-async def init_db() -> None:
-    # await db.init_models()
-    session = db.async_session()
-    await addresses.async_save_addresses_from_all_providers(session)
+async def init_db(session_maker: orm.sessionmaker) -> None:
+    async with session_maker() as session:
+        await addresses.async_save_addresses_from_all_providers(session)
 
 
 def setup_logging() -> None:
@@ -55,5 +93,15 @@ async def run_updating(session: sql_asyncio.AsyncSession) -> None:
 if __name__ == "__main__":
     setup_logging()
     event_loop = asyncio.new_event_loop()
-    event_loop.run_until_complete(init_db())
-    run_executor(event_loop)
+    session_maker = engine.get_session_maker()
+    event_loop.run_until_complete(init_db(session_maker))
+    store = snapshot_store.SnapshotStore()
+    event_loop.run_until_complete(
+        runner.async_warm_load_snapshot_store(store, session_maker)
+    )
+    app = metrics.create_app()
+    ranking_api.add_routes(app, session_maker)
+    event_loop.run_until_complete(metrics.async_start_server(app))
+    profiling.install_signal_handler(event_loop)
+    spool = spooling.Spool() if config.spool_dir else None
+    run_executor(event_loop, store, session_maker, spool)
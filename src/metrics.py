@@ -0,0 +1,305 @@
+"""
+Latency histograms and counters of single pass, exposed in prometheus text
+format on metrics port
+
+Metrics are kept in plain dicts keyed by label values, everything runs on
+event loop thread so observing is just a bisect and few additions.
+"""
+import abc
+import bisect
+import contextlib
+import contextvars
+import functools
+import logging
+import time
+import typing
+
+from src.config import config
+
+if typing.TYPE_CHECKING:
+    from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+P = typing.ParamSpec("P")
+R = typing.TypeVar("R")
+
+
+class Metric(abc.ABC):
+    metric_type = ""
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        REGISTRY.append(self)
+
+    def _get_key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _format_labels(
+        self, key: tuple[str, ...], extra: tuple[tuple[str, str], ...] = ()
+    ) -> str:
+        pairs = [*zip(self.label_names, key), *extra]
+        if not pairs:
+            return ""
+        formatted = ",".join(f'{name}="{value}"' for name, value in pairs)
+        return f"{{{formatted}}}"
+
+    @abc.abstractmethod
+    def render_samples(self) -> list[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self.render_samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._get_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._get_key(labels), 0.0)
+
+    def render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._get_key(labels)] = value
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._get_key(labels), 0.0)
+
+    def render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._get_key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def get_count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._get_key(labels), []))
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> typing.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render_samples(self) -> list[str]:
+        lines: list[str] = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bucket, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                upper = "+Inf" if bucket == float("inf") else str(bucket)
+                labels = self._format_labels(key, (("le", upper),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {self._sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY: list[Metric] = []
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Latency of provider http requests",
+    ("provider", "chain", "proxy"),
+)
+HTTP_RETRIES_TOTAL = Counter(
+    "http_retries_total", "Retried provider http requests", ("provider",)
+)
+HTTP_RATE_LIMITED_TOTAL = Counter(
+    "http_rate_limited_total", "Provider responses with status 429", ("provider",)
+)
+HEDGED_REQUESTS_TOTAL = Counter(
+    "hedged_requests_total",
+    "Requests sent to secondary provider after primary failed or timed out",
+    ("reason",),
+)
+CIRCUIT_REJECTED_TOTAL = Counter(
+    "circuit_rejected_total", "Requests rejected by open host circuit", ("host",)
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Time spent in database services", ("function",)
+)
+ADDRESS_UPDATE_SECONDS = Histogram(
+    "address_update_seconds",
+    "Time of fetching and of writing update of single address",
+    ("stage",),
+    buckets=JOB_BUCKETS,
+)
+SKIPPED_ADDRESSES_TOTAL = Counter(
+    "skipped_addresses_total", "Addresses skipped during update", ("reason",)
+)
+RANKING_SECONDS = Histogram(
+    "ranking_seconds",
+    "Duration of ranking jobs",
+    ("job", "ranking_type"),
+    buckets=JOB_BUCKETS,
+)
+
+DB_COMMITS_TOTAL = Counter("db_commits_total", "Committed database transactions")
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time waited for connection from database pool"
+)
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "db_pool_timeouts_total", "Connection checkouts which timed out on full pool"
+)
+RANKING_CACHE_REQUESTS_TOTAL = Counter(
+    "ranking_cache_requests_total", "Ranking API requests by cache result", ("result",)
+)
+SPOOLED_RECORDS_TOTAL = Counter(
+    "spooled_records_total", "Records written to and drained from spool", ("state",)
+)
+SPOOL_DRAIN_FAILURES_TOTAL = Counter(
+    "spool_drain_failures_total", "Spool drains stopped by database errors"
+)
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "pipeline_queue_depth", "Results waiting between pipeline stages", ("pipeline",)
+)
+PIPELINE_ITEMS_TOTAL = Counter(
+    "pipeline_items_total", "Items passed by pipeline stages", ("pipeline", "stage")
+)
+PIPELINE_PUT_WAIT_SECONDS = Histogram(
+    "pipeline_put_wait_seconds",
+    "Time producers waited for room in full pipeline queue",
+    ("pipeline",),
+)
+
+
+def get_proxy_label(proxy: str | None) -> str:
+    """
+    Proxy host without credentials, empty proxy is reported as none
+    """
+    if not proxy:
+        return "none"
+    return proxy.rsplit("@", 1)[-1].removeprefix("http://")
+
+
+# histograms observed by timed calls up the stack, nested calls are not observed
+_timed_histograms: contextvars.ContextVar[frozenset[str]] = contextvars.ContextVar(
+    "timed_histograms", default=frozenset()
+)
+
+
+def timed_async(
+    histogram: Histogram,
+) -> typing.Callable[
+    [typing.Callable[P, typing.Awaitable[R]]], typing.Callable[P, typing.Awaitable[R]]
+]:
+    """
+    Observes duration of decorated coroutine function labeled by its name,
+    calls made from another function timed by same histogram are not observed,
+    so time is counted once
+    """
+
+    def decorator(
+        func: typing.Callable[P, typing.Awaitable[R]]
+    ) -> typing.Callable[P, typing.Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            timed_histograms = _timed_histograms.get()
+            if histogram.name in timed_histograms:
+                return await func(*args, **kwargs)
+            token = _timed_histograms.set(timed_histograms | {histogram.name})
+            try:
+                with histogram.time(function=func.__name__):
+                    return await func(*args, **kwargs)
+            finally:
+                _timed_histograms.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+async def _async_handle_metrics(request: "web.Request") -> "web.Response":
+    from aiohttp import web
+
+    return web.Response(text=render_metrics(), content_type="text/plain")
+
+
+def create_app() -> "web.Application":
+    # aiohttp server is imported only by processes which serve metrics
+    from aiohttp import web
+
+    app = web.Application()
+    app.router.add_get("/metrics", _async_handle_metrics)
+    return app
+
+
+async def async_start_server(
+    app: "web.Application | None" = None, port: int = config.metrics_port
+) -> "web.AppRunner":
+    from aiohttp import web
+
+    runner = web.AppRunner(app or create_app())
+    await runner.setup()
+    await web.TCPSite(runner, port=port).start()
+    log.info(f"Serving metrics on port {port}")
+    return runner
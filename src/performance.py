@@ -1,19 +1,24 @@
-import asyncio
+import typing
 from datetime import datetime
 
-
-from defi_common.database import db
+import numpy as np
 from sqlalchemy.ext import asyncio as sql_asyncio
 
-from src import data, enums, math_utils
+from src import analytics, data, enums, tracing
 from src.database import services
-from src.enums import RunTimeType
 from src.time_utils import get_saving_time_for_ranking, get_times_for_comparison
 import logging
 
 log = logging.getLogger(__name__)
 
 
+class SnapshotPair(typing.NamedTuple):
+    address: data.Address
+    start_time: datetime
+    old_assets: list[data.AggregatedAsset]
+    new_assets: list[data.AggregatedAsset]
+
+
 def _add_assets_to_dict(
     assets: list[data.AggregatedAsset],
 ) -> dict[str, data.AggregatedAsset]:
@@ -24,6 +29,81 @@ def _add_assets_to_dict(
     return asset_dict
 
 
+def calculate_performances(
+    snapshot_pairs: list[SnapshotPair], end_time: datetime
+) -> list[data.PerformanceResult]:
+    """
+    Time weighted return of each pair of snapshots by Modified Dietz method.
+    Amount changes are external flows valued at mid price of period, so
+    deposits and withdrawals do not count as gains. Token rows of all pairs
+    are laid out in flat columns and summed per pair by numpy
+    """
+    owners: list[int] = []
+    old_amounts: list[float] = []
+    old_prices: list[float] = []
+    new_amounts: list[float] = []
+    new_prices: list[float] = []
+    for owner, pair in enumerate(snapshot_pairs):
+        old_assets_dict = _add_assets_to_dict(pair.old_assets)
+        new_assets_dict = _add_assets_to_dict(pair.new_assets)
+        for symbol, old_asset in old_assets_dict.items():
+            new_asset = new_assets_dict.get(symbol)
+            owners.append(owner)
+            old_amounts.append(old_asset.amount)
+            old_prices.append(old_asset.price)
+            # sold out asset leaves at its last known price
+            new_amounts.append(new_asset.amount if new_asset else 0.0)
+            new_prices.append(new_asset.price if new_asset else old_asset.price)
+        for symbol, new_asset in new_assets_dict.items():
+            if symbol not in old_assets_dict:
+                owners.append(owner)
+                old_amounts.append(0.0)
+                old_prices.append(new_asset.price)
+                new_amounts.append(new_asset.amount)
+                new_prices.append(new_asset.price)
+    owner_indexes = np.array(owners, dtype=np.intp)
+    old_amount_column = np.array(old_amounts)
+    old_price_column = np.array(old_prices)
+    new_amount_column = np.array(new_amounts)
+    new_price_column = np.array(new_prices)
+    pair_count = len(snapshot_pairs)
+    start_values = np.bincount(
+        owner_indexes,
+        weights=old_amount_column * old_price_column,
+        minlength=pair_count,
+    )
+    gains = np.bincount(
+        owner_indexes,
+        weights=(old_amount_column + new_amount_column)
+        * 0.5
+        * (new_price_column - old_price_column),
+        minlength=pair_count,
+    )
+    flows = np.bincount(
+        owner_indexes,
+        weights=(new_amount_column - old_amount_column)
+        * 0.5
+        * (old_price_column + new_price_column),
+        minlength=pair_count,
+    )
+    invested = start_values + 0.5 * flows
+    performances = np.divide(
+        gains * 100.0,
+        invested,
+        out=np.zeros(pair_count),
+        where=invested > 0.0,
+    )
+    return [
+        data.PerformanceResult(
+            performance=float(performance),
+            start_time=pair.start_time,
+            end_time=end_time,
+            address=pair.address,
+        )
+        for pair, performance in zip(snapshot_pairs, performances)
+    ]
+
+
 def calculate_performance(
     old_address_updates: list[data.AggregatedAsset],
     new_address_updates: list[data.AggregatedAsset],
@@ -31,27 +111,13 @@ def calculate_performance(
     address: data.Address,
     end_time: datetime = datetime.now(),
 ) -> data.PerformanceResult:
-    old_assets_dict = _add_assets_to_dict(old_address_updates)
-    new_assets_dict = _add_assets_to_dict(new_address_updates)
-    performance = 0.0
-    for old_asset_symbol, old_asset in old_assets_dict.items():
-        if old_asset_symbol in new_assets_dict:
-            new_asset = new_assets_dict[old_asset_symbol]
-            asset_price_change_pct = math_utils.calc_percentage_diff(
-                new_asset.price, old_asset.price
-            )
-            old_asset_pct_held = old_asset.value_pct / 100.0
-            performance_gain = asset_price_change_pct * old_asset_pct_held
-            performance += performance_gain
-    performance_result = data.PerformanceResult(
-        performance=performance,
-        start_time=start_time,
-        end_time=end_time,
-        address=address,
+    snapshot_pair = SnapshotPair(
+        address, start_time, old_address_updates, new_address_updates
     )
-    return performance_result
+    return calculate_performances([snapshot_pair], end_time)[0]
 
 
+@tracing.traced_async()
 async def _async_create_address_ranks(
     query_time: datetime,
     ranking_type: enums.RunTimeType,
@@ -72,28 +138,16 @@ async def _async_create_address_ranks(
     return address_ranks
 
 
+@tracing.traced_async()
 async def _async_calculate_avg_performances(
     start_time: datetime, end_time: datetime, session: sql_asyncio.AsyncSession
 ) -> dict[data.Address, float]:
     performance_dict: dict[data.Address, float] = {}
-    addresses: list[data.Address] = await services.async_find_all_converted_addresses(
-        session
+    series = await services.async_find_all_performance_series(
+        start_time, end_time, session
     )
-    for address in addresses:
-        performance_results: list[
-            data.PerformanceResult
-        ] = await services.async_find_performance_results(
-            address=address,
-            start_datetime=start_time,
-            end_datetime=end_time,
-            session=session,
-        )
-        if len(performance_results):
-            sum_performances = sum(
-                performance.performance for performance in performance_results
-            )
-            avg_performance = sum_performances / float(len(performance_results))
-            performance_dict[address] = avg_performance
+    for address, performances in series.items():
+        performance_dict[address] = sum(performances) / float(len(performances))
     return performance_dict
 
 
@@ -122,12 +176,6 @@ async def async_save_address_ranking(
     log.info(f"address running address ranks len: {len(address_ranks)}")
     await services.async_save_address_ranks(address_ranks, session)
     log.info("Saved address ranks")
-
-
-async def main():
-    async with db.async_session() as session:
-        await async_save_address_ranking(RunTimeType.HOUR, session)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
+    await analytics.async_save_performance_analytics(
+        ranking_type, query_time, end_time, session
+    )
@@ -0,0 +1,116 @@
+"""
+Bounded producer and consumer stages, so fetching and writing of update pass
+overlap instead of waiting for each other
+
+Producers put results into bounded queue and wait once consumers fall behind,
+so at most queue size results are held in memory. Consumers take queued
+results in batches, waiting up to batch wait for batch to fill. By default
+batch wait is unlimited and batch is taken once it is full or input ends.
+Producers wait produce interval between items only after their result is
+queued, so it does not hold results back.
+"""
+import asyncio
+import collections
+import logging
+import math
+import time
+import typing
+
+from src import metrics
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+R = typing.TypeVar("R")
+
+
+async def _async_get_batch(
+    queue: asyncio.Queue[R | None], batch_size: int, batch_wait: float
+) -> tuple[list[R], bool]:
+    """
+    Returns batch of results and whether end of queue was reached
+    """
+    first = await queue.get()
+    if first is None:
+        return [], True
+    batch = [first]
+    deadline = time.monotonic() + batch_wait
+    while len(batch) < batch_size:
+        if not queue.empty():
+            result = queue.get_nowait()
+        else:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                result = await asyncio.wait_for(
+                    queue.get(), timeout if math.isfinite(timeout) else None
+                )
+            except asyncio.TimeoutError:
+                break
+        if result is None:
+            return batch, True
+        batch.append(result)
+    return batch, False
+
+
+async def async_run_pipeline(
+    name: str,
+    items: typing.Iterable[T],
+    produce: typing.Callable[[T], typing.Awaitable[R | None]],
+    consume: typing.Callable[[list[R]], typing.Awaitable[None]],
+    producer_count: int = config.pipeline_fetch_workers,
+    consumer_count: int = config.pipeline_write_workers,
+    queue_size: int = config.pipeline_queue_size,
+    batch_size: int = config.unit_of_work_batch_size,
+    batch_wait: float = config.pipeline_batch_wait,
+    produce_interval: float = 0.0,
+) -> None:
+    """
+    Produces result of every item and consumes them in batches, None results
+    are dropped. First failure of any stage cancels whole pipeline
+    """
+    pending = collections.deque(items)
+    queue: asyncio.Queue[R | None] = asyncio.Queue(maxsize=queue_size)
+
+    async def async_run_producer() -> None:
+        while pending:
+            result = await produce(pending.popleft())
+            metrics.PIPELINE_ITEMS_TOTAL.inc(pipeline=name, stage="produced")
+            if result is not None:
+                with metrics.PIPELINE_PUT_WAIT_SECONDS.time(pipeline=name):
+                    await queue.put(result)
+                metrics.PIPELINE_QUEUE_DEPTH.set(queue.qsize(), pipeline=name)
+            if pending and produce_interval > 0:
+                await asyncio.sleep(produce_interval)
+
+    async def async_run_producers() -> None:
+        await asyncio.gather(*(async_run_producer() for _ in range(producer_count)))
+        # every consumer stops at its own end marker
+        for _ in range(consumer_count):
+            await queue.put(None)
+
+    async def async_run_consumer() -> None:
+        is_done = False
+        while not is_done:
+            batch, is_done = await _async_get_batch(queue, batch_size, batch_wait)
+            metrics.PIPELINE_QUEUE_DEPTH.set(queue.qsize(), pipeline=name)
+            if not batch:
+                continue
+            await consume(batch)
+            metrics.PIPELINE_ITEMS_TOTAL.inc(
+                len(batch), pipeline=name, stage="consumed"
+            )
+
+    tasks = [
+        asyncio.create_task(async_run_producers()),
+        *(asyncio.create_task(async_run_consumer()) for _ in range(consumer_count)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        metrics.PIPELINE_QUEUE_DEPTH.set(0, pipeline=name)
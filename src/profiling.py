@@ -0,0 +1,166 @@
+"""
+Opt-in sampling profiler of scheduled jobs
+
+Sampler thread periodically takes stack of event loop thread and counts
+collapsed stacks, which are written as flamegraph ready folded file
+<profile_dir>/<job>-<run time>.folded. Heartbeat task on loop lets sampler
+notice callbacks blocking loop longer than slow callback threshold, stacks
+caught while loop is blocked go to <job>-<run time>-blocked.folded.
+
+Profiling is enabled per job with PROFILE_JOBS or for next job run by
+sending SIGUSR1. Sampler sees whole loop thread, so only one job run is
+profiled at once and runs overlapping it are not profiled.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import types
+import typing
+from collections import Counter
+from datetime import datetime
+
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+_next_run_requested = False
+_active_job_name: str | None = None
+
+
+def request_next_run() -> None:
+    global _next_run_requested
+    _next_run_requested = True
+    log.info("Profiling of next job run requested")
+
+
+def install_signal_handler(event_loop: asyncio.AbstractEventLoop) -> None:
+    event_loop.add_signal_handler(signal.SIGUSR1, request_next_run)
+
+
+def is_enabled(job_name: str) -> bool:
+    return _next_run_requested or job_name in config.profile_jobs
+
+
+def collapse_stack(frame: types.FrameType | None) -> str:
+    """
+    Formats stack as semicolon separated frames from outermost one
+    """
+    frames: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        file_name = os.path.basename(code.co_filename)
+        frames.append(f"{code.co_name} ({file_name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval_ms: float = config.profile_interval_ms,
+        slow_callback_ms: float = config.profile_slow_callback_ms,
+    ) -> None:
+        self.interval = interval_ms / 1000.0
+        self.slow_callback = slow_callback_ms / 1000.0
+        self.samples: Counter[str] = Counter()
+        self.blocked_samples: Counter[str] = Counter()
+        self.blocked_count = 0
+        self._loop_thread_id = threading.get_ident()
+        self._last_heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._heartbeat_task: asyncio.Task[None] | None = None
+
+    async def _async_heartbeat(self) -> None:
+        while True:
+            self._last_heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _sample(self) -> None:
+        is_blocked = False
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = collapse_stack(frame)
+            self.samples[stack] += 1
+            blocked_for = time.monotonic() - self._last_heartbeat
+            if blocked_for > self.interval + self.slow_callback:
+                self.blocked_samples[stack] += 1
+                if not is_blocked:
+                    self.blocked_count += 1
+                    log.warning(
+                        f"Event loop blocked for {blocked_for * 1000:.0f} ms in "
+                        f"{stack.rsplit(';', 1)[-1]}"
+                    )
+                is_blocked = True
+            else:
+                is_blocked = False
+
+    def start(self) -> None:
+        """
+        Has to be called from event loop thread
+        """
+        self._heartbeat_task = asyncio.create_task(self._async_heartbeat())
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+
+def write_folded(samples: Counter[str], path: str) -> None:
+    with open(path, "w") as folded_file:
+        for stack, count in samples.most_common():
+            folded_file.write(f"{stack} {count}\n")
+
+
+def _get_profile_path(job_name: str, run_time: datetime, suffix: str = "") -> str:
+    return os.path.join(
+        config.profile_dir, f"{job_name}-{run_time:%Y%m%dT%H%M%S}{suffix}.folded"
+    )
+
+
+@contextlib.asynccontextmanager
+async def async_profile_run(job_name: str) -> typing.AsyncIterator[None]:
+    """
+    Samples event loop during run of job, when profiling of job is enabled
+    """
+    global _next_run_requested, _active_job_name
+    if not is_enabled(job_name):
+        yield
+        return
+    if _active_job_name is not None:
+        log.info(
+            f"Not profiling {job_name}, profiled run of {_active_job_name} "
+            f"is in progress"
+        )
+        yield
+        return
+    _next_run_requested = False
+    _active_job_name = job_name
+    run_time = datetime.now()
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _active_job_name = None
+        os.makedirs(config.profile_dir, exist_ok=True)
+        path = _get_profile_path(job_name, run_time)
+        write_folded(profiler.samples, path)
+        if profiler.blocked_samples:
+            write_folded(
+                profiler.blocked_samples,
+                _get_profile_path(job_name, run_time, "-blocked"),
+            )
+        log.info(
+            f"Profile of {job_name} written to {path}, "
+            f"loop was blocked {profiler.blocked_count} times"
+        )
@@ -0,0 +1,201 @@
+"""
+Read API of address and coin rankings, served on metrics port
+
+Responses are cached in process by path and query, cache is dropped whenever
+new ranks are saved. Pages are keyset based, next page starts after last
+returned rank, or before last returned time in rank history.
+"""
+import collections
+import json
+import logging
+import typing
+from datetime import datetime
+
+import pydantic
+from aiohttp import web
+from sqlalchemy import orm
+
+from src import data, enums, metrics
+from src.config import config
+from src.database import services
+
+log = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = config.ranking_cache_size) -> None:
+        self.max_size = max_size
+        # bumped on invalidation, so bodies read before it are not stored
+        self.generation = 0
+        self._bodies: collections.OrderedDict[str, str] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def get(self, key: str) -> str | None:
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+        return body
+
+    def put(self, key: str, body: str, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._bodies[key] = body
+        self._bodies.move_to_end(key)
+        if len(self._bodies) > self.max_size:
+            self._bodies.popitem(last=False)
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._bodies.clear()
+
+
+_cache = ResponseCache()
+
+
+def invalidate_cache() -> None:
+    _cache.invalidate()
+
+
+def _json_default(value: typing.Any) -> typing.Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value)}")
+
+
+def _dump_page(
+    items: typing.Sequence[pydantic.BaseModel],
+    time: datetime | None = None,
+    next_after_rank: int | None = None,
+    next_before: datetime | None = None,
+) -> str:
+    return json.dumps(
+        {
+            "time": time,
+            "items": [item.dict() for item in items],
+            "next_after_rank": next_after_rank,
+            "next_before": next_before,
+        },
+        default=_json_default,
+    )
+
+
+def _parse_ranking_type(request: web.Request) -> enums.RunTimeType:
+    try:
+        return enums.RunTimeType(request.match_info["ranking_type"].upper())
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Unknown ranking type")
+
+
+def _parse_time(request: web.Request, name: str) -> datetime | None:
+    value = request.query.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise web.HTTPBadRequest(reason=f"Invalid {name}")
+
+
+def _parse_int(request: web.Request, name: str, default: int) -> int:
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(reason=f"Invalid {name}")
+
+
+def _parse_limit(request: web.Request) -> int:
+    limit = _parse_int(request, "limit", config.ranking_api_page_size)
+    return min(max(limit, 1), config.ranking_api_max_page_size)
+
+
+async def _async_get_address_ranking(
+    request: web.Request, session_maker: orm.sessionmaker
+) -> str:
+    ranking_type = _parse_ranking_type(request)
+    after_rank = _parse_int(request, "after_rank", 0)
+    limit = _parse_limit(request)
+    async with session_maker() as session:
+        time = _parse_time(request, "time")
+        if time is None:
+            time = await services.async_find_last_address_ranking_time(
+                ranking_type, session
+            )
+        if time is None:
+            return _dump_page([])
+        ranks = await services.async_find_address_rankings(
+            ranking_type, time, session, after_rank=after_rank, limit=limit
+        )
+    next_after_rank = ranks[-1].rank if len(ranks) == limit else None
+    return _dump_page(ranks, time, next_after_rank=next_after_rank)
+
+
+async def _async_get_coin_ranking(
+    request: web.Request, session_maker: orm.sessionmaker
+) -> str:
+    ranking_type = _parse_ranking_type(request)
+    after_rank = _parse_int(request, "after_rank", 0)
+    limit = _parse_limit(request)
+    async with session_maker() as session:
+        time = _parse_time(request, "time")
+        if time is None:
+            time = await services.async_find_last_coin_ranking_time(
+                ranking_type, session
+            )
+        if time is None:
+            return _dump_page([])
+        coin_changes = await services.async_find_coin_ranking_by_time(
+            time, session, ranking_type, after_rank=after_rank, limit=limit
+        )
+    next_after_rank = coin_changes[-1].rank if len(coin_changes) == limit else None
+    return _dump_page(coin_changes, time, next_after_rank=next_after_rank)
+
+
+async def _async_get_address_rank_history(
+    request: web.Request, session_maker: orm.sessionmaker
+) -> str:
+    ranking_type = _parse_ranking_type(request)
+    before = _parse_time(request, "before")
+    limit = _parse_limit(request)
+    address = data.Address(address=request.match_info["address"])
+    async with session_maker() as session:
+        ranks = await services.async_find_address_rank_history(
+            address, ranking_type, session, before=before, limit=limit
+        )
+    next_before = ranks[-1].time if len(ranks) == limit else None
+    return _dump_page(ranks, next_before=next_before)
+
+
+def _cached(
+    get_body: typing.Callable[[web.Request, orm.sessionmaker], typing.Awaitable[str]],
+    session_maker: orm.sessionmaker,
+) -> typing.Callable[[web.Request], typing.Awaitable[web.Response]]:
+    async def handler(request: web.Request) -> web.Response:
+        key = request.path_qs
+        body = _cache.get(key)
+        if body is None:
+            metrics.RANKING_CACHE_REQUESTS_TOTAL.inc(result="miss")
+            generation = _cache.generation
+            body = await get_body(request, session_maker)
+            _cache.put(key, body, generation)
+        else:
+            metrics.RANKING_CACHE_REQUESTS_TOTAL.inc(result="hit")
+        return web.Response(text=body, content_type="application/json")
+
+    return handler
+
+
+def add_routes(app: web.Application, session_maker: orm.sessionmaker) -> None:
+    app.router.add_get(
+        "/rankings/addresses/{ranking_type}",
+        _cached(_async_get_address_ranking, session_maker),
+    )
+    app.router.add_get(
+        "/rankings/coins/{ranking_type}",
+        _cached(_async_get_coin_ranking, session_maker),
+    )
+    app.router.add_get(
+        "/addresses/{address}/ranks/{ranking_type}",
+        _cached(_async_get_address_rank_history, session_maker),
+    )
@@ -0,0 +1,210 @@
+"""
+Circuit breakers, rate governors and latency tracking of remote providers
+"""
+import asyncio
+import collections
+import contextlib
+import email.utils
+import logging
+import time
+import typing
+import urllib.parse
+import weakref
+
+from src import enums, exceptions, metrics
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, after reset_timeout
+    single trial request is let through, its result closes or reopens circuit
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = config.breaker_failure_threshold,
+        reset_timeout: float = config.breaker_reset_seconds,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = enums.CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow_request(self, now: float | None = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        if self.state == enums.CircuitState.CLOSED:
+            return True
+        # half open circuit lets next trial through if last one never finished
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        self.state = enums.CircuitState.HALF_OPEN
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self.state = enums.CircuitState.CLOSED
+
+    def record_failure(self, now: float | None = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        self._failures += 1
+        if (
+            self.state == enums.CircuitState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            if self.state != enums.CircuitState.OPEN:
+                log.warning(f"Opening circuit of {self.name}")
+            self.state = enums.CircuitState.OPEN
+            self._opened_at = now
+
+
+class LatencyTracker:
+    """
+    Keeps latencies of last window_size requests to estimate percentiles
+    """
+
+    def __init__(
+        self, window_size: int = 200, default_latency: float = config.hedge_max_delay
+    ) -> None:
+        self.default_latency = default_latency
+        self._latencies: collections.deque[float] = collections.deque(
+            maxlen=window_size
+        )
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def get_percentile(self, percentile: float, min_samples: int = 20) -> float:
+        if len(self._latencies) < min_samples:
+            return self.default_latency
+        ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * percentile / 100.0), len(ordered) - 1)
+        return ordered[index]
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """
+    Parses Retry-After header given either in seconds or as http date
+    """
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if now is None:
+        now = time.time()
+    return max(retry_at.timestamp() - now, 0.0)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def get_wait_time(self, now: float | None = None) -> float:
+        """
+        Takes token and returns how long caller has to wait before using it
+        """
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1.0
+        if self._tokens >= 0.0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class HostGovernor:
+    """
+    Shared limits of single upstream host, rate limit is halved on every 429
+    and recovers additively with successful responses. 429 says host is
+    healthy but busy, so it slows requests down without counting towards
+    opening circuit
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = config.governor_rate,
+        burst: float = config.governor_burst,
+        concurrency: int = config.governor_concurrency,
+    ) -> None:
+        self.host = host
+        self.max_rate = rate
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(host)
+        self.rate_limited_count = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._blocked_until = 0.0
+
+    @contextlib.asynccontextmanager
+    async def async_limit(self) -> typing.AsyncIterator[None]:
+        if not self.breaker.allow_request():
+            metrics.CIRCUIT_REJECTED_TOTAL.inc(host=self.host)
+            raise exceptions.CircuitOpenError()
+        blocked_for = self._blocked_until - time.monotonic()
+        if blocked_for > 0:
+            await asyncio.sleep(blocked_for)
+        wait_time = self.bucket.get_wait_time()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        async with self._semaphore:
+            yield
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+        self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 20.0)
+
+    def _block(self, retry_after: float | None) -> None:
+        if retry_after is not None:
+            self._blocked_until = max(
+                self._blocked_until, time.monotonic() + retry_after
+            )
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        self.breaker.record_failure()
+        self._block(retry_after)
+
+    def record_rate_limited(self, retry_after: float | None = None) -> None:
+        self.rate_limited_count += 1
+        self.bucket.rate = max(self.max_rate / 20.0, self.bucket.rate / 2.0)
+        self._block(retry_after)
+        log.warning(f"Rate limited by {self.host}, rate: {self.bucket.rate:.2f}/s")
+
+
+# semaphore of governor belongs to loop it was created on
+_governors: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, HostGovernor]
+] = weakref.WeakKeyDictionary()
+
+
+def get_governor(url: str) -> HostGovernor:
+    """
+    Has to be called from event loop thread
+    """
+    host = urllib.parse.urlsplit(url).netloc
+    loop_governors = _governors.setdefault(asyncio.get_running_loop(), {})
+    if host not in loop_governors:
+        loop_governors[host] = HostGovernor(host)
+    return loop_governors[host]
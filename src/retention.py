@@ -0,0 +1,154 @@
+"""
+Retention of balance history, old 15 minute snapshots are downsampled to hourly
+and later to daily ones, expired partitions are dropped as a whole
+
+Downsampling of each bucket size continues from stored watermark up to its
+cutoff, so run touches only history which aged past cutoff since last run and
+missed runs are caught up. Cutoffs are aligned to buckets, so no bucket is
+split between runs. In delta storage downsampling keeps first snapshot of
+bucket, which is keyframe only while keyframe interval divides bucket.
+"""
+import logging
+from datetime import datetime, timedelta
+
+import sqlalchemy
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import exceptions, time_utils
+from src.config import config
+from src.database import partitions, services
+
+log = logging.getLogger(__name__)
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+
+_DOWNSAMPLE_SQL = """
+DELETE FROM {table} AS stored
+USING (
+    SELECT DISTINCT address_id, timestamp
+    FROM (
+        SELECT address_id, timestamp, min(timestamp) OVER (
+            PARTITION BY address_id, timestamp / :bucket_seconds
+        ) AS kept_timestamp
+        FROM {table}
+        WHERE time >= :start_time AND time < :end_time
+    ) AS bucketed
+    WHERE timestamp <> kept_timestamp
+) AS dropped
+WHERE stored.address_id = dropped.address_id
+    AND stored.timestamp = dropped.timestamp
+    AND stored.time >= :start_time AND stored.time < :end_time
+"""
+_DOWNSAMPLED_TABLES = ["address_updates", "address_snapshots"]
+# tables whose rows older than first retained partition are deleted
+_EXPIRED_TABLES = {
+    "address_updates": "time",
+    "address_snapshots": "time",
+    "symbol_holdings": "bucket",
+}
+
+
+def can_downsample(bucket_seconds: int) -> bool:
+    """
+    Deltas between kept snapshots would be lost, unless each kept first
+    snapshot of bucket is keyframe
+    """
+    return (
+        not config.delta_storage or bucket_seconds % config.delta_keyframe_interval == 0
+    )
+
+
+async def async_downsample_snapshots(
+    start_time: datetime,
+    end_time: datetime,
+    bucket_seconds: int,
+    session: sql_asyncio.AsyncSession,
+) -> int:
+    """
+    Keeps only first snapshot of every address in each bucket between times
+    """
+    if not can_downsample(bucket_seconds):
+        raise exceptions.InvalidParamError(
+            f"Keyframe interval {config.delta_keyframe_interval}s does not divide "
+            f"bucket of {bucket_seconds}s"
+        )
+    deleted = 0
+    for table in _DOWNSAMPLED_TABLES:
+        delete_exec = await session.execute(
+            sqlalchemy.text(_DOWNSAMPLE_SQL.format(table=table)),
+            {
+                "start_time": start_time,
+                "end_time": end_time,
+                "bucket_seconds": bucket_seconds,
+            },
+        )
+        deleted += delete_exec.rowcount
+    await session.commit()
+    return deleted
+
+
+async def async_delete_expired_rows(
+    before: datetime, session: sql_asyncio.AsyncSession
+) -> int:
+    """
+    Deletes rows which dropping of partitions leaves behind, snapshot headers
+    and rows of default partition or unpartitioned tables
+    """
+    deleted = 0
+    for table, column in _EXPIRED_TABLES.items():
+        delete_exec = await session.execute(
+            sqlalchemy.text(f"DELETE FROM {table} WHERE {column} < :before"),
+            {"before": before},
+        )
+        deleted += delete_exec.rowcount
+    await session.commit()
+    return deleted
+
+
+def get_bucket_start(at_time: datetime, bucket_seconds: int) -> datetime:
+    """
+    Buckets are grouped by timestamp, as in downsampling query
+    """
+    timestamp = int(at_time.timestamp())
+    return time_utils.get_datetime_from_ts(timestamp - timestamp % bucket_seconds)
+
+
+async def async_run_retention(
+    current_time: datetime, session: sql_asyncio.AsyncSession
+) -> None:
+    hourly_cutoff = current_time - timedelta(days=config.retention_hourly_after_days)
+    daily_cutoff = current_time - timedelta(days=config.retention_daily_after_days)
+    drop_cutoff = current_time - timedelta(days=config.retention_drop_after_days)
+    await partitions.async_ensure_partitions(current_time, session)
+    dropped = await partitions.async_drop_expired_partitions(drop_cutoff, session)
+    # partition holding drop cutoff is kept whole, so is everything after it
+    retained_since = partitions.get_partition_start(drop_cutoff)
+    expired_deleted = await async_delete_expired_rows(retained_since, session)
+    downsampled: dict[int, int] = {}
+    for cutoff, bucket_seconds in (
+        (hourly_cutoff, HOUR_SECONDS),
+        (daily_cutoff, DAY_SECONDS),
+    ):
+        if not can_downsample(bucket_seconds):
+            log.warning(
+                f"Skipping downsampling to {bucket_seconds}s buckets, keyframe "
+                f"interval {config.delta_keyframe_interval}s does not divide it"
+            )
+            continue
+        downsampled_until = await services.async_find_downsampled_until(
+            bucket_seconds, session
+        )
+        start_time = max(downsampled_until or retained_since, retained_since)
+        end_time = get_bucket_start(cutoff, bucket_seconds)
+        if start_time >= end_time:
+            continue
+        downsampled[bucket_seconds] = await async_downsample_snapshots(
+            start_time, end_time, bucket_seconds, session
+        )
+        await services.async_save_downsampled_until(bucket_seconds, end_time, session)
+    log.info(
+        f"Retention, downsampled to hourly: {downsampled.get(HOUR_SECONDS)} rows, "
+        f"to daily: {downsampled.get(DAY_SECONDS)} rows, dropped partitions: "
+        f"{len(dropped)}, deleted expired rows: {expired_deleted}"
+    )
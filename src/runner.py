@@ -1,5 +1,6 @@
-import asyncio
+import contextlib
 import logging
+import typing
 from datetime import datetime
 
 from sqlalchemy.ext import asyncio as sql_asyncio
@@ -9,113 +10,433 @@ import src  # noqa
 from src import (
     aggregated_assets,
     coin_changes,
+    compaction,
     data,
     enums,
+    export,
+    holdings,
+    metrics,
     performance,
+    pipeline,
+    profiling,
+    ranking_api,
+    retention,
+    scheduling,
+    snapshot_store,
     spec,
+    spooling,
     time_utils,
+    tracing,
 )
-from src.database import services
+from src.config import config
+from src.database import services, unit_of_work
 
 log = logging.getLogger(__name__)
 
 
-async def async_calculate_address_performance(
-    address: data.Address,
-    last_aggregated_time: float,
-    last_aggregated_updates: list[data.AggregatedAsset],
-    new_aggregated_updates: list[data.AggregatedAsset],
-    performances: list[data.PerformanceResult],
-    current_datetime: datetime,
-) -> None:
-    performance_result = performance.calculate_performance(
-        old_address_updates=last_aggregated_updates,
-        new_address_updates=new_aggregated_updates,
-        start_time=time_utils.get_datetime_from_ts(last_aggregated_time),
-        end_time=current_datetime,
-        address=address,
-    )
-    performances.append(performance_result)
-
-
 async def async_save_aggregated_assets_for_address(
     address: data.Address,
     session: sql_asyncio.AsyncSession,
     new_aggregated_updates: list[data.AggregatedAsset],
-) -> None:
-    for aggregated_asset in new_aggregated_updates:
-        await services.async_save_aggregated_update(aggregated_asset, address, session)
+    last_aggregated_updates: list[data.AggregatedAsset] | None = None,
+    current_time: int | None = None,
+) -> list[data.AggregatedAsset]:
+    """
+    Saves new assets of address, returns them as they are read back from storage
+    """
+    if config.delta_storage and current_time is not None:
+        stored_updates = await services.async_save_delta_aggregated_updates(
+            updates=new_aggregated_updates,
+            previous_updates=last_aggregated_updates or [],
+            address=address,
+            timestamp=current_time,
+            session=session,
+        )
+    else:
+        for aggregated_asset in new_aggregated_updates:
+            await services.async_save_aggregated_update(
+                aggregated_asset, address, session
+            )
+        stored_updates = new_aggregated_updates
+    if config.holdings_index and current_time is not None:
+        await services.async_save_symbol_holdings(
+            holdings.create_symbol_holdings(
+                address, stored_updates, last_aggregated_updates, current_time
+            ),
+            session,
+        )
+    return stored_updates
+
+
+class FetchedAddress(typing.NamedTuple):
+    address: data.Address
+    address_update: data.AddressUpdate
+    # store of address continues trace of its fetch
+    fetch_span: tracing.Span
 
 
 async def async_run_single_address(
     address: data.Address,
-    performances: list[data.PerformanceResult],
+    snapshot_pairs: list[performance.SnapshotPair],
     run_time_dt: datetime,
     session: sql_asyncio.AsyncSession,
     provide_assets: spec.AssetProvider,
     current_time: int,
+    refresh_queue: scheduling.RefreshQueue | None = None,
+    store: snapshot_store.SnapshotStore | None = None,
+    spool: spooling.Spool | None = None,
 ) -> None:
+    with tracing.span("run_single_address", address=address.address):
+        fetched = await _async_fetch_address(
+            address, provide_assets, current_time, refresh_queue
+        )
+        if fetched is None:
+            return
+        with metrics.ADDRESS_UPDATE_SECONDS.time(stage="write"):
+            await _async_store_address_update(
+                fetched.address,
+                fetched.address_update,
+                snapshot_pairs,
+                session,
+                current_time,
+                refresh_queue,
+                store,
+                spool,
+            )
+            if spool is not None:
+                await spool.async_flush()
+
+
+async def _async_find_last_aggregated_updates(
+    address: data.Address,
+    session: sql_asyncio.AsyncSession,
+    spool: spooling.Spool | None,
+) -> list[data.AggregatedAsset]:
+    """
+    With spool database errors are not fatal, address is updated without
+    previous snapshot
+    """
+    if spool is None:
+        return await services.async_find_address_last_aggregated_updates(
+            address, session
+        )
+    try:
+        return await services.async_find_address_last_aggregated_updates(
+            address, session
+        )
+    except spooling.DATABASE_ERRORS as e:
+        log.warning(f"Could not read last agg updates of {address.address}, e: {e!r}")
+        with contextlib.suppress(*spooling.DATABASE_ERRORS):
+            await session.rollback()
+        return []
+
+
+async def _async_fetch_address(
+    address: data.Address,
+    provide_assets: spec.AssetProvider,
+    current_time: int,
+    refresh_queue: scheduling.RefreshQueue | None,
+) -> FetchedAddress | None:
     log.info(f"Updating address: {address.address}")
-    last_aggregated_updates: list[
-        data.AggregatedAsset
-    ] = await services.async_find_address_last_aggregated_updates(address, session)
-    address_update = await provide_assets(address, current_time)
+    skip_reason = "fetch_failed"
+    with metrics.ADDRESS_UPDATE_SECONDS.time(stage="fetch"), tracing.span(
+        "fetch_address", address=address.address
+    ) as fetch_span:
+        try:
+            address_update = await provide_assets(address, current_time)
+        except Exception as e:
+            # failing provider must not stop update of other addresses
+            log.error(f"Fetching address {address.address} failed, e: {e!r}")
+            fetch_span.set_attribute("error", repr(e))
+            skip_reason = "fetch_error"
+            address_update = None
     if not address_update:
         log.warning(
             f"Could not fetch last agg updates for address: {address}, skipping update"
         )
-        return
-    new_aggregated_updates = address_update.aggregated_assets
-    await async_save_aggregated_assets_for_address(
-        address=address, new_aggregated_updates=new_aggregated_updates, session=session
+        metrics.SKIPPED_ADDRESSES_TOTAL.inc(reason=skip_reason)
+        if refresh_queue is not None:
+            refresh_queue.reschedule(address, current_time)
+        return None
+    return FetchedAddress(
+        address, compaction.compact_address_update(address_update), fetch_span
     )
+
+
+async def _async_store_address_update(
+    address: data.Address,
+    address_update: data.AddressUpdate,
+    snapshot_pairs: list[performance.SnapshotPair],
+    session: sql_asyncio.AsyncSession,
+    current_time: int,
+    refresh_queue: scheduling.RefreshQueue | None,
+    store: snapshot_store.SnapshotStore | None,
+    spool: spooling.Spool | None,
+) -> None:
+    last_aggregated_updates = store.get(address) if store is not None else None
+    if last_aggregated_updates is None:
+        last_aggregated_updates = await _async_find_last_aggregated_updates(
+            address, session, spool
+        )
+    new_aggregated_updates = address_update.aggregated_assets
+    tracing.get_current_span().set_attribute("rows", len(new_aggregated_updates))
+    if spool is not None:
+        spool.append(
+            data.SpooledRecord(
+                address=address, timestamp=current_time, address_update=address_update
+            )
+        )
+        stored_updates = new_aggregated_updates
+    else:
+        stored_updates = await async_save_aggregated_assets_for_address(
+            address=address,
+            new_aggregated_updates=new_aggregated_updates,
+            session=session,
+            last_aggregated_updates=last_aggregated_updates,
+            current_time=current_time,
+        )
+
+    def apply_stored_update() -> None:
+        if store is not None:
+            store.put(
+                address,
+                data.AddressUpdate(
+                    value_usd=address_update.value_usd,
+                    aggregated_assets=stored_updates,
+                ),
+            )
+        if refresh_queue is not None:
+            refresh_queue.reschedule(
+                address, current_time, last_aggregated_updates, address_update
+            )
+        if last_aggregated_updates:
+            last_aggregated_time = last_aggregated_updates[0].timestamp
+            snapshot_pairs.append(
+                performance.SnapshotPair(
+                    address,
+                    time_utils.get_datetime_from_ts(last_aggregated_time),
+                    last_aggregated_updates,
+                    new_aggregated_updates,
+                )
+            )
+
+    # store, queue and performances must not get ahead of database
+    unit_of_work.defer(session, apply_stored_update)
     if not last_aggregated_updates:
         log.warning(
             f"Could not find last agg updates for address: {address}, skipping performance"
         )
-        return
-
-    last_aggregated_time = last_aggregated_updates[0].timestamp
-    await async_calculate_address_performance(
-        address,
-        last_aggregated_time,
-        last_aggregated_updates,
-        new_aggregated_updates,
-        performances,
-        run_time_dt,
-    )
+        metrics.SKIPPED_ADDRESSES_TOTAL.inc(reason="no_previous_snapshot")
+
+
+async def _async_find_addresses(
+    session: sql_asyncio.AsyncSession,
+    store: snapshot_store.SnapshotStore | None,
+    spool: spooling.Spool | None,
+) -> list[data.Address]:
+    """
+    With spool and snapshot store addresses known to store are updated while
+    database is unavailable
+    """
+    try:
+        addresses_models = await services.async_find_all_addresses(session)
+    except spooling.DATABASE_ERRORS as e:
+        if spool is None or store is None:
+            raise
+        log.warning(f"Could not read addresses, updating addresses of store, e: {e!r}")
+        with contextlib.suppress(*spooling.DATABASE_ERRORS):
+            await session.rollback()
+        return store.get_addresses()
+    return [
+        services.convert_address_model(address_model)
+        for address_model in addresses_models
+    ]
+
+
+async def _async_write_fetched_addresses(
+    batch: list[FetchedAddress],
+    snapshot_pairs: list[performance.SnapshotPair],
+    session_maker: sessionmaker,
+    current_time: int,
+    refresh_queue: scheduling.RefreshQueue | None,
+    store: snapshot_store.SnapshotStore | None,
+    spool: spooling.Spool | None,
+) -> None:
+    """
+    Writes batch of fetched addresses in single unit of work, with spool they
+    are only appended to it
+    """
+    async with session_maker() as session:
+
+        async def async_store(fetched: FetchedAddress) -> None:
+            with metrics.ADDRESS_UPDATE_SECONDS.time(stage="write"), tracing.use_span(
+                fetched.fetch_span
+            ), tracing.span("store_address", address=fetched.address.address):
+                await _async_store_address_update(
+                    fetched.address,
+                    fetched.address_update,
+                    snapshot_pairs,
+                    session,
+                    current_time,
+                    refresh_queue,
+                    store,
+                    spool,
+                )
+
+        if spool is not None:
+            for fetched in batch:
+                await async_store(fetched)
+            await spool.async_flush()
+            return
+        async with unit_of_work.UnitOfWork(session, batch_size=len(batch)) as work:
+            for fetched in batch:
+                async with work.async_scope(fetched.address.address):
+                    await async_store(fetched)
+    if work.failed_count:
+        metrics.SKIPPED_ADDRESSES_TOTAL.inc(work.failed_count, reason="failed")
 
 
 async def async_update_all_addresses(
     session_maker: sessionmaker,
     provide_assets: spec.AssetProvider = aggregated_assets.async_provide_aggregated_assets,
     sleep_time: int = 15,
+    refresh_queue: scheduling.RefreshQueue | None = None,
+    store: snapshot_store.SnapshotStore | None = None,
+    spool: spooling.Spool | None = None,
+    addresses: list[data.Address] | None = None,
+    fetch_workers: int = config.pipeline_fetch_workers,
+    write_workers: int = config.pipeline_write_workers,
+    batch_size: int = config.unit_of_work_batch_size,
 ) -> None:
-    async with session_maker() as session:
+    """
+    Updates given addresses, by default all stored addresses
+    """
+    async with session_maker() as session, profiling.async_profile_run(
+        "update_all_addresses"
+    ):
         run_time = time_utils.get_time_now()
         run_time_dt = time_utils.get_datetime_from_ts(run_time)
-        addresses_models = await services.async_find_all_addresses(session)
-        addresses = [
-            services.convert_address_model(address_model)
-            for address_model in addresses_models
-        ]
-        performances: list[data.PerformanceResult] = []
-        for address in addresses:
-            await async_run_single_address(
-                address=address,
-                performances=performances,
-                provide_assets=provide_assets,
-                run_time_dt=run_time_dt,
-                session=session,
-                current_time=run_time,
+        if addresses is None:
+            addresses = await _async_find_addresses(session, store, spool)
+        if refresh_queue is not None:
+            refresh_queue.sync_addresses(addresses, run_time)
+            addresses = refresh_queue.pop_due_addresses(run_time)
+            log.info(
+                f"Refreshing {len(addresses)} due addresses "
+                f"out of {len(refresh_queue) + len(addresses)}"
+            )
+        snapshot_pairs: list[performance.SnapshotPair] = []
+
+        async def async_fetch(address: data.Address) -> FetchedAddress | None:
+            return await _async_fetch_address(
+                address, provide_assets, run_time, refresh_queue
             )
 
-            await asyncio.sleep(sleep_time)
-        [
-            await services.async_save_performance_result(single_performance, session)
-            # type: ignore
-            for single_performance in performances
-        ]
+        async def async_write(batch: list[FetchedAddress]) -> None:
+            await _async_write_fetched_addresses(
+                batch,
+                snapshot_pairs,
+                session_maker,
+                run_time,
+                refresh_queue,
+                store,
+                spool,
+            )
+
+        await pipeline.async_run_pipeline(
+            "update_all_addresses",
+            addresses,
+            async_fetch,
+            async_write,
+            producer_count=fetch_workers,
+            consumer_count=write_workers,
+            batch_size=batch_size,
+            produce_interval=sleep_time,
+        )
+        performances = performance.calculate_performances(snapshot_pairs, run_time_dt)
+        if spool is not None:
+            for performance_result in performances:
+                spool.append(
+                    data.SpooledRecord(
+                        address=performance_result.address,
+                        timestamp=run_time,
+                        performance=performance_result,
+                    )
+                )
+            await spool.async_flush()
+        else:
+            await services.async_save_performance_results(performances, session)
+    if spool is not None:
+        await async_drain_spool(spool, session_maker)
+
+
+async def _async_load_spooled_records(
+    records: list[data.SpooledRecord], session: sql_asyncio.AsyncSession
+) -> list[data.SpooledRecord]:
+    """
+    Loads records of segment in single transaction, in order they were spooled,
+    returns records whose writes were rolled back
+    """
+    performances: list[data.PerformanceResult] = []
+    failed_records: list[data.SpooledRecord] = []
+    async with unit_of_work.UnitOfWork(session, batch_size=len(records) + 1) as work:
+        for record in records:
+            if record.performance is not None:
+                performances.append(record.performance)
+            if record.address_update is None:
+                continue
+            failed_count = work.failed_count
+            async with work.async_scope(record.address.address):
+                last_aggregated_updates = None
+                if config.delta_storage or config.holdings_index:
+                    last_aggregated_updates = (
+                        await services.async_find_address_last_aggregated_updates(
+                            record.address, session
+                        )
+                    )
+                await async_save_aggregated_assets_for_address(
+                    address=record.address,
+                    new_aggregated_updates=record.address_update.aggregated_assets,
+                    session=session,
+                    last_aggregated_updates=last_aggregated_updates,
+                    current_time=record.timestamp,
+                )
+            if work.failed_count > failed_count:
+                failed_records.append(record)
+        await services.async_save_performance_results(performances, session)
+    if work.failed_count:
+        metrics.SKIPPED_ADDRESSES_TOTAL.inc(work.failed_count, reason="failed")
+    return failed_records
+
+
+async def async_drain_spool(spool: spooling.Spool, session_maker: sessionmaker) -> int:
+    """
+    Loads sealed segments of spool oldest first and returns number of drained
+    records. Drain stops at first segment which fails, so records stay ordered
+    """
+    drained_count = 0
+    async with spool.drain_lock:
+        spool.seal()
+        for path in spool.get_sealed_paths():
+            records = spool.read_segment(path)
+            try:
+                async with session_maker() as session:
+                    failed_records = await _async_load_spooled_records(records, session)
+            except spooling.DATABASE_ERRORS as e:
+                log.warning(f"Could not drain spool segment {path}, e: {e!r}")
+                metrics.SPOOL_DRAIN_FAILURES_TOTAL.inc()
+                break
+            # rest of segment is committed, so it can not be loaded again
+            if failed_records:
+                spool.dead_letter(failed_records)
+            spool.remove_segment(path)
+            drained_count += len(records) - len(failed_records)
+            metrics.SPOOLED_RECORDS_TOTAL.inc(
+                len(records) - len(failed_records), state="drained"
+            )
+    if drained_count:
+        log.info(f"Drained {drained_count} spooled records")
+    return drained_count
 
 
 async def async_run_address_ranking(
@@ -125,12 +446,18 @@ async def async_run_address_ranking(
 ) -> None:
     if not current_time:
         current_time = datetime.now()
-    async with session_maker() as session:
-        await performance.async_save_address_ranking(
-            ranking_type=time_type,
-            session=session,
-            run_time=current_time,
-        )
+    async with session_maker() as session, profiling.async_profile_run(
+        "address_ranking"
+    ):
+        with metrics.RANKING_SECONDS.time(
+            job="address_ranking", ranking_type=time_type.value
+        ), tracing.span("address_ranking", ranking_type=time_type.value):
+            await performance.async_save_address_ranking(
+                ranking_type=time_type,
+                session=session,
+                run_time=current_time,
+            )
+        ranking_api.invalidate_cache()
 
 
 async def async_run_coin_change_ranking(
@@ -140,5 +467,33 @@ async def async_run_coin_change_ranking(
 ) -> None:
     if not current_time:
         current_time = datetime.now()
+    async with session_maker() as session, profiling.async_profile_run(
+        "coin_change_ranking"
+    ):
+        with metrics.RANKING_SECONDS.time(
+            job="coin_change_ranking", ranking_type=time_type.value
+        ), tracing.span("coin_change_ranking", ranking_type=time_type.value):
+            await coin_changes.async_run_coin_ranking(time_type, current_time, session)
+        ranking_api.invalidate_cache()
+
+
+async def async_run_retention(
+    session_maker: sessionmaker,
+    current_time: datetime | None = None,
+) -> None:
+    if not current_time:
+        current_time = datetime.now()
+    async with session_maker() as session:
+        await retention.async_run_retention(current_time, session)
+
+
+async def async_run_export(session_maker: sessionmaker) -> None:
+    async with session_maker() as session:
+        await export.async_export_all_tables(session)
+
+
+async def async_warm_load_snapshot_store(
+    store: snapshot_store.SnapshotStore, session_maker: sessionmaker
+) -> None:
     async with session_maker() as session:
-        await coin_changes.async_run_coin_ranking(time_type, current_time, session)
+        await store.async_warm_load(session)
@@ -0,0 +1,148 @@
+"""
+Adaptive refresh scheduling of addresses
+
+Every address gets its own refresh interval derived from how much its portfolio
+changed between the last two snapshots and from its USD value. Active whales are
+refreshed on every run, dormant wallets fall back to the max interval, which is
+kept at 30 minutes so every hourly ranking window still contains a full
+performance run.
+"""
+import heapq
+import itertools
+import logging
+
+from src import data
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+
+def _assets_pct_by_symbol(assets: list[data.AggregatedAsset]) -> dict[str, float]:
+    pct_by_symbol: dict[str, float] = {}
+    for asset in assets:
+        symbol_lowercase = asset.symbol.lower()
+        pct_by_symbol[symbol_lowercase] = (
+            pct_by_symbol.get(symbol_lowercase, 0.0) + asset.value_pct
+        )
+    return pct_by_symbol
+
+
+def calculate_change_rate(
+    old_assets: list[data.AggregatedAsset],
+    new_assets: list[data.AggregatedAsset],
+    current_time: int,
+) -> float:
+    """
+    Portfolio turnover in percentage points per hour between two snapshots
+    """
+    if not old_assets:
+        return 0.0
+    old_pct = _assets_pct_by_symbol(old_assets)
+    new_pct = _assets_pct_by_symbol(new_assets)
+    turnover = 0.5 * sum(
+        abs(new_pct.get(symbol, 0.0) - old_pct.get(symbol, 0.0))
+        for symbol in old_pct.keys() | new_pct.keys()
+    )
+    elapsed_hours = max(current_time - old_assets[0].timestamp, 1) / 3600.0
+    return turnover / elapsed_hours
+
+
+def calculate_refresh_interval(
+    change_rate: float,
+    value_usd: float,
+    min_interval: int = config.refresh_min_interval,
+    max_interval: int = config.refresh_max_interval,
+    active_change_pct: float = config.refresh_active_change_pct,
+    whale_value_usd: float = config.refresh_whale_value_usd,
+) -> int:
+    priority = 1.0 + change_rate / active_change_pct + value_usd / whale_value_usd
+    interval = round(max_interval / priority)
+    return max(min_interval, min(max_interval, interval))
+
+
+class RefreshQueue:
+    """
+    Priority queue of addresses keyed by the time their next refresh is due
+    """
+
+    CHANGE_RATE_SMOOTHING = 0.5
+
+    def __init__(
+        self,
+        min_interval: int = config.refresh_min_interval,
+        max_interval: int = config.refresh_max_interval,
+        tolerance: int = config.refresh_tolerance,
+    ) -> None:
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._tolerance = tolerance
+        self._heap: list[tuple[int, int, data.Address]] = []
+        self._due_times: dict[data.Address, int] = {}
+        self._change_rates: dict[data.Address, float] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._due_times)
+
+    def _push(self, address: data.Address, due_time: int) -> None:
+        self._due_times[address] = due_time
+        heapq.heappush(self._heap, (due_time, next(self._counter), address))
+
+    def sync_addresses(self, addresses: list[data.Address], current_time: int) -> None:
+        """
+        New addresses are due immediately, removed addresses are dropped
+        """
+        wanted = set(addresses)
+        for address in list(self._due_times):
+            if address not in wanted:
+                del self._due_times[address]
+                self._change_rates.pop(address, None)
+        for address in addresses:
+            if address not in self._due_times:
+                self._push(address, current_time)
+
+    def pop_due_addresses(self, current_time: int) -> list[data.Address]:
+        """
+        Addresses due until current time plus tolerance, so pass which starts
+        slightly later than previous one does not postpone them by whole slot
+        """
+        due_addresses: list[data.Address] = []
+        while self._heap and self._heap[0][0] <= current_time + self._tolerance:
+            due_time, _, address = heapq.heappop(self._heap)
+            if self._due_times.get(address) != due_time:
+                continue  # stale entry, address was rescheduled or removed
+            del self._due_times[address]
+            due_addresses.append(address)
+        return due_addresses
+
+    def reschedule(
+        self,
+        address: data.Address,
+        current_time: int,
+        last_assets: list[data.AggregatedAsset] | None = None,
+        address_update: data.AddressUpdate | None = None,
+    ) -> int:
+        """
+        Schedules next refresh of address, unknown state is refreshed on next run
+        """
+        if not last_assets or not address_update:
+            interval = self._min_interval
+        else:
+            change_rate = calculate_change_rate(
+                last_assets, address_update.aggregated_assets, current_time
+            )
+            previous_rate = self._change_rates.get(address, change_rate)
+            smoothed_rate = (
+                self.CHANGE_RATE_SMOOTHING * change_rate
+                + (1.0 - self.CHANGE_RATE_SMOOTHING) * previous_rate
+            )
+            self._change_rates[address] = smoothed_rate
+            interval = calculate_refresh_interval(
+                smoothed_rate,
+                address_update.value_usd,
+                min_interval=self._min_interval,
+                max_interval=self._max_interval,
+            )
+        self._push(address, current_time + interval)
+        log.debug(f"Address {address.address} next refresh in {interval}s")
+        return interval
@@ -0,0 +1,117 @@
+"""
+Process resident store of last snapshot of every address, so each pass reads
+previous state from memory instead of database
+
+Store can be backed by append only JSON lines file, which is read through
+mmap on start and compacted once it grows past compact factor times number of
+addresses.
+"""
+import logging
+import mmap
+import os
+
+import pydantic
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import data
+from src.config import config
+from src.database import services
+
+log = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        path: str | None = config.snapshot_store_path,
+        compact_factor: int = config.snapshot_store_compact_factor,
+    ) -> None:
+        self.path = path
+        self.compact_factor = compact_factor
+        self._snapshots: dict[data.Address, data.AddressUpdate] = {}
+        self._logged_entries = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, address: data.Address) -> list[data.AggregatedAsset] | None:
+        """
+        Returns last assets of address, None when address is not known to store
+        """
+        address_update = self._snapshots.get(address)
+        if address_update is None:
+            return None
+        return address_update.aggregated_assets
+
+    def get_addresses(self) -> list[data.Address]:
+        return list(self._snapshots)
+
+    def put(self, address: data.Address, address_update: data.AddressUpdate) -> None:
+        self._snapshots[address] = address_update
+        if not self.path:
+            return
+        with open(self.path, "a") as store_file:
+            store_file.write(
+                data.StoredAddressUpdate(
+                    address=address, address_update=address_update
+                ).json()
+                + "\n"
+            )
+        self._logged_entries += 1
+        if self._logged_entries > self.compact_factor * max(len(self._snapshots), 1):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Rewrites backing file with only last snapshot of every address
+        """
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as store_file:
+            for address, address_update in self._snapshots.items():
+                store_file.write(
+                    data.StoredAddressUpdate(
+                        address=address, address_update=address_update
+                    ).json()
+                    + "\n"
+                )
+        os.replace(tmp_path, self.path)
+        self._logged_entries = len(self._snapshots)
+
+    def load_file(self) -> bool:
+        """
+        Loads snapshots from backing file, returns False when there is none
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        if os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, "rb") as store_file, mmap.mmap(
+            store_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as store_map:
+            for line in iter(store_map.readline, b""):
+                try:
+                    stored = data.StoredAddressUpdate.parse_raw(line)
+                except pydantic.ValidationError:
+                    log.warning("Skipping incomplete line of snapshot store")
+                    continue
+                self._snapshots[stored.address] = stored.address_update
+                self._logged_entries += 1
+        return True
+
+    async def async_warm_load(self, session: sql_asyncio.AsyncSession) -> None:
+        """
+        Loads store from backing file or otherwise with one bulk database query
+        """
+        if self.load_file():
+            log.info(f"Loaded {len(self)} snapshots from {self.path}")
+            return
+        last_updates = await services.async_find_all_last_aggregated_updates(session)
+        for address, assets in last_updates.items():
+            self._snapshots[address] = data.AddressUpdate(
+                value_usd=sum(asset.value_usd for asset in assets),
+                aggregated_assets=assets,
+            )
+        self.compact()
+        log.info(f"Loaded {len(self)} snapshots from database")
@@ -0,0 +1,102 @@
+"""
+Delta encoding of balance snapshots
+
+Keyframe snapshot stores every asset, snapshots between keyframes store only
+assets whose amount or price moved beyond threshold and zero tombstones for
+assets which were removed.
+"""
+from src import data, token_registry
+from src.config import config
+
+
+def is_keyframe(
+    timestamp: int,
+    last_snapshot_timestamp: int | None,
+    keyframe_interval: int = config.delta_keyframe_interval,
+) -> bool:
+    """
+    First snapshot of address in each keyframe interval is keyframe
+    """
+    if last_snapshot_timestamp is None:
+        return True
+    return (
+        timestamp // keyframe_interval != last_snapshot_timestamp // keyframe_interval
+    )
+
+
+def _moved_beyond_threshold(old: float, new: float, threshold_pct: float) -> bool:
+    if old == 0.0:
+        return new != 0.0
+    return abs(new - old) / abs(old) * 100.0 > threshold_pct
+
+
+def _create_tombstone(
+    asset: data.AggregatedAsset, timestamp: int
+) -> data.AggregatedAsset:
+    return data.AggregatedAsset(
+        symbol=asset.symbol,
+        amount=0.0,
+        price=asset.price,
+        value_usd=0.0,
+        value_pct=0.0,
+        timestamp=timestamp,
+    )
+
+
+def is_tombstone(asset: data.AggregatedAsset) -> bool:
+    return asset.amount == 0.0 and asset.value_usd == 0.0
+
+
+def _get_key(asset: data.AggregatedAsset) -> str:
+    return token_registry.normalize_symbol(asset.symbol)
+
+
+def extract_changed_assets(
+    previous_assets: list[data.AggregatedAsset],
+    new_assets: list[data.AggregatedAsset],
+    timestamp: int,
+    threshold_pct: float = config.delta_threshold_pct,
+) -> list[data.AggregatedAsset]:
+    # snapshots stored before symbols were normalized keep provider casing
+    previous_by_symbol = {_get_key(asset): asset for asset in previous_assets}
+    new_symbols = {_get_key(asset) for asset in new_assets}
+    changed_assets: list[data.AggregatedAsset] = []
+    for new_asset in new_assets:
+        previous_asset = previous_by_symbol.get(_get_key(new_asset))
+        if (
+            not previous_asset
+            or _moved_beyond_threshold(
+                previous_asset.amount, new_asset.amount, threshold_pct
+            )
+            or _moved_beyond_threshold(
+                previous_asset.price, new_asset.price, threshold_pct
+            )
+        ):
+            changed_assets.append(new_asset)
+    for symbol, previous_asset in previous_by_symbol.items():
+        if symbol not in new_symbols:
+            changed_assets.append(_create_tombstone(previous_asset, timestamp))
+    return changed_assets
+
+
+def reconstruct_assets(
+    stored_assets: list[data.AggregatedAsset], timestamp: int
+) -> list[data.AggregatedAsset]:
+    """
+    Folds keyframe and following deltas (sorted by timestamp) into full snapshot
+    """
+    assets_by_symbol: dict[str, data.AggregatedAsset] = {}
+    for stored_asset in stored_assets:
+        if is_tombstone(stored_asset):
+            assets_by_symbol.pop(_get_key(stored_asset), None)
+        else:
+            assets_by_symbol[_get_key(stored_asset)] = stored_asset
+    sum_value_usd = sum(asset.value_usd for asset in assets_by_symbol.values())
+    reconstructed: list[data.AggregatedAsset] = []
+    for asset in assets_by_symbol.values():
+        value_pct = asset.value_usd / sum_value_usd * 100.0 if sum_value_usd else 0.0
+        reconstructed.append(
+            asset.copy(update={"value_pct": value_pct, "timestamp": timestamp})
+        )
+    reconstructed.sort(key=lambda x: x.value_usd, reverse=True)
+    return reconstructed
@@ -0,0 +1,214 @@
+"""
+Write ahead spool of fetched address updates and performances, so update pass
+keeps fetching while database is slow or down
+
+Records are JSON prefixed by length and crc, appended to preallocated segment
+files through mmap. Header is written after payload, so record torn by crash
+is never read. Drainer seals active segment and loads sealed segments oldest
+first, segment file is deleted only after its records are committed.
+Records which database rejects are moved to dead letter file of spool.
+
+With sync, records are not synced to disk one by one. Pages written since
+last sync are flushed once per write batch in worker thread and whole segment
+on seal, so durability holds per batch: crash of host may lose records of
+batch which was not flushed yet.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import pydantic
+import sqlalchemy
+
+from src import data, metrics
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+# errors of unreachable or failing database, on which records stay spooled
+DATABASE_ERRORS = (sqlalchemy.exc.SQLAlchemyError, OSError)
+
+_HEADER = struct.Struct(">II")
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+_DEAD_LETTER_NAME = "dead-letter.jsonl"
+
+
+def read_payloads(buffer: bytes | mmap.mmap) -> tuple[list[bytes], int]:
+    """
+    Returns payloads of complete records and offset where next record starts
+    """
+    payloads: list[bytes] = []
+    offset = 0
+    while offset + _HEADER.size <= len(buffer):
+        length, checksum = _HEADER.unpack_from(buffer, offset)
+        start = offset + _HEADER.size
+        end = start + length
+        if length == 0 or end > len(buffer):
+            break
+        payload = buffer[start:end]
+        if zlib.crc32(payload) != checksum:
+            log.warning(f"Skipping corrupted tail of spool segment at {offset}")
+            break
+        payloads.append(payload)
+        offset = end
+    return payloads, offset
+
+
+class Segment:
+    def __init__(self, path: str, size: int, sync: bool = True) -> None:
+        self.path = path
+        self.sync = sync
+        with open(path, "ab") as segment_file:
+            if segment_file.tell() < size:
+                segment_file.truncate(size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        payloads, self.offset = read_payloads(self._map)
+        self.record_count = len(payloads)
+        self.synced_offset = self.offset
+        # flush runs in worker thread, segment must not be closed under it
+        self._lock = threading.Lock()
+
+    def append(self, payload: bytes) -> bool:
+        """
+        Writes record, returns False when it does not fit into segment
+        """
+        start = self.offset + _HEADER.size
+        end = start + len(payload)
+        if end > len(self._map):
+            return False
+        self._map[start:end] = payload
+        _HEADER.pack_into(self._map, self.offset, len(payload), zlib.crc32(payload))
+        self.offset = end
+        self.record_count += 1
+        return True
+
+    def flush(self) -> None:
+        """
+        Syncs pages written since last flush
+        """
+        with self._lock:
+            offset = self.offset
+            if self._map.closed or offset == self.synced_offset:
+                return
+            start = self.synced_offset - self.synced_offset % mmap.PAGESIZE
+            self._map.flush(start, offset - start)
+            self.synced_offset = offset
+
+    def close(self) -> None:
+        """
+        Flushes segment and trims unused preallocated space
+        """
+        with self._lock:
+            self._map.flush()
+            self.synced_offset = self.offset
+            self._map.close()
+            self._file.truncate(self.offset)
+            self._file.close()
+
+
+class Spool:
+    def __init__(
+        self,
+        directory: str = config.spool_dir,
+        segment_size: int = config.spool_segment_size,
+        sync: bool = config.spool_sync,
+    ) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync = sync
+        # drains of update pass and scheduled job must not load same segment
+        self.drain_lock = asyncio.Lock()
+        os.makedirs(directory, exist_ok=True)
+        sequences = [self._get_sequence(path) for path in self.get_segment_paths()]
+        self._sequence = max(sequences, default=0)
+        self._active: Segment | None = None
+
+    @staticmethod
+    def _get_sequence(path: str) -> int:
+        name = os.path.basename(path)
+        return int(name.removeprefix(_SEGMENT_PREFIX).removesuffix(_SEGMENT_SUFFIX))
+
+    def get_segment_paths(self) -> list[str]:
+        names = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def get_sealed_paths(self) -> list[str]:
+        active_path = self._active.path if self._active is not None else None
+        return [path for path in self.get_segment_paths() if path != active_path]
+
+    def _open_segment(self, min_size: int) -> Segment:
+        self._sequence += 1
+        path = os.path.join(
+            self.directory, f"{_SEGMENT_PREFIX}{self._sequence:012d}{_SEGMENT_SUFFIX}"
+        )
+        return Segment(path, max(self.segment_size, min_size), self.sync)
+
+    def append(self, record: data.SpooledRecord) -> None:
+        payload = record.json().encode()
+        if self._active is None or not self._active.append(payload):
+            self.seal()
+            self._active = self._open_segment(_HEADER.size + len(payload))
+            self._active.append(payload)
+        metrics.SPOOLED_RECORDS_TOTAL.inc(state="spooled")
+
+    async def async_flush(self) -> None:
+        """
+        Syncs records appended to active segment off event loop
+        """
+        if not self.sync or self._active is None:
+            return
+        await asyncio.to_thread(self._active.flush)
+
+    def seal(self) -> None:
+        """
+        Closes active segment, next record starts new one
+        """
+        if self._active is None:
+            return
+        self._active.close()
+        self._active = None
+
+    def read_segment(self, path: str) -> list[data.SpooledRecord]:
+        if os.path.getsize(path) == 0:
+            return []
+        with open(path, "rb") as segment_file, mmap.mmap(
+            segment_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as segment_map:
+            payloads, _ = read_payloads(segment_map)
+        records: list[data.SpooledRecord] = []
+        for payload in payloads:
+            try:
+                records.append(data.SpooledRecord.parse_raw(payload))
+            except pydantic.ValidationError:
+                log.warning(f"Skipping invalid record of spool segment {path}")
+        return records
+
+    def remove_segment(self, path: str) -> None:
+        os.remove(path)
+
+    def get_dead_letter_path(self) -> str:
+        return os.path.join(self.directory, _DEAD_LETTER_NAME)
+
+    def dead_letter(self, records: list[data.SpooledRecord]) -> None:
+        """
+        Appends records which can not be loaded as JSON lines, so they are kept
+        for inspection after their segment is removed
+        """
+        with open(self.get_dead_letter_path(), "a") as dead_letter_file:
+            for record in records:
+                dead_letter_file.write(record.json() + "\n")
+            if self.sync:
+                dead_letter_file.flush()
+                os.fsync(dead_letter_file.fileno())
+        metrics.SPOOLED_RECORDS_TOTAL.inc(len(records), state="dead_lettered")
+        log.warning(f"Moved {len(records)} spooled records to dead letter file")
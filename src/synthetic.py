@@ -0,0 +1,298 @@
+"""
+Seeded generator of synthetic wallet populations for load testing
+
+Same seed always gives same wallets and snapshots, whatever order they are
+requested in, as every wallet, price step and flow draws from its own seeded
+random generator. Wallets hold heavy tailed number of tokens picked by
+popularity, prices follow random walks, wallets deposit and withdraw between
+snapshots and some of them hold worthless spam tokens.
+"""
+import hashlib
+import itertools
+import logging
+import math
+import random
+import typing
+
+from sqlalchemy import orm
+
+from src import (
+    aggregated_assets,
+    compaction,
+    data,
+    holdings,
+    performance,
+    time_utils,
+)
+from src.config import config
+from src.database import services, unit_of_work
+
+log = logging.getLogger(__name__)
+
+STABLE_SYMBOL = "USDC"
+SPAM_PRICE = 1e-6
+
+# amounts of wallet by token index, spam tokens follow regular ones
+Holdings = dict[int, float]
+
+
+class SyntheticMarket:
+    def __init__(
+        self,
+        seed: int,
+        token_count: int = 500,
+        spam_token_count: int = 200,
+        volatility: float = 0.02,
+    ) -> None:
+        self.seed = seed
+        self.volatility = volatility
+        self.symbols = [
+            STABLE_SYMBOL,
+            *(f"TKN{index}" for index in range(1, token_count)),
+            *(f"SPAM{index}" for index in range(spam_token_count)),
+        ]
+        self.token_count = token_count
+        rng = random.Random(f"{seed}:market")
+        self._paths = [[1.0]] + [
+            [math.exp(rng.gauss(0.0, 3.0))] for _ in range(1, token_count)
+        ]
+        # popular tokens are held by many wallets, with Zipf like weights
+        self.cum_weights = list(
+            itertools.accumulate(1.0 / (rank + 1) for rank in range(token_count))
+        )
+
+    def is_spam(self, token: int) -> bool:
+        return token >= self.token_count
+
+    def get_price(self, token: int, step: int) -> float:
+        if self.is_spam(token):
+            return SPAM_PRICE
+        if token == 0:
+            return 1.0
+        path = self._paths[token]
+        while len(path) <= step:
+            rng = random.Random(f"{self.seed}:price:{token}:{len(path)}")
+            drift = -self.volatility**2 / 2.0
+            path.append(path[-1] * math.exp(rng.gauss(drift, self.volatility)))
+        return path[step]
+
+
+class SyntheticPopulation:
+    def __init__(
+        self,
+        seed: int,
+        wallet_count: int,
+        market: SyntheticMarket | None = None,
+        max_tokens: int = 200,
+        spam_probability: float = 0.3,
+        flow_probability: float = 0.1,
+    ) -> None:
+        self.seed = seed
+        self.wallet_count = wallet_count
+        self.market = market or SyntheticMarket(seed)
+        self.max_tokens = max_tokens
+        self.spam_probability = spam_probability
+        self.flow_probability = flow_probability
+
+    def get_address(self, index: int) -> data.Address:
+        digest = hashlib.sha1(f"{self.seed}:address:{index}".encode()).hexdigest()
+        return data.Address(address=f"0x{digest}")
+
+    def get_addresses(self) -> list[data.Address]:
+        return [self.get_address(index) for index in range(self.wallet_count)]
+
+    def create_holdings(self, index: int) -> Holdings:
+        """
+        Holdings of wallet at first step
+        """
+        market = self.market
+        rng = random.Random(f"{self.seed}:wallet:{index}")
+        token_count = min(int(rng.paretovariate(1.2)), self.max_tokens)
+        picked = rng.choices(
+            range(market.token_count), cum_weights=market.cum_weights, k=token_count * 2
+        )
+        tokens = list(dict.fromkeys(picked))[:token_count]
+        value_usd = rng.lognormvariate(8.0, 2.5)
+        weights = {token: rng.gammavariate(0.5, 1.0) for token in tokens}
+        weight_sum = sum(weights.values()) or 1.0
+        holdings = {
+            token: value_usd * weight / weight_sum / market.get_price(token, 0)
+            for token, weight in weights.items()
+        }
+        if rng.random() < self.spam_probability:
+            for _ in range(rng.randint(1, 5)):
+                spam = market.token_count + rng.randrange(
+                    len(market.symbols) - market.token_count
+                )
+                holdings[spam] = rng.uniform(1e3, 1e7)
+        return holdings
+
+    def apply_flow(self, index: int, step: int, holdings: Holdings) -> Holdings:
+        """
+        Deposit or withdrawal of wallet made before step, if any
+        """
+        rng = random.Random(f"{self.seed}:flow:{index}:{step}")
+        if rng.random() >= self.flow_probability:
+            return holdings
+        fraction = rng.uniform(0.05, 0.5)
+        if rng.random() < 0.5:
+            value_usd = sum(
+                amount * self.market.get_price(token, step)
+                for token, amount in holdings.items()
+            )
+            return {**holdings, 0: holdings.get(0, 0.0) + value_usd * fraction}
+        return {token: amount * (1.0 - fraction) for token, amount in holdings.items()}
+
+    def iter_holdings(self, index: int) -> typing.Iterator[Holdings]:
+        """
+        Holdings of wallet at every step, starting with first one
+        """
+        holdings = self.create_holdings(index)
+        yield holdings
+        for step in itertools.count(1):
+            holdings = self.apply_flow(index, step, holdings)
+            yield holdings
+
+    def create_address_update(
+        self, holdings: Holdings, step: int, timestamp: int
+    ) -> data.AddressUpdate:
+        values = {
+            token: amount * self.market.get_price(token, step)
+            for token, amount in holdings.items()
+        }
+        value_usd = sum(values.values())
+        assets = [
+            data.AggregatedAsset(
+                symbol=self.market.symbols[token],
+                amount=holdings[token],
+                price=self.market.get_price(token, step),
+                value_usd=value,
+                value_pct=value / value_usd * 100.0 if value_usd else 0.0,
+                timestamp=timestamp,
+            )
+            for token, value in sorted(
+                values.items(), key=lambda item: item[1], reverse=True
+            )
+        ]
+        return data.AddressUpdate(value_usd=value_usd, aggregated_assets=assets)
+
+    def iter_address_updates(
+        self, index: int, timestamps: list[int]
+    ) -> typing.Iterator[data.AddressUpdate]:
+        """
+        Compacted updates of wallet, one for each consecutive step
+        """
+        for step, (timestamp, holdings) in enumerate(
+            zip(timestamps, self.iter_holdings(index))
+        ):
+            yield compaction.compact_address_update(
+                self.create_address_update(holdings, step, timestamp)
+            )
+
+
+class SyntheticAssetProvider(aggregated_assets.AggregatedAssetProvider):
+    """
+    Serves population instead of portfolio APIs, every fetch of wallet moves
+    it by one step, starting at first step
+    """
+
+    def __init__(self, population: SyntheticPopulation, first_step: int = 0) -> None:
+        self.population = population
+        self.first_step = first_step
+        self._indexes = {
+            address.address: index
+            for index, address in enumerate(population.get_addresses())
+        }
+        # last served step and holdings of wallet
+        self._states: dict[int, tuple[int, Holdings]] = {}
+
+    async def async_get_assets_for_address(
+        self, address: data.Address, run_time: int
+    ) -> data.AddressUpdate | None:
+        index = self._indexes.get(address.address.lower())
+        if index is None:
+            return None
+        state = self._states.get(index)
+        if state is None:
+            holdings_iterator = self.population.iter_holdings(index)
+            step = self.first_step
+            holdings = next(itertools.islice(holdings_iterator, step, None))
+        else:
+            step, holdings = state
+            step += 1
+            holdings = self.population.apply_flow(index, step, holdings)
+        self._states[index] = (step, holdings)
+        return self.population.create_address_update(holdings, step, run_time)
+
+
+async def async_seed_database(
+    population: SyntheticPopulation,
+    timestamps: list[int],
+    session_maker: orm.sessionmaker,
+    chunk_size: int = 1000,
+) -> None:
+    """
+    Writes wallets with snapshot at every timestamp, performances between
+    consecutive snapshots and holdings index through bulk inserts, one
+    transaction per chunk
+    """
+    addresses = population.get_addresses()
+    async with session_maker() as session:
+        stored_ids = await services.async_find_address_ids(session)
+        await services.async_save_addresses(
+            [address for address in addresses if address not in stored_ids], session
+        )
+        address_ids = await services.async_find_address_ids(session)
+    end_times = [time_utils.get_datetime_from_ts(ts) for ts in timestamps]
+    for chunk_start in range(0, len(addresses), chunk_size):
+        chunk_end = min(chunk_start + chunk_size, len(addresses))
+        address_updates: list[tuple[data.Address, list[data.AggregatedAsset]]] = []
+        symbol_holdings: list[data.SymbolHolding] = []
+        # pairs of every wallet ending at same step are calculated together
+        snapshot_pairs: list[list[performance.SnapshotPair]] = [
+            [] for _ in timestamps[1:]
+        ]
+        for index in range(chunk_start, chunk_end):
+            address = addresses[index]
+            updates = list(population.iter_address_updates(index, timestamps))
+            address_updates.extend(
+                (address, update.aggregated_assets) for update in updates
+            )
+            if config.holdings_index:
+                symbol_holdings.extend(
+                    holding
+                    for step, update in enumerate(updates)
+                    for holding in holdings.create_symbol_holdings(
+                        address,
+                        update.aggregated_assets,
+                        updates[step - 1].aggregated_assets if step else None,
+                        timestamps[step],
+                    )
+                )
+            for step, (old_update, new_update) in enumerate(zip(updates, updates[1:])):
+                snapshot_pairs[step].append(
+                    performance.SnapshotPair(
+                        address,
+                        end_times[step],
+                        old_update.aggregated_assets,
+                        new_update.aggregated_assets,
+                    )
+                )
+        performances = [
+            performance_result
+            for step, pairs in enumerate(snapshot_pairs)
+            for performance_result in performance.calculate_performances(
+                pairs, end_times[step + 1]
+            )
+        ]
+        async with session_maker() as session, unit_of_work.UnitOfWork(session):
+            await services.async_save_aggregated_updates(
+                address_updates, address_ids, session
+            )
+            await services.async_save_performance_results(
+                performances, session, address_ids
+            )
+            await services.async_save_symbol_holdings(
+                symbol_holdings, session, address_ids
+            )
+        log.info(f"Seeded {chunk_end} of {len(addresses)} wallets")
@@ -0,0 +1,88 @@
+"""
+Canonical identity of tokens across chains
+
+Registry file maps (chain, contract) to canonical asset id, so bridged and
+wrapped variants of asset are merged together. Contract is token address or
+native token id of provider. Token with unknown contract which reuses symbol
+of asset registered on the same chain is kept apart as its own asset, on
+other chains registry is incomplete and token is aggregated by symbol.
+"""
+import csv
+import logging
+import os
+
+from src import data, enums
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    Providers differ in casing and padding of symbols
+    """
+    return symbol.strip().upper()
+
+
+class TokenRegistry:
+    def __init__(self, tokens: list[data.RegisteredToken]) -> None:
+        self._tokens: dict[tuple[enums.Blockchain, str], data.RegisteredToken] = {}
+        self._symbol_asset_ids: dict[str, str] = {}
+        self._chain_symbols: set[tuple[enums.Blockchain, str]] = set()
+        for token in tokens:
+            self._tokens[(token.blockchain, token.contract.lower())] = token
+            self._symbol_asset_ids[token.symbol] = token.asset_id
+            self._chain_symbols.add((token.blockchain, token.symbol))
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def resolve(
+        self, blockchain: enums.Blockchain | None, contract: str | None, symbol: str
+    ) -> tuple[str, str]:
+        """
+        Returns asset id and symbol under which token is aggregated, tokens
+        without known contract are identified by symbol
+        """
+        normalized_symbol = normalize_symbol(symbol)
+        if blockchain is not None and contract:
+            contract = contract.lower()
+            token = self._tokens.get((blockchain, contract))
+            if token is not None:
+                return token.asset_id, token.symbol
+            if (blockchain, normalized_symbol) in self._chain_symbols:
+                # symbol is claimed by asset registered on chain, most likely a scam
+                return (
+                    f"{blockchain.name}:{contract}",
+                    f"{normalized_symbol} ({contract[:8]})",
+                )
+        asset_id = self._symbol_asset_ids.get(normalized_symbol, normalized_symbol)
+        return asset_id, normalized_symbol
+
+
+def load_file(path: str = config.token_registry_path) -> TokenRegistry:
+    tokens: list[data.RegisteredToken] = []
+    if not os.path.exists(path):
+        log.warning(f"Token registry {path} not found, aggregating by symbol")
+        return TokenRegistry(tokens)
+    with open(path, "r") as registry_file:
+        for row in csv.DictReader(registry_file):
+            tokens.append(
+                data.RegisteredToken(
+                    blockchain=enums.Blockchain[row["chain"]],
+                    contract=row["contract"],
+                    asset_id=row["asset_id"],
+                    symbol=normalize_symbol(row["symbol"]),
+                )
+            )
+    return TokenRegistry(tokens)
+
+
+_registry: TokenRegistry | None = None
+
+
+def get_registry() -> TokenRegistry:
+    global _registry
+    if _registry is None:
+        _registry = load_file()
+    return _registry
@@ -0,0 +1,271 @@
+"""
+Lightweight tracing spans of update pipeline
+
+Current span is kept in context variable, so nested spans of single address
+update form one trace. Span finished in one stage can be made current again
+in later stage, spans opened under it continue its trace and are exported
+on their own. Sampling is decided once per trace, spans of trace which is
+not sampled are no-op. Finished traces are exported as JSON lines
+to a local file or posted as OTLP JSON to collector.
+"""
+import abc
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+import typing
+
+from src import enums
+from src.config import config
+
+log = logging.getLogger(__name__)
+
+P = typing.ParamSpec("P")
+R = typing.TypeVar("R")
+
+AttributeValue = str | int | float | bool
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent: "Span | None",
+        attributes: dict[str, AttributeValue],
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.is_error = False
+        # finished spans of trace, shared with parent until it is exported
+        self.trace_spans: list[Span] = (
+            parent.trace_spans if parent and not parent.end_ns else []
+        )
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1_000_000,
+            "is_error": self.is_error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan(Span):
+    def __init__(self) -> None:
+        self.attributes = {}
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        pass
+
+
+class FileSpanExporter(SpanExporter):
+    def __init__(self, path: str = config.trace_file) -> None:
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a") as trace_file:
+            for span in spans:
+                trace_file.write(json.dumps(span.to_dict()) + "\n")
+
+
+def _create_otlp_value(value: AttributeValue) -> dict[str, typing.Any]:
+    match value:
+        case bool():
+            return {"boolValue": value}
+        case int():
+            return {"intValue": str(value)}
+        case float():
+            return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def create_otlp_payload(spans: list[Span]) -> dict[str, typing.Any]:
+    otlp_spans = [
+        {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": _create_otlp_value(value)}
+                for key, value in span.attributes.items()
+            ],
+            "status": {"code": 2 if span.is_error else 1},
+        }
+        for span in spans
+    ]
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": config.trace_service_name},
+                        }
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+class OtlpSpanExporter(SpanExporter):
+    def __init__(self, endpoint: str = config.trace_otlp_endpoint) -> None:
+        self.endpoint = endpoint
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def _async_post(self, payload: dict[str, typing.Any]) -> None:
+        # deferred, tracing is imported by every module but rarely exports
+        import aiohttp
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.endpoint, json=payload) as response:
+                    if response.status >= 300:
+                        log.warning(f"Collector returned status {response.status}")
+        except aiohttp.ClientError as e:
+            log.warning(f"Could not export spans: {e}")
+
+    def export(self, spans: list[Span]) -> None:
+        task = asyncio.get_running_loop().create_task(
+            self._async_post(create_otlp_payload(spans))
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def _create_exporter(exporter_type: enums.TraceExporterType) -> SpanExporter | None:
+    match exporter_type:
+        case enums.TraceExporterType.NONE:
+            return None
+        case enums.TraceExporterType.FILE:
+            return FileSpanExporter()
+        case enums.TraceExporterType.OTLP:
+            return OtlpSpanExporter()
+    return None
+
+
+_exporter = _create_exporter(config.trace_exporter)
+
+
+def set_exporter(exporter: SpanExporter | None) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def get_current_span() -> Span:
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: AttributeValue) -> typing.Iterator[Span]:
+    """
+    Opens span as child of current one, span without parent starts new trace
+    which is sampled with trace sample rate
+    """
+    parent = _current_span.get()
+    if parent is NOOP_SPAN or (
+        parent is None
+        and (_exporter is None or random.random() >= config.trace_sample_rate)
+    ):
+        token = _current_span.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current_span.reset(token)
+        return
+    trace_id = parent.trace_id if parent else os.urandom(16).hex()
+    # children of finished span are exported apart from spans exported with it
+    is_exported = parent is None or parent.end_ns != 0
+    new_span = Span(name, trace_id, parent, attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.is_error = True
+        new_span.set_attribute("error", repr(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end_ns = time.time_ns()
+        new_span.trace_spans.append(new_span)
+        if is_exported and _exporter is not None:
+            _exporter.export(new_span.trace_spans)
+
+
+@contextlib.contextmanager
+def use_span(current_span: Span) -> typing.Iterator[None]:
+    """
+    Makes given span current, spans opened within continue its trace even
+    after it is finished
+    """
+    token = _current_span.set(current_span)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def traced_async(
+    name: str | None = None,
+) -> typing.Callable[
+    [typing.Callable[P, typing.Awaitable[R]]], typing.Callable[P, typing.Awaitable[R]]
+]:
+    """
+    Wraps coroutine function in child span of current trace, sized results are
+    recorded as row count. Calls outside of trace do not start a new one
+    """
+
+    def decorator(
+        func: typing.Callable[P, typing.Awaitable[R]]
+    ) -> typing.Callable[P, typing.Awaitable[R]]:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _current_span.get() in (None, NOOP_SPAN):
+                return await func(*args, **kwargs)
+            with span(span_name) as current_span:
+                result = await func(*args, **kwargs)
+                if isinstance(result, (list, dict)):
+                    current_span.set_attribute("rows", len(result))
+                return result
+
+        return wrapper
+
+    return decorator
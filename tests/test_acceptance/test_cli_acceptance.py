@@ -0,0 +1,52 @@
+from unittest import mock
+
+import pytest
+import sqlalchemy
+from defi_common.database import models
+from defi_common.dbconfig import db_config
+
+from src import cli, data
+from src.database import engine
+from src.database import models as platform_models  # noqa, tables are reset too
+from tests.test_unit import utils
+
+
+class FakeProvider:
+    async def async_get_assets_for_address(
+        self, address: data.Address, run_time: int
+    ) -> data.AddressUpdate:
+        return utils.create_aggregated_update(
+            value_usd=1000.0, amount=1.0, price=1000.0, value_pct=100.0
+        )
+
+
+@pytest.mark.asyncio
+async def test_dry_run_update_writes_nothing() -> None:
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        session.add_all(
+            [
+                models.Address(address=address, blockchain_type="EVM")
+                for address in ("0x123", "0x124")
+            ]
+        )
+        await session.commit()
+    create_engine = engine.create_engine
+    args = cli.create_parser().parse_args(
+        ["update", "--address", "0x123", "--sleep", "0", "--dry-run"]
+    )
+    with mock.patch(
+        "src.database.engine.create_engine",
+        lambda: create_engine(db_config.test_db_url),
+    ), mock.patch(
+        "src.aggregated_assets.get_default_provider", return_value=FakeProvider()
+    ) as get_provider:
+        await cli._async_run_update(args)
+    assert get_provider.call_count == 1
+    async with session_maker() as session:
+        update_count = await session.scalar(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(
+                models.AggregatedBalanceUpdate
+            )
+        )
+    assert update_count == 0
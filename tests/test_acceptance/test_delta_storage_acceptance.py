@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from src import data
+from src.database import services
+from tests.test_unit import utils
+
+
+@pytest.mark.asyncio
+async def test_delta_storage_reconstructs_full_snapshots() -> None:
+    address = data.Address(address="0x123")
+    keyframe_ts = 1671462000
+    delta_ts = keyframe_ts + 900
+    unchanged_ts = delta_ts + 900
+    keyframe_assets = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 50.0, 1000.0, keyframe_ts),
+        utils.create_aggregated_asset("BTC", 1.0, 1000.0, 50.0, 1000.0, keyframe_ts),
+    ]
+    delta_assets = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 33.3, 1000.0, delta_ts),
+        utils.create_aggregated_asset("AAVE", 20.0, 100.0, 66.7, 2000.0, delta_ts),
+    ]
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        await services.async_save_delta_aggregated_updates(
+            keyframe_assets, [], address, keyframe_ts, session
+        )
+        await services.async_save_delta_aggregated_updates(
+            delta_assets, keyframe_assets, address, delta_ts, session
+        )
+        await services.async_save_delta_aggregated_updates(
+            delta_assets, delta_assets, address, unchanged_ts, session
+        )
+        last_updates = await services.async_find_address_last_aggregated_updates(
+            address, session
+        )
+        assert [update.symbol for update in last_updates] == ["AAVE", "ETH"]
+        assert all(update.timestamp == unchanged_ts for update in last_updates)
+        assert last_updates[0].value_pct == pytest.approx(2000.0 / 3000.0 * 100.0)
+        keyframe_updates = await services.async_find_aggregated_updates(
+            address, datetime.fromtimestamp(keyframe_ts + 1), session
+        )
+        assert {update.symbol for update in keyframe_updates} == {"ETH", "BTC"}
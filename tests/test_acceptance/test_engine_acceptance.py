@@ -0,0 +1,26 @@
+import dotenv
+import pytest
+import sqlalchemy
+from defi_common.dbconfig import db_config
+
+from src import metrics
+from src.database import engine
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_checkouts_and_exhaustion() -> None:
+    dotenv.load_dotenv()
+    test_engine = engine.create_engine(
+        db_config.test_db_url, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    session_maker = engine.create_session_maker(test_engine)
+    checkouts = metrics.DB_POOL_CHECKOUT_SECONDS.get_count()
+    timeouts = metrics.DB_POOL_TIMEOUTS_TOTAL.get()
+    async with session_maker() as session:
+        assert (await session.execute(sqlalchemy.text("SELECT 1"))).scalar() == 1
+        async with session_maker() as waiting_session:
+            with pytest.raises(sqlalchemy.exc.TimeoutError):
+                await waiting_session.execute(sqlalchemy.text("SELECT 1"))
+    assert metrics.DB_POOL_CHECKOUT_SECONDS.get_count() == checkouts + 2
+    assert metrics.DB_POOL_TIMEOUTS_TOTAL.get() == timeouts + 1
+    await test_engine.dispose()
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from defi_common.database import models
+
+from src import data, export
+from src.config import config
+from src.database import services
+from tests.test_unit import utils
+
+
+@pytest.mark.asyncio
+async def test_incremental_export_of_performance_results(tmp_path: Any) -> None:
+    export_dir = str(tmp_path)
+    performances_table = next(
+        table
+        for table in export.EXPORTED_TABLES
+        if table.name == "performance_run_results"
+    )
+    end_time = datetime(2022, 1, 1, 1, 15)
+    now = datetime(2022, 1, 2)
+    lag = timedelta(minutes=config.export_lag_minutes)
+    session_maker = await utils.test_database_session()
+
+    async def async_save(minutes: int) -> None:
+        await services.async_save_performance_result(
+            data.PerformanceResult(
+                performance=float(minutes),
+                start_time=end_time - timedelta(minutes=15),
+                end_time=end_time + timedelta(minutes=minutes),
+                address=data.Address(address="0x123"),
+            ),
+            session,
+        )
+
+    async def async_export(at_time: datetime) -> int:
+        return await export.async_export_table(
+            performances_table, session, export_dir, batch_size=1, now=at_time
+        )
+
+    async with session_maker() as session:
+        session.add(models.Address(address="0x123", blockchain_type="EVM"))
+        await session.commit()
+        await async_save(15)
+        await async_save(30)
+        exports = [await async_export(now), await async_export(now + lag)]
+        # row with older time than exported ones, inserted late
+        await async_save(-30)
+        exports += [await async_export(now + lag), await async_export(now + 2 * lag)]
+        exports.append(await async_export(now + 3 * lag))
+    assert exports == [0, 2, 0, 1, 0]
+    loaded = export.load_performance_results(
+        end_time.date(), end_time.date(), export_dir
+    )
+    assert [result.performance for result in loaded] == [15.0, 30.0, -30.0]
+    assert loaded[0].address == data.Address(address="0x123")
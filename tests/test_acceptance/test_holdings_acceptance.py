@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+from src import coin_changes, data, enums, holdings, runner
+from src.database import services
+from tests.test_unit import utils
+
+HOUR_TS = 1671462000
+
+
+def create_assets(
+    allocations: dict[str, float], timestamp: int
+) -> list[data.AggregatedAsset]:
+    return [
+        utils.create_aggregated_asset(
+            symbol=symbol,
+            amount=1.0,
+            price=value_pct,
+            value_pct=value_pct,
+            value_usd=value_pct,
+            timestamp=timestamp,
+        )
+        for symbol, value_pct in allocations.items()
+    ]
+
+
+@pytest.mark.asyncio
+async def test_index_keeps_change_over_bucket() -> None:
+    session_maker = await utils.test_database_session()
+    address = data.Address(address="0x123")
+    snapshots = [
+        create_assets({"ETH": 50.0, "PEPE": 50.0}, HOUR_TS - 3600),
+        create_assets({"ETH": 20.0, "PEPE": 80.0}, HOUR_TS - 2700),
+        create_assets({"ETH": 100.0}, HOUR_TS - 1800),
+    ]
+    async with session_maker() as session:
+        previous = None
+        for assets in snapshots:
+            await runner.async_save_aggregated_assets_for_address(
+                address, session, assets, previous, assets[0].timestamp
+            )
+            previous = assets
+        bucket = holdings.get_bucket_time(HOUR_TS)
+        pepe_holders = await services.async_find_symbol_holdings(
+            "PEPE", bucket, session
+        )
+        eth_holders = await services.async_find_symbol_holdings("ETH", bucket, session)
+    assert [(h.previous_value_pct, h.value_pct) for h in pepe_holders] == [(50.0, 0.0)]
+    assert [(h.previous_value_pct, h.value_pct) for h in eth_holders] == [(50.0, 100.0)]
+    assert eth_holders[0].address == address
+
+
+@pytest.mark.asyncio
+async def test_indexed_coin_ranking_matches_history() -> None:
+    session_maker = await utils.test_database_session()
+    start_ts = HOUR_TS - 3600
+    first_snapshots = {
+        "0x123": create_assets({"SPEX": 49.9, "KETO": 50.0}, start_ts),
+        "0x124": create_assets({"LEL": 50.1, "ROT": 50.0}, start_ts),
+    }
+    second_snapshots = {
+        "0x123": create_assets({"SPEX": 100.0}, HOUR_TS),
+        "0x124": create_assets({"ROT": 100.0}, HOUR_TS),
+    }
+    async with session_maker() as session:
+        for address, assets in first_snapshots.items():
+            await runner.async_save_aggregated_assets_for_address(
+                data.Address(address=address), session, assets, None, start_ts
+            )
+        for address, assets in second_snapshots.items():
+            await runner.async_save_aggregated_assets_for_address(
+                data.Address(address=address),
+                session,
+                assets,
+                first_snapshots[address],
+                HOUR_TS,
+            )
+        start_time = datetime.fromtimestamp(start_ts + 61)
+        end_time = datetime.fromtimestamp(HOUR_TS + 61)
+        from_history = await coin_changes.async_calculate_averaged_coin_changes(
+            start_time, end_time, enums.RunTimeType.HOUR, session
+        )
+        from_index = await coin_changes.async_calculate_indexed_coin_changes(
+            start_time, end_time, enums.RunTimeType.HOUR, session
+        )
+    assert {change.symbol: change.pct_change for change in from_index} == (
+        pytest.approx({change.symbol: change.pct_change for change in from_history})
+    )
+    assert from_index[0].symbol == "SPEX"
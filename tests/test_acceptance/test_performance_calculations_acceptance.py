@@ -261,3 +261,16 @@ async def test_address_ranking(
         assert second_addres_avg_perf.address == data_address_2
         assert second_addres_avg_perf.avg_performance == 0.5
         assert second_addres_avg_perf.rank == 2
+        analytics = await services.async_find_performance_analytics(
+            ranking_type=enums.RunTimeType.HOUR,
+            time=wanted_query_time,
+            session=session,
+        )
+        analytics_24h = {
+            single_analytics.address: single_analytics
+            for single_analytics in analytics
+            if single_analytics.window_hours == 24
+        }
+        assert analytics_24h[data_address].periods == 2
+        assert analytics_24h[data_address].compounded_return == pytest.approx(2.01)
+        assert analytics_24h[data_address_2].max_drawdown == 0.0
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+import pytest
+from defi_common.database import models
+from sqlalchemy import orm
+from sqlalchemy.ext import asyncio as sql_asyncio
+
+from src import data, enums
+from src.database import services
+from tests.test_unit import utils
+
+RANK_TIME = datetime(2022, 1, 1, 1)
+START_TIME = datetime(2022, 1, 1)
+END_TIME = datetime(2022, 1, 2)
+
+ReadFunction = Callable[[sql_asyncio.AsyncSession], Awaitable[Any]]
+
+READ_FUNCTIONS: dict[str, ReadFunction] = {
+    "performance_results": lambda session: services.async_find_performance_results(
+        data.Address(address="0x100"), START_TIME, END_TIME, session
+    ),
+    "performance_series": lambda session: services.async_find_all_performance_series(
+        START_TIME, END_TIME, session
+    ),
+    "performance_periods": lambda session: (
+        services.async_find_all_performance_periods(START_TIME, END_TIME, session)
+    ),
+    "address_rankings": lambda session: services.async_find_address_rankings(
+        enums.RunTimeType.HOUR, RANK_TIME, session
+    ),
+    "rank_history": lambda session: services.async_find_address_rank_history(
+        data.Address(address="0x100"), enums.RunTimeType.HOUR, session
+    ),
+    "coin_ranking": lambda session: services.async_find_coin_ranking_by_time(
+        RANK_TIME, session
+    ),
+    "last_updates": lambda session: services.async_find_all_last_aggregated_updates(
+        session
+    ),
+}
+
+
+async def seed_rows(
+    session_maker: orm.sessionmaker, first_index: int, count: int
+) -> None:
+    """
+    Adds count addresses with ranks and snapshots, first address gets count
+    more performances and historical ranks
+    """
+    async with session_maker() as session:
+        for index in range(first_index, first_index + count):
+            session.add(
+                models.Address(address=f"0x{100 + index}", blockchain_type="EVM")
+            )
+        await session.commit()
+        first_address = await services.async_find_address(
+            data.Address(address="0x100"), session
+        )
+        for index in range(first_index, first_index + count):
+            address = data.Address(address=f"0x{100 + index}")
+            address_model = await services.async_find_address(address, session)
+            session.add(
+                models.AddressPerformanceRank(
+                    performance=float(index),
+                    time=RANK_TIME,
+                    address=address_model,
+                    ranking_type=enums.RunTimeType.HOUR.value,
+                    rank=index + 1,
+                )
+            )
+            session.add(
+                models.AddressPerformanceRank(
+                    performance=float(index),
+                    time=RANK_TIME - timedelta(hours=index + 1),
+                    address=first_address,
+                    ranking_type=enums.RunTimeType.HOUR.value,
+                    rank=1,
+                )
+            )
+            session.add(
+                models.PerformanceRunResult(
+                    performance=float(index),
+                    start_time=START_TIME + timedelta(hours=index),
+                    end_time=START_TIME + timedelta(hours=index + 1),
+                    address=first_address,
+                )
+            )
+            session.add(
+                models.CoinChangeRank(
+                    symbol=f"COIN{index}",
+                    rank=index + 1,
+                    time=RANK_TIME,
+                    pct_change=float(index),
+                    ranking_type=enums.RunTimeType.HOUR.value,
+                )
+            )
+            await services.async_save_aggregated_update(
+                utils.create_aggregated_asset(
+                    symbol="ETH", amount=1.0, price=1.0, value_pct=100.0, value_usd=1.0
+                ),
+                address,
+                session,
+            )
+        await session.commit()
+
+
+async def count_read_statements(
+    session_maker: orm.sessionmaker, read: ReadFunction
+) -> int:
+    # fresh session, so nothing is served from identity map
+    async with session_maker() as session:
+        with utils.count_statements(session_maker) as statements:
+            await read(session)
+    return len(statements)
+
+
+@pytest.mark.asyncio
+async def test_reads_issue_constant_number_of_statements() -> None:
+    session_maker = await utils.test_database_session()
+    await seed_rows(session_maker, 0, 1)
+    small_counts = {
+        name: await count_read_statements(session_maker, read)
+        for name, read in READ_FUNCTIONS.items()
+    }
+    await seed_rows(session_maker, 1, 5)
+    large_counts = {
+        name: await count_read_statements(session_maker, read)
+        for name, read in READ_FUNCTIONS.items()
+    }
+    assert large_counts == small_counts
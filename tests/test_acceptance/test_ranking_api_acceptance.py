@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+from aiohttp import test_utils, web
+
+from src import data, enums, ranking_api
+from src.database import services
+from tests.test_unit import utils
+
+
+def create_ranks(
+    addresses: list[data.Address], time: datetime
+) -> list[data.AddressPerformanceRank]:
+    return [
+        data.AddressPerformanceRank(
+            address=address,
+            ranking_type=enums.RunTimeType.HOUR,
+            time=time,
+            avg_performance=10.0 - index,
+            rank=index + 1,
+        )
+        for index, address in enumerate(addresses)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_serving_cached_rankings() -> None:
+    session_maker = await utils.test_database_session()
+    addresses = [data.Address(address=f"0x12{index}") for index in range(3)]
+    first_time = datetime(2022, 1, 1, 1)
+    second_time = datetime(2022, 1, 1, 2)
+    async with session_maker() as session:
+        for address in addresses:
+            await services.async_save_address(address, session)
+        await services.async_save_address_ranks(
+            create_ranks(addresses, first_time), session
+        )
+        await services.async_save_coin_changes(
+            [
+                data.AssetOwnedChange(
+                    time=first_time,
+                    rank=1,
+                    symbol="ETH",
+                    pct_change=5.0,
+                    run_type=enums.RunTimeType.HOUR,
+                )
+            ],
+            first_time,
+            enums.RunTimeType.HOUR,
+            session,
+        )
+    ranking_api.invalidate_cache()
+    app = web.Application()
+    ranking_api.add_routes(app, session_maker)
+    async with test_utils.TestClient(test_utils.TestServer(app)) as client:
+        response = await client.get("/rankings/addresses/hour?limit=2")
+        page = await response.json()
+        assert [item["rank"] for item in page["items"]] == [1, 2]
+        assert page["items"][0]["address"]["address"] == "0x120"
+        assert page["next_after_rank"] == 2
+        response = await client.get("/rankings/addresses/hour?limit=2&after_rank=2")
+        page = await response.json()
+        assert [item["rank"] for item in page["items"]] == [3]
+        assert page["next_after_rank"] is None
+
+        response = await client.get("/rankings/coins/HOUR")
+        page = await response.json()
+        assert page["items"][0]["symbol"] == "ETH"
+
+        async with session_maker() as session:
+            await services.async_save_address_ranks(
+                create_ranks(list(reversed(addresses)), second_time), session
+            )
+        # cached until ranks are saved by ranking job
+        response = await client.get("/rankings/addresses/hour?limit=2")
+        assert (await response.json())["time"] == first_time.isoformat()
+        ranking_api.invalidate_cache()
+        response = await client.get("/rankings/addresses/hour?limit=2")
+        page = await response.json()
+        assert page["time"] == second_time.isoformat()
+        assert page["items"][0]["address"]["address"] == "0x122"
+
+        response = await client.get("/addresses/0x120/ranks/hour")
+        page = await response.json()
+        assert [item["rank"] for item in page["items"]] == [3, 1]
+
+        response = await client.get("/rankings/addresses/week")
+        assert response.status == 400
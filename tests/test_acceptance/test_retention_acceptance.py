@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+import sqlalchemy
+from defi_common.database import models
+
+from src import data, exceptions, retention
+from src.config import config
+from src.database import models as platform_models
+from src.database import services
+from tests.test_unit import utils
+
+
+@pytest.mark.asyncio
+async def test_downsampling_keeps_first_snapshot_of_each_hour() -> None:
+    address = data.Address(address="0x123")
+    hour_start = 1671462000
+    snapshot_timestamps = [hour_start + minutes * 60 for minutes in (0, 15, 30, 45, 60)]
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        for timestamp in snapshot_timestamps:
+            await services.async_save_aggregated_update(
+                utils.create_aggregated_asset(
+                    "ETH", 1.0, 100.0, 100.0, 100.0, timestamp=timestamp
+                ),
+                address,
+                session,
+            )
+        start_time = datetime.fromtimestamp(hour_start)
+        deleted = await retention.async_downsample_snapshots(
+            start_time,
+            start_time + timedelta(hours=2),
+            retention.HOUR_SECONDS,
+            session,
+        )
+        kept_exec = await session.execute(
+            sqlalchemy.select(models.AggregatedBalanceUpdate.timestamp).order_by(
+                models.AggregatedBalanceUpdate.timestamp
+            )
+        )
+        assert deleted == 3
+        assert kept_exec.scalars().all() == [hour_start, hour_start + 3600]
+
+
+async def _async_save_delta_snapshots(session, address, timestamps) -> None:
+    previous_updates: list[data.AggregatedAsset] = []
+    for timestamp in timestamps:
+        updates = [
+            utils.create_aggregated_asset(
+                "ETH", 1.0, 100.0, 100.0, 100.0, timestamp=timestamp
+            )
+        ]
+        await services.async_save_delta_aggregated_updates(
+            updates, previous_updates, address, timestamp, session
+        )
+        previous_updates = updates
+
+
+@pytest.mark.asyncio
+async def test_retention_catches_up_and_drops_snapshot_headers() -> None:
+    expired_start = 1671462000
+    old_start = expired_start + 400 * 24 * 3600
+    current_time = datetime.fromtimestamp(old_start) + timedelta(days=20)
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        await _async_save_delta_snapshots(
+            session,
+            data.Address(address="0x123"),
+            [expired_start, expired_start + 900],
+        )
+        await _async_save_delta_snapshots(
+            session,
+            data.Address(address="0x124"),
+            [old_start + minutes * 60 for minutes in (0, 15, 30, 45)],
+        )
+        await retention.async_run_retention(current_time, session)
+        headers_exec = await session.execute(
+            sqlalchemy.select(platform_models.AddressSnapshot.timestamp)
+        )
+        updates_exec = await session.execute(
+            sqlalchemy.select(models.AggregatedBalanceUpdate.timestamp)
+        )
+    assert headers_exec.scalars().all() == [old_start]
+    assert updates_exec.scalars().all() == [old_start]
+
+
+@pytest.mark.asyncio
+async def test_unaligned_keyframes_are_not_downsampled() -> None:
+    session_maker = await utils.test_database_session()
+    with mock.patch.object(config, "delta_storage", True), mock.patch.object(
+        config, "delta_keyframe_interval", 7 * 60 * 60
+    ):
+        assert not retention.can_downsample(retention.HOUR_SECONDS)
+        async with session_maker() as session:
+            with pytest.raises(exceptions.InvalidParamError):
+                await retention.async_downsample_snapshots(
+                    datetime(2022, 1, 1),
+                    datetime(2022, 1, 2),
+                    retention.HOUR_SECONDS,
+                    session,
+                )
+
+
+@pytest.mark.asyncio
+async def test_retention_continues_from_downsampling_watermark() -> None:
+    current_time = datetime(2023, 6, 1, 12, 30)
+    hourly_cutoff = current_time - timedelta(days=config.retention_hourly_after_days)
+    old_start = int((hourly_cutoff - timedelta(days=1)).timestamp()) // 3600 * 3600
+    address = data.Address(address="0x123")
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        await retention.async_run_retention(current_time, session)
+        assert await services.async_find_downsampled_until(
+            retention.HOUR_SECONDS, session
+        ) == datetime(2023, 5, 25, 12)
+        # rows behind watermark are not scanned again
+        for minutes in (0, 15):
+            await services.async_save_aggregated_update(
+                utils.create_aggregated_asset(
+                    "ETH", 1.0, 100.0, 100.0, 100.0, timestamp=old_start + minutes * 60
+                ),
+                address,
+                session,
+            )
+        await retention.async_run_retention(current_time + timedelta(hours=1), session)
+        updates_exec = await session.execute(
+            sqlalchemy.select(models.AggregatedBalanceUpdate.timestamp)
+        )
+        assert len(updates_exec.scalars().all()) == 2
+        assert await services.async_find_downsampled_until(
+            retention.HOUR_SECONDS, session
+        ) == datetime(2023, 5, 25, 13)
@@ -0,0 +1,48 @@
+import pytest
+
+from src import data, snapshot_store
+from src.database import services
+from tests.test_unit import utils
+
+
+@pytest.mark.asyncio
+async def test_warm_loading_last_snapshots_of_all_addresses() -> None:
+    delta_address = data.Address(address="0x123")
+    plain_address = data.Address(address="0x456")
+    keyframe_ts = 1671462000
+    delta_ts = keyframe_ts + 900
+    keyframe_assets = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 50.0, 1000.0, keyframe_ts),
+        utils.create_aggregated_asset("BTC", 1.0, 1000.0, 50.0, 1000.0, keyframe_ts),
+    ]
+    delta_assets = [
+        utils.create_aggregated_asset("ETH", 2.0, 1000.0, 100.0, 2000.0, delta_ts),
+    ]
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        await services.async_save_delta_aggregated_updates(
+            keyframe_assets, [], delta_address, keyframe_ts, session
+        )
+        stored_assets = await services.async_save_delta_aggregated_updates(
+            delta_assets, keyframe_assets, delta_address, delta_ts, session
+        )
+        for timestamp in (keyframe_ts, delta_ts):
+            await services.async_save_aggregated_update(
+                utils.create_aggregated_asset(
+                    "AAVE", 1.0, 100.0, 100.0, 100.0, timestamp
+                ),
+                plain_address,
+                session,
+            )
+        store = snapshot_store.SnapshotStore(path=None)
+        await store.async_warm_load(session)
+        last_delta_assets = store.get(delta_address)
+        assert last_delta_assets == stored_assets
+        assert [asset.symbol for asset in last_delta_assets] == ["ETH"]  # type: ignore
+        assert last_delta_assets == (
+            await services.async_find_address_last_aggregated_updates(
+                delta_address, session
+            )
+        )
+        last_plain_assets = store.get(plain_address)
+        assert [asset.timestamp for asset in last_plain_assets] == [delta_ts]  # type: ignore
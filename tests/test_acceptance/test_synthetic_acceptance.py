@@ -0,0 +1,57 @@
+import pytest
+import sqlalchemy
+from defi_common.database import models
+
+from src import metrics, runner, synthetic
+from src.database import models as platform_models
+from src.database import services
+from tests.test_unit import utils
+
+TIMESTAMPS = [1672300800 + 3600 * step for step in range(3)]
+
+
+async def _async_count(session_maker, model) -> int:
+    async with session_maker() as session:
+        return await session.scalar(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(model)
+        )
+
+
+@pytest.mark.asyncio
+async def test_seeding_writes_snapshots_and_performances() -> None:
+    session_maker = await utils.test_database_session()
+    population = synthetic.SyntheticPopulation(11, 25)
+    commits = metrics.DB_COMMITS_TOTAL.get()
+    await synthetic.async_seed_database(
+        population, TIMESTAMPS, session_maker, chunk_size=10
+    )
+    # addresses, then single transaction of each chunk
+    assert metrics.DB_COMMITS_TOTAL.get() - commits == 1 + 3
+    async with session_maker() as session:
+        address_ids = await services.async_find_address_ids(session)
+    assert set(address_ids) == set(population.get_addresses())
+    update_count = sum(
+        len(update.aggregated_assets)
+        for index in range(25)
+        for update in population.iter_address_updates(index, TIMESTAMPS)
+    )
+    assert await _async_count(session_maker, models.AggregatedBalanceUpdate) == (
+        update_count
+    )
+    assert await _async_count(session_maker, models.PerformanceRunResult) == 25 * 2
+    assert await _async_count(session_maker, platform_models.SymbolHolding) > 25
+
+    await synthetic.async_seed_database(population, TIMESTAMPS, session_maker)
+    assert await _async_count(session_maker, models.Address) == 25
+
+
+@pytest.mark.asyncio
+async def test_update_pass_with_synthetic_provider() -> None:
+    session_maker = await utils.test_database_session()
+    population = synthetic.SyntheticPopulation(11, 5)
+    await synthetic.async_seed_database(population, TIMESTAMPS[:1], session_maker)
+    provider = synthetic.SyntheticAssetProvider(population, first_step=1)
+    await runner.async_update_all_addresses(
+        session_maker, provider.async_get_assets_for_address, sleep_time=0
+    )
+    assert await _async_count(session_maker, models.PerformanceRunResult) == 5
@@ -0,0 +1,121 @@
+import pytest
+import sqlalchemy
+from defi_common.database import models
+
+from src import data, metrics, runner, scheduling, snapshot_store
+from tests.test_unit import utils
+
+
+async def get_assets(address: data.Address, run_time: int) -> data.AddressUpdate:
+    # NUL byte is rejected by database after first asset was already written
+    broken_symbol = "BAD\x00" if address.address == "0x124" else "USDC"
+    return data.AddressUpdate(
+        value_usd=200.0,
+        aggregated_assets=[
+            utils.create_aggregated_asset(
+                symbol="ETH", amount=0.1, price=1000.0, value_pct=50.0, value_usd=100.0
+            ),
+            utils.create_aggregated_asset(
+                symbol=broken_symbol,
+                amount=100.0,
+                price=1.0,
+                value_pct=50.0,
+                value_usd=100.0,
+            ),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_address_is_rolled_back_alone() -> None:
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        session.add_all(
+            [
+                models.Address(address=address, blockchain_type="EVM")
+                for address in ("0x123", "0x124", "0x125")
+            ]
+        )
+        await session.commit()
+    commits = metrics.DB_COMMITS_TOTAL.get()
+    await runner.async_update_all_addresses(
+        session_maker, provide_assets=get_assets, sleep_time=0
+    )
+    # addresses are written in single batch, performances after it
+    assert metrics.DB_COMMITS_TOTAL.get() - commits == 2
+    async with session_maker() as session:
+        query = (
+            sqlalchemy.select(models.Address.address)
+            .join(
+                models.AggregatedBalanceUpdate,
+                models.AggregatedBalanceUpdate.address_id == models.Address.id,
+            )
+            .distinct()
+        )
+        saved_addresses = (await session.execute(query)).scalars().all()
+    assert sorted(saved_addresses) == ["0x123", "0x125"]
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_address_is_not_applied_to_store_and_queue() -> None:
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        session.add_all(
+            [
+                models.Address(address=address, blockchain_type="EVM")
+                for address in ("0x123", "0x124", "0x125")
+            ]
+        )
+        await session.commit()
+    store = snapshot_store.SnapshotStore(path=None)
+    refresh_queue = scheduling.RefreshQueue()
+    await runner.async_update_all_addresses(
+        session_maker,
+        provide_assets=get_assets,
+        sleep_time=0,
+        refresh_queue=refresh_queue,
+        store=store,
+    )
+    assert sorted(address.address for address in store.get_addresses()) == [
+        "0x123",
+        "0x125",
+    ]
+    # address without scheduled refresh is due again on next run
+    assert len(refresh_queue) == 2
+
+
+@pytest.mark.asyncio
+async def test_failing_fetch_skips_only_its_address() -> None:
+    session_maker = await utils.test_database_session()
+    async with session_maker() as session:
+        session.add_all(
+            [
+                models.Address(address=address, blockchain_type="EVM")
+                for address in ("0x123", "0x124", "0x125")
+            ]
+        )
+        await session.commit()
+
+    async def get_assets_failing(
+        address: data.Address, run_time: int
+    ) -> data.AddressUpdate:
+        if address.address == "0x123":
+            raise ValueError()
+        return await get_assets(address, run_time)
+
+    skipped = metrics.SKIPPED_ADDRESSES_TOTAL.get(reason="fetch_error")
+    await runner.async_update_all_addresses(
+        session_maker, provide_assets=get_assets_failing, sleep_time=0
+    )
+    assert metrics.SKIPPED_ADDRESSES_TOTAL.get(reason="fetch_error") - skipped == 1
+    async with session_maker() as session:
+        query = (
+            sqlalchemy.select(models.Address.address)
+            .join(
+                models.AggregatedBalanceUpdate,
+                models.AggregatedBalanceUpdate.address_id == models.Address.id,
+            )
+            .distinct()
+        )
+        saved_addresses = (await session.execute(query)).scalars().all()
+    assert saved_addresses == ["0x125"]
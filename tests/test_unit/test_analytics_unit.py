@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+from src import analytics, data, enums
+from tests.test_unit.fixtures import address  # noqa
+
+
+def test_series_analytics() -> None:
+    (
+        compounded_return,
+        volatility,
+        max_drawdown,
+        sharpe_ratio,
+        sortino_ratio,
+    ) = analytics.calculate_series_analytics([10.0, -50.0, 20.0], risk_free_rate=0.0)
+    assert compounded_return == pytest.approx(-34.0)
+    assert max_drawdown == pytest.approx(50.0)
+    assert volatility == pytest.approx(37.859388, rel=1e-6)
+    assert sharpe_ratio == pytest.approx(-0.2 / 3 / 0.37859388, rel=1e-6)
+    # only -50% period is below target
+    assert sortino_ratio == pytest.approx(-0.2 / 3 / (0.5 / 2**0.5), rel=1e-6)
+
+
+def test_constant_series_has_no_ratios() -> None:
+    (
+        _,
+        volatility,
+        max_drawdown,
+        sharpe_ratio,
+        sortino_ratio,
+    ) = analytics.calculate_series_analytics([1.0, 1.0, 1.0], risk_free_rate=0.0)
+    assert volatility == 0.0
+    assert max_drawdown == 0.0
+    assert sharpe_ratio is None
+    assert sortino_ratio is None
+
+
+def test_returns_are_scaled_by_period_hours() -> None:
+    (
+        compounded_return,
+        volatility,
+        _,
+        sharpe_ratio,
+        sortino_ratio,
+    ) = analytics.calculate_series_analytics(
+        [1.0, 4.0], risk_free_rate=0.5, period_hours=[1.0, 4.0]
+    )
+    assert compounded_return == pytest.approx(5.04)
+    # same hourly return in both periods
+    assert volatility == pytest.approx(0.0)
+    assert sharpe_ratio is None
+    assert sortino_ratio is None
+
+
+def test_analytics_of_all_addresses(address: data.Address) -> None:
+    other_address = data.Address(address="0x456")
+    result = analytics.calculate_analytics(
+        {address: [(5.0, 1.0)], other_address: []},
+        enums.RunTimeType.HOUR,
+        datetime(2022, 1, 1),
+        window_hours=24,
+    )
+    assert len(result) == 1
+    assert result[0].address == address
+    assert result[0].periods == 1
+    assert result[0].compounded_return == pytest.approx(5.0)
+
+
+def test_analytics_of_series_of_different_lengths(address: data.Address) -> None:
+    series = {
+        address: [(10.0, 1.0), (-50.0, 2.0), (20.0, 0.5)],
+        data.Address(address="0x456"): [(-10.0, 3.0), (5.0, 1.0)],
+        data.Address(address="0x789"): [(3.0, 1.0)],
+    }
+    result = analytics.calculate_analytics(
+        series, enums.RunTimeType.HOUR, datetime(2022, 1, 1), window_hours=24
+    )
+    for performance_analytics, periods in zip(result, series.values()):
+        performances, period_hours = map(list, zip(*periods))
+        assert performance_analytics.periods == len(performances)
+        assert (
+            performance_analytics.compounded_return,
+            performance_analytics.volatility,
+            performance_analytics.max_drawdown,
+            performance_analytics.sharpe_ratio,
+            performance_analytics.sortino_ratio,
+        ) == pytest.approx(
+            analytics.calculate_series_analytics(
+                performances, period_hours=period_hours
+            )
+        )
+    assert result[1].max_drawdown == pytest.approx(10.0)
+    assert result[2].sharpe_ratio is None
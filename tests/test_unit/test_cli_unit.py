@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from src import cli, data
+
+
+def test_every_address_falls_into_single_shard() -> None:
+    addresses = [data.Address(address=f"0x{index:040x}") for index in range(100)]
+    shards = [
+        [address for address in addresses if cli.is_in_shard(address, index, 4)]
+        for index in range(4)
+    ]
+    assert sum(len(shard) for shard in shards) == 100
+    assert all(shards)
+    assert cli.is_in_shard(data.Address(address="0xABC"), 1, 4) == cli.is_in_shard(
+        data.Address(address="0xabc"), 1, 4
+    )
+
+
+def test_parsing_commands() -> None:
+    parser = cli.create_parser()
+    args = parser.parse_args(
+        ["update", "--shard", "1/4", "--fetch-workers", "3", "--dry-run"]
+    )
+    assert args.shard == (1, 4)
+    assert args.fetch_workers == 3
+    assert args.dry_run
+    args = parser.parse_args(
+        ["rank", "--type", "DAY", "--start", "2022-12-29T13:01", "--jobs", "coin"]
+    )
+    assert args.start == datetime(2022, 12, 29, 13, 1)
+    assert args.jobs == ["coin"]
+    args = parser.parse_args(["seed", "--wallets", "100000", "--steps", "24"])
+    assert (args.wallets, args.steps, args.seed) == (100000, 24, 0)
+    args = parser.parse_args(["update", "--synthetic-seed", "3"])
+    assert (args.synthetic_seed, args.synthetic_step) == (3, 1)
+    with pytest.raises(SystemExit):
+        parser.parse_args(["update", "--shard", "4/4"])
@@ -22,3 +22,28 @@ async def test_coin_changes():
     )
     assert coin_changes_dict["WOTK"] == 50.0
     assert coin_changes_dict["BETH"] == -50.0
+
+
+@pytest.mark.asyncio
+async def test_coin_changes_across_symbol_normalization():
+    first_updates = [
+        utils.create_aggregated_asset(
+            symbol="usdc", amount=50.0, price=1.0, value_pct=50.0, value_usd=50.0
+        ),
+        utils.create_aggregated_asset(
+            symbol="weth", amount=50.0, price=1.0, value_pct=50.0, value_usd=50.0
+        ),
+    ]
+    second_updates = [
+        utils.create_aggregated_asset(
+            symbol="USDC", amount=75.0, price=1.0, value_pct=75.0, value_usd=75.0
+        ),
+        utils.create_aggregated_asset(
+            symbol="WETH", amount=25.0, price=1.0, value_pct=25.0, value_usd=25.0
+        ),
+    ]
+    coin_changes_dict = {}
+    await coin_changes.async_extract_coin_changes(
+        coin_changes_dict, first_updates, second_updates
+    )
+    assert coin_changes_dict == {"USDC": 25.0, "WETH": -25.0}
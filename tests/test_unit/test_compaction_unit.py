@@ -0,0 +1,52 @@
+from src import compaction, data
+from tests.test_unit import utils
+
+
+def create_assets() -> list[data.AggregatedAsset]:
+    return [
+        utils.create_aggregated_asset(
+            symbol="ETH", amount=5.0, price=1000.0, value_pct=90.0, value_usd=5000.0
+        ),
+        utils.create_aggregated_asset(
+            symbol="BTC", amount=0.02, price=20000.0, value_pct=7.2, value_usd=400.0
+        ),
+        utils.create_aggregated_asset(
+            symbol="DUST", amount=100.0, price=0.005, value_pct=0.009, value_usd=0.5
+        ),
+        utils.create_aggregated_asset(
+            symbol="SHIB", amount=1000.0, price=0.15, value_pct=2.791, value_usd=150.0
+        ),
+    ]
+
+
+def test_dust_is_collapsed_to_other() -> None:
+    assets = compaction.compact_assets(
+        create_assets(), min_value_usd=1.0, min_value_pct=0.01, top_n=0
+    )
+    assert [asset.symbol for asset in assets] == ["ETH", "BTC", "SHIB", "OTHER"]
+    other = assets[-1]
+    assert other.value_usd == 0.5
+    assert other.amount == 0.5
+    assert other.price == 1.0
+    assert other.value_pct == 0.009
+    assert other.timestamp == 101
+
+
+def test_top_n_keeps_totals() -> None:
+    original_assets = create_assets()
+    assets = compaction.compact_assets(
+        original_assets, min_value_usd=0.0, min_value_pct=0.0, top_n=2
+    )
+    assert [asset.symbol for asset in assets] == ["ETH", "BTC", "OTHER"]
+    assert sum(asset.value_usd for asset in assets) == sum(
+        asset.value_usd for asset in original_assets
+    )
+    assert abs(sum(asset.value_pct for asset in assets) - 100.0) < 1e-9
+
+
+def test_nothing_collapsed_adds_no_other() -> None:
+    assets = compaction.compact_assets(
+        create_assets(), min_value_usd=0.0, min_value_pct=0.0, top_n=0
+    )
+    assert len(assets) == 4
+    assert compaction.OTHER_SYMBOL not in [asset.symbol for asset in assets]
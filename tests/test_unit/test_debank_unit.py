@@ -1,6 +1,9 @@
+from typing import Any
+from unittest import mock
+
 import pytest
 
-from src import aggregated_assets, data
+from src import aggregated_assets, data, exceptions, http_utils
 from tests.test_unit.fixtures import address  # noqa
 
 
@@ -26,3 +29,28 @@ def test_calculating_pct_of_aggregated_assets() -> None:
     assert aggregated_pct_asset1.value_pct == 50.0
     aggregated_pct_asset2: data.AggregatedAsset = agg_asets[1]
     assert aggregated_pct_asset2.value_pct == 50.0
+
+
+@pytest.mark.asyncio
+async def test_empty_wallet_is_empty_update(address: data.Address) -> None:
+    db = aggregated_assets.Debank(proxy_provider=mock.Mock())
+    response: dict[str, Any] = {"data": {"coin_list": []}}
+    with mock.patch.object(
+        http_utils, "sync_request_with_proxy", mock.AsyncMock(return_value=response)
+    ):
+        address_update = await db.async_get_assets_for_address(
+            address=address, run_time=100
+        )
+    assert address_update == data.AddressUpdate(value_usd=0.0, aggregated_assets=[])
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_raised(address: data.Address) -> None:
+    db = aggregated_assets.Debank(proxy_provider=mock.Mock())
+    with mock.patch.object(
+        http_utils,
+        "sync_request_with_proxy",
+        mock.AsyncMock(side_effect=exceptions.InvalidHttpResponseError()),
+    ):
+        with pytest.raises(exceptions.InvalidHttpResponseError):
+            await db.async_get_assets_for_address(address=address, run_time=100)
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from typing import Any
+
+from src import data, export
+
+
+def _create_update_row(
+    row_id: int, symbol: str, amount: float, timestamp: int
+) -> dict[str, Any]:
+    return {
+        "id": row_id,
+        "symbol": symbol,
+        "amount": amount,
+        "price": 100.0,
+        "value_usd": amount * 100.0,
+        "value_pct": 100.0,
+        "timestamp": timestamp,
+        "time": datetime.fromtimestamp(timestamp),
+        "address": "0x123",
+        "blockchain_type": "EVM",
+    }
+
+
+def _create_snapshot_row(
+    row_id: int, timestamp: int, is_keyframe: bool
+) -> dict[str, Any]:
+    return {
+        "id": row_id,
+        "timestamp": timestamp,
+        "time": datetime.fromtimestamp(timestamp),
+        "value_usd": 0.0,
+        "is_keyframe": is_keyframe,
+        "address": "0x123",
+        "blockchain_type": "EVM",
+    }
+
+
+def test_loading_exported_delta_snapshots(tmp_path: Any) -> None:
+    export_dir = str(tmp_path)
+    keyframe_ts = 1671462000
+    delta_ts = keyframe_ts + 900
+    export.write_batch(
+        export_dir,
+        "address_updates",
+        "time",
+        [
+            _create_update_row(1, "ETH", 1.0, keyframe_ts),
+            _create_update_row(2, "BTC", 1.0, keyframe_ts),
+            _create_update_row(3, "BTC", 3.0, delta_ts),
+        ],
+    )
+    export.write_batch(
+        export_dir,
+        "address_snapshots",
+        "time",
+        [
+            _create_snapshot_row(1, keyframe_ts, True),
+            _create_snapshot_row(2, delta_ts, False),
+        ],
+    )
+    # same batch exported twice is loaded once
+    export.write_batch(
+        export_dir,
+        "address_updates",
+        "time",
+        [_create_update_row(3, "BTC", 3.0, delta_ts)],
+    )
+    day = datetime.fromtimestamp(keyframe_ts).date()
+    loaded = export.load_address_snapshots(day, day, export_dir)
+    address_snapshots = loaded[data.Address(address="0x123")]
+    assert len(address_snapshots[keyframe_ts]) == 2
+    delta_snapshot = address_snapshots[delta_ts]
+    assert [asset.symbol for asset in delta_snapshot] == ["BTC", "ETH"]
+    assert delta_snapshot[0].amount == 3.0
+    assert delta_snapshot[0].value_pct == 75.0
+
+
+def test_loading_nothing_outside_of_exported_days(tmp_path: Any) -> None:
+    assert (
+        export.load_performance_results(
+            date(2022, 1, 1), date(2022, 1, 2), str(tmp_path)
+        )
+        == []
+    )
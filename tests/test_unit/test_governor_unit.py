@@ -0,0 +1,72 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from src import exceptions, http_utils, resilience
+
+
+def test_parsing_retry_after() -> None:
+    assert resilience.parse_retry_after("120") == 120.0
+    assert resilience.parse_retry_after(
+        "Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0
+    ) == pytest.approx(10.0)
+    assert resilience.parse_retry_after("soon") is None
+    assert resilience.parse_retry_after(None) is None
+
+
+def test_token_bucket_spaces_requests_beyond_burst() -> None:
+    bucket = resilience.TokenBucket(rate=2.0, capacity=2.0)
+    now = bucket._updated_at
+    assert bucket.get_wait_time(now) == 0.0
+    assert bucket.get_wait_time(now) == 0.0
+    assert bucket.get_wait_time(now) == pytest.approx(0.5)
+    assert bucket.get_wait_time(now + 1.5) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_requests_to_host() -> None:
+    governor = resilience.HostGovernor("api.test", rate=100.0, burst=100.0)
+    governor.record_rate_limited()
+    assert governor.bucket.rate == 50.0
+    for _ in range(governor.breaker.failure_threshold):
+        governor.record_failure()
+    with pytest.raises(exceptions.CircuitOpenError):
+        async with governor.async_limit():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_stops_proxy_retries() -> None:
+    with mock.patch("src.http_utils.async_request") as request:
+        request.side_effect = exceptions.CircuitOpenError()
+        with pytest.raises(exceptions.CircuitOpenError):
+            await http_utils.async_request_with_proxy(
+                "https://api.test/wallet", http_utils.EmptyProxyProvider()
+            )
+        assert request.call_count == 1
+
+
+def test_rate_limits_do_not_open_circuit() -> None:
+    governor = resilience.HostGovernor("api.test", rate=100.0, burst=100.0)
+    for _ in range(governor.breaker.failure_threshold * 2):
+        governor.record_rate_limited()
+    assert governor.rate_limited_count == governor.breaker.failure_threshold * 2
+    assert governor.breaker.allow_request()
+
+
+def test_governors_are_not_shared_between_loops() -> None:
+    async def async_get_governor() -> resilience.HostGovernor:
+        return resilience.get_governor("https://api.test/wallet")
+
+    first_loop = asyncio.new_event_loop()
+    second_loop = asyncio.new_event_loop()
+    try:
+        first_governor = first_loop.run_until_complete(async_get_governor())
+        assert first_loop.run_until_complete(async_get_governor()) is first_governor
+        assert second_loop.run_until_complete(async_get_governor()) is not (
+            first_governor
+        )
+    finally:
+        first_loop.close()
+        second_loop.close()
@@ -0,0 +1,149 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from src import aggregated_assets, data, enums, exceptions, resilience
+from src.config import config
+from tests.test_unit import utils
+
+
+class FakeProvider(aggregated_assets.AggregatedAssetProvider):
+    def __init__(self, delay: float, symbol: str | None) -> None:
+        self.delay = delay
+        self.symbol = symbol
+        self.calls = 0
+
+    async def async_get_assets_for_address(
+        self, address: data.Address, run_time: int
+    ) -> data.AddressUpdate | None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.symbol is None:
+            raise exceptions.InvalidHttpResponseError()
+        if not self.symbol:
+            return data.AddressUpdate(value_usd=0.0, aggregated_assets=[])
+        return utils.create_aggregated_update(
+            value_usd=1.0, amount=1.0, price=1.0, value_pct=100.0, symbol=self.symbol
+        )
+
+
+@pytest.fixture
+def short_hedge_delay(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "hedge_min_delay", 0.01)
+    monkeypatch.setattr(config, "hedge_max_delay", 0.01)
+
+
+@pytest.mark.asyncio
+async def test_secondary_answers_when_primary_is_slow(short_hedge_delay: None) -> None:
+    provider = aggregated_assets.HedgedAssetProvider(
+        [("slow", FakeProvider(1.0, "ETH")), ("fast", FakeProvider(0.0, "BTC"))]
+    )
+    address_update = await provider.async_get_assets_for_address(
+        data.Address(address="0x123"), 100
+    )
+    assert address_update.aggregated_assets[0].symbol == "BTC"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_primary_answer_does_not_start_secondary(
+    short_hedge_delay: None,
+) -> None:
+    secondary = FakeProvider(0.0, "BTC")
+    provider = aggregated_assets.HedgedAssetProvider(
+        [("primary", FakeProvider(0.0, "ETH")), ("secondary", secondary)]
+    )
+    address_update = await provider.async_get_assets_for_address(
+        data.Address(address="0x123"), 100
+    )
+    assert address_update.aggregated_assets[0].symbol == "ETH"  # type: ignore
+    assert secondary.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_primary_circuit_opens(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "hedge_min_delay", 10.0)
+    monkeypatch.setattr(config, "hedge_max_delay", 10.0)
+    primary = FakeProvider(0.0, None)
+    provider = aggregated_assets.HedgedAssetProvider(
+        [("primary", primary), ("secondary", FakeProvider(0.0, "BTC"))]
+    )
+    for _ in range(config.breaker_failure_threshold + 2):
+        address_update = await provider.async_get_assets_for_address(
+            data.Address(address="0x123"), 100
+        )
+        assert address_update.aggregated_assets[0].symbol == "BTC"  # type: ignore
+    assert primary.calls == config.breaker_failure_threshold
+
+
+@pytest.mark.asyncio
+async def test_empty_wallets_keep_circuit_closed(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "hedge_min_delay", 10.0)
+    monkeypatch.setattr(config, "hedge_max_delay", 10.0)
+    primary = FakeProvider(0.0, "")
+    provider = aggregated_assets.HedgedAssetProvider(
+        [("primary", primary), ("secondary", FakeProvider(0.0, "BTC"))]
+    )
+    for _ in range(config.breaker_failure_threshold + 2):
+        address_update = await provider.async_get_assets_for_address(
+            data.Address(address="0x123"), 100
+        )
+        assert address_update.aggregated_assets == []  # type: ignore
+    assert primary.calls == config.breaker_failure_threshold + 2
+
+
+@pytest.mark.asyncio
+async def test_hedge_waits_for_latency_of_provider_in_flight(
+    monkeypatch: Any,
+) -> None:
+    monkeypatch.setattr(config, "hedge_min_delay", 0.0)
+    monkeypatch.setattr(config, "hedge_max_delay", 10.0)
+    provider = aggregated_assets.HedgedAssetProvider(
+        [
+            ("primary", FakeProvider(0.0, "ETH")),
+            ("secondary", FakeProvider(1.0, "BTC")),
+            ("tertiary", FakeProvider(0.0, "SOL")),
+        ]
+    )
+    for _ in range(config.breaker_failure_threshold):
+        provider._breakers[0].record_failure()
+    for _ in range(20):
+        provider._latencies[1].record(0.01)
+    address_update = await provider.async_get_assets_for_address(
+        data.Address(address="0x123"), 100
+    )
+    assert address_update.aggregated_assets[0].symbol == "SOL"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_latency_of_cancelled_request_is_recorded(
+    short_hedge_delay: None,
+) -> None:
+    provider = aggregated_assets.HedgedAssetProvider(
+        [("slow", FakeProvider(1.0, "ETH")), ("fast", FakeProvider(0.0, "BTC"))]
+    )
+    await provider.async_get_assets_for_address(data.Address(address="0x123"), 100)
+    await asyncio.sleep(0)
+    assert len(provider._latencies[0]) == 1
+    assert provider._latencies[0].get_percentile(95, min_samples=1) >= 0.01
+
+
+def test_half_open_circuit_closes_after_success() -> None:
+    breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(now=0.0)
+    assert not breaker.allow_request(now=5.0)
+    assert breaker.allow_request(now=11.0)
+    assert breaker.state == enums.CircuitState.HALF_OPEN
+    assert not breaker.allow_request(now=12.0)
+    breaker.record_success()
+    assert breaker.allow_request(now=12.0)
+
+
+def test_normalizing_symbols_of_providers() -> None:
+    aggregated = aggregated_assets._aggregate_usd_assets(
+        [
+            utils.create_aggregated_usd_asset(" eth", 1.0, 100.0, 100.0),
+            utils.create_aggregated_usd_asset("ETH", 1.0, 100.0, 100.0),
+        ]
+    )
+    assert [(asset.symbol, asset.amount) for asset in aggregated] == [("ETH", 2.0)]
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from src import compaction, data, holdings
+from tests.test_unit import utils
+
+ADDRESS = data.Address(address="0x123")
+HOUR_TS = 1671462000
+
+
+def create_asset(symbol: str, value_pct: float, timestamp: int) -> data.AggregatedAsset:
+    return utils.create_aggregated_asset(
+        symbol=symbol,
+        amount=1.0,
+        price=value_pct,
+        value_pct=value_pct,
+        value_usd=value_pct,
+        timestamp=timestamp,
+    )
+
+
+def test_snapshot_closes_bucket_of_its_hour() -> None:
+    bucket = holdings.get_bucket_time(HOUR_TS)
+    assert bucket == datetime.fromtimestamp(HOUR_TS)
+    assert holdings.get_bucket_time(HOUR_TS - 45 * 60) == bucket
+    assert holdings.get_bucket_time(HOUR_TS + 1) > bucket
+
+
+def test_hour_window_covers_single_bucket() -> None:
+    end_time = datetime(2022, 12, 19, 16, 1, 1)
+    start_time = datetime(2022, 12, 19, 15, 1, 1)
+    first_bucket, last_bucket = holdings.get_window_buckets(start_time, end_time)
+    assert first_bucket == last_bucket == datetime(2022, 12, 19, 16)
+
+
+def test_first_snapshot_sets_baseline() -> None:
+    entries = holdings.create_symbol_holdings(
+        ADDRESS, [create_asset("eth ", 60.0, HOUR_TS)], None, HOUR_TS
+    )
+    assert [(entry.symbol, entry.previous_value_pct) for entry in entries] == [
+        ("ETH", 60.0)
+    ]
+
+
+def test_dropped_symbol_gets_zero_entry() -> None:
+    previous = [
+        create_asset("ETH", 50.0, HOUR_TS - 900),
+        create_asset("PEPE", 40.0, HOUR_TS - 900),
+        create_asset(compaction.OTHER_SYMBOL, 10.0, HOUR_TS - 900),
+    ]
+    new = [
+        create_asset("ETH", 70.0, HOUR_TS),
+        create_asset("USDC", 30.0, HOUR_TS),
+    ]
+    entries = {
+        entry.symbol: (entry.previous_value_pct, entry.value_pct)
+        for entry in holdings.create_symbol_holdings(ADDRESS, new, previous, HOUR_TS)
+    }
+    assert entries == {"ETH": (50.0, 70.0), "USDC": (0.0, 30.0), "PEPE": (40.0, 0.0)}
@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from src import aggregated_assets, enums, exceptions, json_stream
+from src.config import config
+
+
+def _split_bytes(payload: bytes, chunk_size: int) -> list[bytes]:
+    return [
+        payload[start : start + chunk_size]
+        for start in range(0, len(payload), chunk_size)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_streaming_recorded_debank_payload(chunk_size: int) -> None:
+    with open(
+        os.path.join(
+            config.test_data_dir, "debank_integrated_aggregated_balances.json"
+        ),
+        "rb",
+    ) as payload_file:
+        payload = payload_file.read()
+    items = list(
+        json_stream.decode_array_items(
+            _split_bytes(payload, chunk_size), ("data", "coin_list")
+        )
+    )
+    assert items == json.loads(payload)["data"]["coin_list"]
+
+
+def test_streaming_numbers_and_multibyte_symbols() -> None:
+    tokens = [{"symbol": "€URO", "balance": 12345}, {"symbol": "ETH", "balance": 1.5}]
+    payload = json.dumps(tokens, ensure_ascii=False).encode()
+    items = list(json_stream.decode_array_items(_split_bytes(payload, 1)))
+    assert items == tokens
+
+
+def test_truncated_payload_is_invalid() -> None:
+    with pytest.raises(exceptions.InvalidHttpResponseError):
+        list(json_stream.decode_array_items([b'[{"symbol": "ETH"}, {"sym']))
+
+
+def test_empty_chain_bodies_are_empty_arrays() -> None:
+    for payload in [b"", b"null", b"{}", b" { } "]:
+        assert list(json_stream.decode_array_items(_split_bytes(payload, 1))) == []
+    payload = b'{"data": {"coin_list": null}}'
+    assert list(json_stream.decode_array_items([payload], ("data", "coin_list"))) == []
+    with pytest.raises(exceptions.InvalidHttpResponseError):
+        list(json_stream.decode_array_items([b'{"symbol": "ETH"}']))
+
+
+def test_projecting_drops_zero_value_assets() -> None:
+    project = aggregated_assets.NansenPortfolioAssetProvider._project_asset_json
+    worthless = project(
+        {"symbol": "SCAM", "balance": "1000", "price": "0"}, enums.Blockchain.ETH
+    )
+    dust = project(
+        {"symbol": "DUST", "balance": "1000", "price": "0.000001"},
+        enums.Blockchain.ETH,
+    )
+    assert worthless is None
+    assert dust.value_usd == pytest.approx(0.001)  # type: ignore
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from src import enums
+from src.database import partitions
+
+
+def test_weekly_partition_starts_on_monday() -> None:
+    wednesday = datetime(2022, 12, 28, 13, 1, 1)
+    start = partitions.get_partition_start(wednesday, enums.PartitionPeriod.WEEK)
+    assert start == datetime(2022, 12, 26)
+    assert partitions.get_partition_end(start, enums.PartitionPeriod.WEEK) == datetime(
+        2023, 1, 2
+    )
+
+
+def test_daily_partitions_cover_whole_range() -> None:
+    starts = partitions.get_partition_starts(
+        datetime(2022, 12, 30, 23, 0), datetime(2023, 1, 1, 1, 0)
+    )
+    assert starts == [
+        datetime(2022, 12, 30),
+        datetime(2022, 12, 31),
+        datetime(2023, 1, 1),
+    ]
+
+
+def test_creating_partition_sql() -> None:
+    sql = partitions.create_partition_sql(
+        "address_updates", datetime(2022, 12, 30), enums.PartitionPeriod.DAY
+    )
+    assert sql == (
+        "CREATE TABLE IF NOT EXISTS address_updates_p20221230 "
+        "PARTITION OF address_updates FOR VALUES FROM ('2022-12-30 00:00:00') "
+        "TO ('2022-12-31 00:00:00')"
+    )
+
+
+def test_parsing_partition_bounds() -> None:
+    bounds = partitions.parse_partition_bounds(
+        "FOR VALUES FROM ('2022-12-30 00:00:00') TO ('2022-12-31 00:00:00')"
+    )
+    assert bounds == (datetime(2022, 12, 30), datetime(2022, 12, 31))
+    assert partitions.parse_partition_bounds("DEFAULT") is None
@@ -34,6 +34,76 @@ def test_asset_gaining_in_value(
     assert performance_result.performance == pytest.approx(asset_performance)
 
 
+def test_deposit_is_not_counted_as_gain(address: data.Address) -> None:
+    old_update = utils.create_aggregated_update(
+        value_usd=1000.0, amount=1.0, price=1000.0, value_pct=100.0
+    )
+    deposit_update = utils.create_aggregated_update(
+        value_usd=2000.0, amount=2.0, price=1000.0, value_pct=100.0
+    )
+    gain_update = utils.create_aggregated_update(
+        value_usd=2000.0, amount=1.0, price=2000.0, value_pct=100.0
+    )
+    new_token_update = data.AddressUpdate(
+        value_usd=1500.0,
+        aggregated_assets=[
+            *old_update.aggregated_assets,
+            utils.create_aggregated_asset(
+                symbol="USDC", amount=500.0, price=1.0, value_pct=33.3, value_usd=500.0
+            ),
+        ],
+    )
+    pairs = [
+        performance.SnapshotPair(
+            address, datetime(2022, 1, 1), old_update.aggregated_assets, new_assets
+        )
+        for new_assets in (
+            deposit_update.aggregated_assets,
+            gain_update.aggregated_assets,
+            new_token_update.aggregated_assets,
+        )
+    ]
+    deposit, gain, new_token = performance.calculate_performances(
+        pairs, datetime(2022, 1, 2)
+    )
+    assert deposit.performance == pytest.approx(0.0)
+    assert gain.performance == pytest.approx(100.0)
+    assert new_token.performance == pytest.approx(0.0)
+
+
+def test_sold_asset_leaves_at_last_price(address: data.Address) -> None:
+    old_update = utils.create_aggregated_update(
+        value_usd=1000.0, amount=1.0, price=1000.0, value_pct=100.0
+    )
+    performance_result = performance.calculate_performance(
+        old_address_updates=old_update.aggregated_assets,
+        new_address_updates=[],
+        start_time=time_utils.get_datetime_from_ts(0),
+        end_time=time_utils.get_datetime_from_ts(1),
+        address=address,
+    )
+    assert performance_result.performance == 0.0
+
+
+def test_performances_of_pairs_are_summed_per_pair(address: data.Address) -> None:
+    start_time = time_utils.get_datetime_from_ts(0)
+    gaining = [utils.create_aggregated_asset("ETH", 1.0, 100.0, 100.0, 100.0)]
+    gained = [utils.create_aggregated_asset("ETH", 1.0, 150.0, 100.0, 150.0)]
+    other_address = data.Address(address="0x456")
+    performance_results = performance.calculate_performances(
+        [
+            performance.SnapshotPair(address, start_time, gaining, gained),
+            performance.SnapshotPair(other_address, start_time, [], []),
+            performance.SnapshotPair(other_address, start_time, gained, gaining),
+        ],
+        time_utils.get_datetime_from_ts(1),
+    )
+    assert [result.performance for result in performance_results] == pytest.approx(
+        [50.0, 0.0, -100.0 / 3]
+    )
+    assert performance.calculate_performances([], start_time) == []
+
+
 def test_extracting_dates_from_hourly_ranking_type() -> None:
     mock_time = utils.create_datetime(hour=2, minute=0, second=11)
     start_time, end_time = src.time_utils.get_times_for_comparison(
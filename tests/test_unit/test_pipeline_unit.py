@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from src import metrics, pipeline
+
+
+@pytest.mark.asyncio
+async def test_results_are_consumed_in_batches() -> None:
+    batches: list[list[int]] = []
+
+    async def produce(item: int) -> int | None:
+        return None if item % 5 == 0 else item * 10
+
+    async def consume(batch: list[int]) -> None:
+        batches.append(batch)
+
+    await pipeline.async_run_pipeline(
+        "test_batches", range(1, 11), produce, consume, batch_size=3, batch_wait=1.0
+    )
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert sorted(result for batch in batches for result in batch) == [
+        10,
+        20,
+        30,
+        40,
+        60,
+        70,
+        80,
+        90,
+    ]
+    assert metrics.PIPELINE_QUEUE_DEPTH.get(pipeline="test_batches") == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_producers_fill_whole_batches() -> None:
+    batches: list[list[int]] = []
+
+    async def produce(item: int) -> int:
+        await asyncio.sleep(0.01)
+        return item
+
+    async def consume(batch: list[int]) -> None:
+        batches.append(batch)
+
+    await pipeline.async_run_pipeline(
+        "test_slow_producers", range(8), produce, consume, batch_size=3
+    )
+    assert batches == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_holds_back_producers() -> None:
+    in_flight = 0
+    max_in_flight = 0
+
+    async def produce(item: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        return item
+
+    async def consume(batch: list[int]) -> None:
+        nonlocal in_flight
+        await asyncio.sleep(0.001)
+        in_flight -= len(batch)
+
+    await pipeline.async_run_pipeline(
+        "test_backpressure",
+        range(100),
+        produce,
+        consume,
+        producer_count=2,
+        consumer_count=1,
+        queue_size=4,
+        batch_size=2,
+        batch_wait=0.0,
+    )
+    assert in_flight == 0
+    # queue, batch being consumed and results waiting in producers
+    assert max_in_flight <= 4 + 2 + 2
+
+
+@pytest.mark.asyncio
+async def test_failed_consumer_stops_pipeline() -> None:
+    produced: list[int] = []
+
+    async def produce(item: int) -> int:
+        produced.append(item)
+        return item
+
+    async def consume(batch: list[int]) -> None:
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        await pipeline.async_run_pipeline(
+            "test_failure",
+            range(100),
+            produce,
+            consume,
+            queue_size=2,
+            batch_size=1,
+            batch_wait=0.0,
+        )
+    assert len(produced) < 100
+
+
+@pytest.mark.asyncio
+async def test_result_is_queued_before_produce_interval() -> None:
+    consumed: list[int] = []
+
+    async def produce(item: int) -> int:
+        return item
+
+    async def consume(batch: list[int]) -> None:
+        consumed.extend(batch)
+
+    task = asyncio.create_task(
+        pipeline.async_run_pipeline(
+            "test_interval",
+            range(2),
+            produce,
+            consume,
+            batch_size=1,
+            produce_interval=10.0,
+        )
+    )
+    await asyncio.sleep(0.1)
+    assert consumed == [0]
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
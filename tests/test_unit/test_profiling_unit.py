@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+from typing import Any
+
+import pytest
+
+from src import profiling
+from src.config import config
+
+
+def _block_loop() -> None:
+    time.sleep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_profiling_run_with_blocked_loop(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(config, "profile_jobs", {"update_all_addresses"})
+    async with profiling.async_profile_run("update_all_addresses"):
+        await asyncio.sleep(0.05)
+        _block_loop()
+        await asyncio.sleep(0.05)
+    profile_files = sorted(os.listdir(tmp_path))
+    assert len(profile_files) == 2
+    assert profile_files[0].startswith("update_all_addresses-")
+    assert profile_files[0].endswith("-blocked.folded")
+    with open(tmp_path / profile_files[0], "r") as blocked_file:
+        assert "_block_loop" in blocked_file.read()
+
+
+@pytest.mark.asyncio
+async def test_profiling_is_opt_in(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "profile_dir", str(tmp_path))
+    async with profiling.async_profile_run("address_ranking"):
+        await asyncio.sleep(0)
+    profiling.request_next_run()
+    async with profiling.async_profile_run("address_ranking"):
+        await asyncio.sleep(0.01)
+    async with profiling.async_profile_run("address_ranking"):
+        await asyncio.sleep(0)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+@pytest.mark.asyncio
+async def test_overlapping_runs_are_not_profiled(
+    tmp_path: Any, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(config, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(config, "profile_jobs", {"update_all_addresses", "export"})
+    async with profiling.async_profile_run("update_all_addresses"):
+        async with profiling.async_profile_run("export"):
+            await asyncio.sleep(0.01)
+    async with profiling.async_profile_run("export"):
+        await asyncio.sleep(0.01)
+    profile_files = sorted(os.listdir(tmp_path))
+    assert len(profile_files) == 2
+    assert profile_files[0].startswith("export-")
+    assert profile_files[1].startswith("update_all_addresses-")
@@ -40,7 +40,7 @@ async def test_running_saving_aggregated_asset(
                     provide_assets=get_assets,
                     address=address,
                     run_time_dt=datetime.now(),
-                    performances=[],
+                    snapshot_pairs=[],
                     current_time=100,
                 )
                 assert save.call_count == 1
@@ -0,0 +1,72 @@
+from src import data, scheduling
+from tests.test_unit import utils
+
+
+def test_dormant_small_wallet_gets_max_interval() -> None:
+    interval = scheduling.calculate_refresh_interval(
+        change_rate=0.0,
+        value_usd=100.0,
+        min_interval=900,
+        max_interval=1800,
+    )
+    assert interval == 1800
+
+
+def test_active_whale_gets_min_interval() -> None:
+    interval = scheduling.calculate_refresh_interval(
+        change_rate=50.0,
+        value_usd=10_000_000.0,
+        min_interval=900,
+        max_interval=1800,
+        active_change_pct=5.0,
+        whale_value_usd=1_000_000.0,
+    )
+    assert interval == 900
+
+
+def test_change_rate_from_successive_snapshots() -> None:
+    old_assets = [
+        utils.create_aggregated_asset("ETH", 1.0, 100.0, 50.0, 100.0, timestamp=0),
+        utils.create_aggregated_asset("BTC", 1.0, 100.0, 50.0, 100.0, timestamp=0),
+    ]
+    new_assets = [
+        utils.create_aggregated_asset("ETH", 2.0, 100.0, 100.0, 200.0, timestamp=3600)
+    ]
+    change_rate = scheduling.calculate_change_rate(old_assets, new_assets, 3600)
+    assert change_rate == 50.0
+
+
+def test_queue_pops_only_due_addresses() -> None:
+    queue = scheduling.RefreshQueue(min_interval=900, max_interval=1800)
+    dormant = data.Address(address="0x1")
+    new = data.Address(address="0x2")
+    queue.sync_addresses([dormant, new], current_time=0)
+    assert queue.pop_due_addresses(current_time=0) == [dormant, new]
+    dormant_assets = [
+        utils.create_aggregated_asset("ETH", 1.0, 1.0, 100.0, 1.0, timestamp=0)
+    ]
+    queue.reschedule(
+        dormant,
+        current_time=900,
+        last_assets=dormant_assets,
+        address_update=data.AddressUpdate(
+            value_usd=1.0, aggregated_assets=dormant_assets
+        ),
+    )
+    queue.reschedule(new, current_time=900)
+    assert queue.pop_due_addresses(current_time=1800) == [new]
+    assert queue.pop_due_addresses(current_time=2700) == [dormant]
+
+
+def test_late_pass_still_refreshes_addresses_on_min_interval() -> None:
+    queue = scheduling.RefreshQueue(min_interval=900, max_interval=1800, tolerance=60)
+    address = data.Address(address="0x1")
+    queue.sync_addresses([address], current_time=0)
+    pass_times = [0, 903, 1800, 2712, 3601]
+    refreshed_times = []
+    for pass_time in pass_times:
+        if queue.pop_due_addresses(current_time=pass_time):
+            refreshed_times.append(pass_time)
+            queue.reschedule(address, current_time=pass_time)
+    assert refreshed_times == pass_times
+    assert queue.pop_due_addresses(current_time=3601 + 900 - 61) == []
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from src import data, performance, runner, snapshot_store
+from tests.test_unit import utils
+from tests.test_unit.fixtures import address  # noqa
+
+
+async def get_assets(address: data.Address, run_time: int) -> data.AddressUpdate:
+    return utils.create_aggregated_update(
+        amount=100.0, price=1000.0, value_pct=100.0, value_usd=100000.0
+    )
+
+
+def test_backing_file_keeps_last_snapshots(tmp_path: Any) -> None:
+    path = str(tmp_path / "snapshots.jsonl")
+    store = snapshot_store.SnapshotStore(path=path, compact_factor=2)
+    first_address = data.Address(address="0x123")
+    second_address = data.Address(address="0x456")
+    for amount in (1.0, 2.0, 3.0):
+        store.put(
+            first_address,
+            utils.create_aggregated_update(
+                value_usd=amount * 10.0, amount=amount, price=10.0, value_pct=100.0
+            ),
+        )
+    store.put(
+        second_address,
+        utils.create_aggregated_update(
+            value_usd=5.0, amount=5.0, price=1.0, value_pct=100.0
+        ),
+    )
+    # compaction dropped superseded lines
+    with open(path, "r") as store_file:
+        assert len(store_file.readlines()) <= 3
+    with open(path, "a") as store_file:
+        store_file.write('{"address": {"addr')
+    loaded_store = snapshot_store.SnapshotStore(path=path)
+    assert loaded_store.load_file()
+    assert len(loaded_store) == 2
+    assert loaded_store.get(first_address)[0].amount == 3.0  # type: ignore
+    assert loaded_store.get(data.Address(address="0x789")) is None
+
+
+@pytest.mark.asyncio
+async def test_previous_snapshot_is_read_from_store(address: data.Address) -> None:
+    store = snapshot_store.SnapshotStore(path=None)
+    store.put(
+        address,
+        utils.create_aggregated_update(
+            value_usd=50000.0, amount=50.0, price=1000.0, value_pct=100.0
+        ),
+    )
+    snapshot_pairs: list[performance.SnapshotPair] = []
+    with mock.patch(
+        "src.database.services.async_find_address_last_aggregated_updates"
+    ) as find_last, mock.patch(
+        "src.database.services.async_save_aggregated_update"
+    ), mock.patch(
+        "src.database.services.async_save_symbol_holdings"
+    ):
+        await runner.async_run_single_address(
+            session=mock.AsyncMock(),
+            provide_assets=get_assets,
+            address=address,
+            run_time_dt=datetime.now(),
+            snapshot_pairs=snapshot_pairs,
+            current_time=1000,
+            store=store,
+        )
+        assert find_last.call_count == 0
+    assert len(snapshot_pairs) == 1
+    assert store.get(address)[0].amount == 100.0  # type: ignore
@@ -0,0 +1,59 @@
+from src import snapshots
+from tests.test_unit import utils
+
+
+def test_only_assets_moved_beyond_threshold_are_extracted() -> None:
+    previous = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 50.0, 1000.0, timestamp=0),
+        utils.create_aggregated_asset("BTC", 1.0, 1000.0, 50.0, 1000.0, timestamp=0),
+    ]
+    new = [
+        utils.create_aggregated_asset("ETH", 1.0, 1001.0, 33.3, 1001.0, timestamp=1),
+        utils.create_aggregated_asset("BTC", 2.0, 1000.0, 66.7, 2000.0, timestamp=1),
+    ]
+    changed = snapshots.extract_changed_assets(previous, new, 1, threshold_pct=0.5)
+    assert [asset.symbol for asset in changed] == ["BTC"]
+
+
+def test_removed_asset_is_written_as_tombstone() -> None:
+    previous = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 100.0, 1000.0, timestamp=0)
+    ]
+    changed = snapshots.extract_changed_assets(previous, [], 1)
+    assert len(changed) == 1
+    assert snapshots.is_tombstone(changed[0])
+
+
+def test_reconstructing_snapshot_from_keyframe_and_deltas() -> None:
+    stored = [
+        utils.create_aggregated_asset("ETH", 1.0, 100.0, 50.0, 100.0, timestamp=0),
+        utils.create_aggregated_asset("BTC", 1.0, 100.0, 50.0, 100.0, timestamp=0),
+        utils.create_aggregated_asset("BTC", 3.0, 100.0, 75.0, 300.0, timestamp=1),
+        utils.create_aggregated_asset("ETH", 0.0, 100.0, 0.0, 0.0, timestamp=2),
+        utils.create_aggregated_asset("AAVE", 1.0, 100.0, 25.0, 100.0, timestamp=2),
+    ]
+    reconstructed = snapshots.reconstruct_assets(stored, timestamp=3)
+    assert [asset.symbol for asset in reconstructed] == ["BTC", "AAVE"]
+    assert reconstructed[0].value_pct == 75.0
+    assert reconstructed[1].value_pct == 25.0
+    assert all(asset.timestamp == 3 for asset in reconstructed)
+
+
+def test_first_snapshot_in_interval_is_keyframe() -> None:
+    assert snapshots.is_keyframe(3600, None, keyframe_interval=3600)
+    assert snapshots.is_keyframe(3600, 3599, keyframe_interval=3600)
+    assert not snapshots.is_keyframe(4500, 3600, keyframe_interval=3600)
+
+
+def test_symbol_stored_before_normalization_is_not_replaced() -> None:
+    previous = [
+        utils.create_aggregated_asset("eth ", 1.0, 1000.0, 100.0, 1000.0, timestamp=0)
+    ]
+    new = [
+        utils.create_aggregated_asset("ETH", 1.0, 1000.0, 100.0, 1000.0, timestamp=1)
+    ]
+    assert snapshots.extract_changed_assets(previous, new, 1) == []
+    reconstructed = snapshots.reconstruct_assets(
+        [*previous, snapshots._create_tombstone(new[0], 2)], timestamp=2
+    )
+    assert reconstructed == []
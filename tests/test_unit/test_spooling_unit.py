@@ -0,0 +1,81 @@
+import os
+from typing import Any
+
+import pytest
+
+from src import data, spooling
+from tests.test_unit import utils
+
+
+def create_record(address: str, amount: float) -> data.SpooledRecord:
+    return data.SpooledRecord(
+        address=data.Address(address=address),
+        timestamp=100,
+        address_update=utils.create_aggregated_update(
+            value_usd=amount * 10.0, amount=amount, price=10.0, value_pct=100.0
+        ),
+    )
+
+
+def test_records_are_read_back_across_segments(tmp_path: Any) -> None:
+    spool = spooling.Spool(directory=str(tmp_path), segment_size=512, sync=False)
+    records = [create_record(f"0x{index}", float(index)) for index in range(10)]
+    for record in records:
+        spool.append(record)
+    # record larger than segment size gets segment of its own
+    large_record = create_record("0x" + "f" * 1000, 1.0)
+    spool.append(large_record)
+    spool.seal()
+    paths = spool.get_sealed_paths()
+    assert len(paths) > 2
+    read_records = [record for path in paths for record in spool.read_segment(path)]
+    assert read_records == [*records, large_record]
+
+
+@pytest.mark.asyncio
+async def test_records_are_synced_per_flush(tmp_path: Any) -> None:
+    spool = spooling.Spool(directory=str(tmp_path), segment_size=4096)
+    spool.append(create_record("0x123", 1.0))
+    spool.append(create_record("0x456", 2.0))
+    segment = spool._active
+    assert segment is not None
+    assert segment.synced_offset == 0
+    await spool.async_flush()
+    assert segment.synced_offset == segment.offset
+    spool.append(create_record("0x789", 3.0))
+    await spool.async_flush()
+    assert segment.synced_offset == segment.offset
+    spool.append(create_record("0xabc", 4.0))
+    spool.seal()
+    assert segment.synced_offset == segment.offset
+
+
+def test_torn_tail_is_skipped_and_spool_resumes(tmp_path: Any) -> None:
+    spool = spooling.Spool(directory=str(tmp_path), segment_size=4096)
+    first_record = create_record("0x123", 1.0)
+    spool.append(first_record)
+    spool.append(create_record("0x456", 2.0))
+    spool.seal()
+    (path,) = spool.get_sealed_paths()
+    # crash in middle of second record
+    with open(path, "r+b") as segment_file:
+        segment_file.truncate(os.path.getsize(path) - 5)
+    assert spool.read_segment(path) == [first_record]
+
+    reopened_spool = spooling.Spool(directory=str(tmp_path), segment_size=4096)
+    reopened_spool.append(create_record("0x789", 3.0))
+    # existing segment counts as sealed, new records go to next one
+    assert reopened_spool.get_sealed_paths() == [path]
+    reopened_spool.remove_segment(path)
+    reopened_spool.seal()
+    (new_path,) = reopened_spool.get_sealed_paths()
+    assert new_path > path
+    assert reopened_spool.read_segment(new_path)[0].address.address == "0x789"
+
+
+def test_corrupted_payload_ends_segment() -> None:
+    payload = b'{"a": 1}'
+    buffer = bytearray(64)
+    buffer[8:16] = payload
+    spooling._HEADER.pack_into(buffer, 0, len(payload), 0)
+    assert spooling.read_payloads(bytes(buffer)) == ([], 0)
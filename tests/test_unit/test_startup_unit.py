@@ -0,0 +1,29 @@
+import subprocess
+import sys
+from unittest import mock
+
+from src import http_utils
+
+
+def test_ranking_modules_do_not_import_http_clients() -> None:
+    code = (
+        "import sys, src.performance, src.coin_changes; "
+        "print(sorted({'aiohttp', 'requests', 'pyarrow'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_user_agents_are_read_on_first_use() -> None:
+    with mock.patch.object(
+        http_utils.FileUserAgentProvider,
+        "_load_user_agents_from_file",
+        return_value=["agent"],
+    ) as load:
+        provider = http_utils.FileUserAgentProvider()
+        assert load.call_count == 0
+        assert provider.get_user_agent() == "agent"
+        assert provider.get_user_agent() == "agent"
+        assert load.call_count == 1
@@ -0,0 +1,76 @@
+import pytest
+
+from src import synthetic
+
+TIMESTAMPS = [1672300800 + 3600 * step for step in range(4)]
+
+
+def test_population_is_deterministic_whatever_order() -> None:
+    population = synthetic.SyntheticPopulation(7, 50)
+    forward = [
+        list(population.iter_address_updates(index, TIMESTAMPS)) for index in range(50)
+    ]
+    other_population = synthetic.SyntheticPopulation(7, 50)
+    backward = [
+        list(other_population.iter_address_updates(index, TIMESTAMPS))
+        for index in reversed(range(50))
+    ]
+    assert forward == backward[::-1]
+    assert population.get_addresses() == other_population.get_addresses()
+    assert synthetic.SyntheticPopulation(8, 50).get_addresses() != (
+        population.get_addresses()
+    )
+
+
+def test_population_is_heavy_tailed_with_spam() -> None:
+    population = synthetic.SyntheticPopulation(1, 2000, max_tokens=100)
+    token_counts = sorted(
+        len(population.create_holdings(index)) for index in range(2000)
+    )
+    assert token_counts[1000] <= 3
+    assert token_counts[-1] >= 30
+    assert token_counts[-1] <= 100 + 5
+    spam_holders = sum(
+        any(population.market.is_spam(token) for token in population.create_holdings(i))
+        for i in range(2000)
+    )
+    assert 0 < spam_holders < 2000
+
+
+def test_address_update_shares_sum_to_hundred() -> None:
+    population = synthetic.SyntheticPopulation(3, 10)
+    for index in range(10):
+        update = population.create_address_update(
+            population.create_holdings(index), 2, TIMESTAMPS[2]
+        )
+        assert sum(asset.value_pct for asset in update.aggregated_assets) == (
+            pytest.approx(100.0)
+        )
+        assert update.value_usd == pytest.approx(
+            sum(asset.value_usd for asset in update.aggregated_assets)
+        )
+
+
+def test_flows_change_amounts() -> None:
+    population = synthetic.SyntheticPopulation(5, 100, flow_probability=1.0)
+    holdings = population.create_holdings(0)
+    moved = population.apply_flow(0, 1, holdings)
+    assert moved != holdings
+    unmoved = synthetic.SyntheticPopulation(5, 100, flow_probability=0.0).apply_flow(
+        0, 1, holdings
+    )
+    assert unmoved == holdings
+
+
+@pytest.mark.asyncio
+async def test_provider_moves_wallet_by_step_on_every_fetch() -> None:
+    population = synthetic.SyntheticPopulation(2, 5)
+    provider = synthetic.SyntheticAssetProvider(population, first_step=1)
+    address = population.get_address(4)
+    holdings = list(zip(range(3), population.iter_holdings(4)))
+    first = await provider.async_get_assets_for_address(address, TIMESTAMPS[0])
+    second = await provider.async_get_assets_for_address(address, TIMESTAMPS[1])
+    assert first == population.create_address_update(holdings[1][1], 1, TIMESTAMPS[0])
+    assert second == population.create_address_update(holdings[2][1], 2, TIMESTAMPS[1])
+    unknown = population.get_address(5)
+    assert await provider.async_get_assets_for_address(unknown, TIMESTAMPS[0]) is None
@@ -0,0 +1,72 @@
+from src import aggregated_assets, enums, token_registry
+
+USDC_E_ARB = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
+USDC_ARB = "0xaf88d065e77c8cc2239327c5edb3a432268e5831"
+WETH_ETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+USDT_BSC = "0x55d398326f99059ff775485246999027b3197955"
+ETH_BSC = "0x2170ed0880ac9a755fd29b2688956bd959f933f8"
+
+
+def test_bridged_and_wrapped_variants_resolve_to_one_asset() -> None:
+    registry = token_registry.load_file()
+    assert registry.resolve(enums.Blockchain.ARB, USDC_E_ARB, "USDC.e") == (
+        "usd-coin",
+        "USDC",
+    )
+    assert registry.resolve(enums.Blockchain.ARB, USDC_ARB, "usdc") == (
+        "usd-coin",
+        "USDC",
+    )
+    assert registry.resolve(enums.Blockchain.ETH, WETH_ETH, "WETH") == (
+        "ethereum",
+        "ETH",
+    )
+    assert registry.resolve(enums.Blockchain.ETH, "eth", "ETH") == ("ethereum", "ETH")
+
+
+def test_unknown_contract_reusing_symbol_is_kept_apart() -> None:
+    registry = token_registry.load_file()
+    asset_id, symbol = registry.resolve(enums.Blockchain.ETH, "0xdeadbeef01", "USDC")
+    assert asset_id == "ETH:0xdeadbeef01"
+    assert symbol == "USDC (0xdeadbe)"
+    # without contract symbol is trusted
+    assert registry.resolve(None, None, " usdc") == ("usd-coin", "USDC")
+    assert registry.resolve(None, None, "pepe") == ("PEPE", "PEPE")
+
+
+def test_unregistered_contract_on_chain_without_symbol_is_aggregated() -> None:
+    registry = token_registry.load_file()
+    assert registry.resolve(enums.Blockchain.BSC, USDT_BSC, "USDT") == (
+        "tether",
+        "USDT",
+    )
+    assert registry.resolve(enums.Blockchain.BSC, ETH_BSC, "ETH") == (
+        "ethereum",
+        "ETH",
+    )
+    # USDC is registered on BSC, so unknown contract is still kept apart
+    assert registry.resolve(enums.Blockchain.BSC, "0xdeadbeef01", "USDC") == (
+        "BSC:0xdeadbeef01",
+        "USDC (0xdeadbe)",
+    )
+
+
+def test_debank_coins_are_aggregated_by_asset_id() -> None:
+    coins = [
+        {"amount": 1.0, "price": 1000.0, "symbol": "ETH", "chain": "eth", "id": "eth"},
+        {
+            "amount": 1.0,
+            "price": 1000.0,
+            "symbol": "WETH",
+            "chain": "arb",
+            "id": "0x82af49447d8a07e3bd95bd0d56f35241523fbab1",
+        },
+        {"amount": 500.0, "price": 1.0, "symbol": "USDC", "chain": "eth", "id": "0x1"},
+    ]
+    assets = aggregated_assets._aggregate_usd_assets(
+        [aggregated_assets.Debank._extract_aggregated_usd_asset(coin) for coin in coins]
+    )
+    assert [(asset.symbol, asset.amount) for asset in assets] == [
+        ("ETH", 2.0),
+        ("USDC (0x1)", 500.0),
+    ]
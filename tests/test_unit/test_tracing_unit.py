@@ -0,0 +1,84 @@
+import json
+from typing import Any
+
+import pytest
+
+from src import tracing
+from src.config import config
+
+
+@tracing.traced_async()
+async def async_find_rows() -> list[int]:
+    return [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_exporting_sampled_trace(tmp_path: Any, monkeypatch: Any) -> None:
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(config, "trace_sample_rate", 1.0)
+    tracing.set_exporter(tracing.FileSpanExporter(path))
+    try:
+        with tracing.span("run_single_address", address="0x123"):
+            with tracing.span("proxy_attempt", proxy="10.0.0.1:8080"):
+                await async_find_rows()
+    finally:
+        tracing.set_exporter(None)
+    with open(path, "r") as trace_file:
+        spans = {span["name"]: span for span in map(json.loads, trace_file.readlines())}
+    assert len({span["trace_id"] for span in spans.values()}) == 1
+    root_span = spans["run_single_address"]
+    assert root_span["parent_id"] is None
+    assert spans["proxy_attempt"]["parent_id"] == root_span["span_id"]
+    assert spans["async_find_rows"]["attributes"] == {"rows": 3}
+
+
+@pytest.mark.asyncio
+async def test_span_continues_trace_of_finished_span(
+    tmp_path: Any, monkeypatch: Any
+) -> None:
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(config, "trace_sample_rate", 1.0)
+    tracing.set_exporter(tracing.FileSpanExporter(path))
+    try:
+        with tracing.span("fetch_address") as fetch_span:
+            pass
+        with tracing.use_span(fetch_span), tracing.span("store_address"):
+            await async_find_rows()
+    finally:
+        tracing.set_exporter(None)
+    with open(path, "r") as trace_file:
+        spans = [json.loads(line) for line in trace_file.readlines()]
+    assert [span["name"] for span in spans] == [
+        "fetch_address",
+        "async_find_rows",
+        "store_address",
+    ]
+    assert len({span["trace_id"] for span in spans}) == 1
+    assert spans[2]["parent_id"] == spans[0]["span_id"]
+
+
+@pytest.mark.asyncio
+async def test_not_sampled_trace_is_not_recorded(monkeypatch: Any) -> None:
+    monkeypatch.setattr(config, "trace_sample_rate", 0.0)
+    exported: list[list[tracing.Span]] = []
+
+    class ListSpanExporter(tracing.SpanExporter):
+        def export(self, spans: list[tracing.Span]) -> None:
+            exported.append(spans)
+
+    tracing.set_exporter(ListSpanExporter())
+    try:
+        with tracing.span("run_single_address") as root_span:
+            assert await async_find_rows() == [1, 2, 3]
+            assert root_span is tracing.NOOP_SPAN
+        assert await async_find_rows() == [1, 2, 3]
+    finally:
+        tracing.set_exporter(None)
+    assert exported == []
+
+
+def test_creating_otlp_payload() -> None:
+    span = tracing.Span("proxy_attempt", "ab" * 16, None, {"attempt": 1})
+    payload = tracing.create_otlp_payload([span])
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["attributes"] == [{"key": "attempt", "value": {"intValue": "1"}}]
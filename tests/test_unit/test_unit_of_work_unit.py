@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+
+from src.database import unit_of_work
+
+
+def create_session() -> mock.AsyncMock:
+    session = mock.AsyncMock()
+    session.info = {}
+    session.in_transaction = mock.Mock(return_value=True)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_effects_run_only_after_commit() -> None:
+    session = create_session()
+    applied: list[str] = []
+    async with unit_of_work.UnitOfWork(session, batch_size=10) as work:
+        for name in ("0x123", "0x124"):
+            async with work.async_scope(name):
+                unit_of_work.defer(session, lambda name=name: applied.append(name))
+                if name == "0x124":
+                    raise ValueError()
+        assert applied == []
+    assert applied == ["0x123"]
+    assert work.failed_count == 1
+
+
+@pytest.mark.asyncio
+async def test_effects_of_scope_failing_on_flush_are_dropped() -> None:
+    session = create_session()
+    session.flush.side_effect = ValueError()
+    applied: list[str] = []
+    async with unit_of_work.UnitOfWork(session) as work:
+        async with work.async_scope("0x123"):
+            unit_of_work.defer(session, lambda: applied.append("0x123"))
+    assert applied == []
+
+
+@pytest.mark.asyncio
+async def test_effects_are_dropped_when_commit_fails() -> None:
+    session = create_session()
+    session.commit.side_effect = ValueError()
+    applied: list[str] = []
+    with pytest.raises(ValueError):
+        async with unit_of_work.UnitOfWork(session) as work:
+            async with work.async_scope("0x123"):
+                unit_of_work.defer(session, lambda: applied.append("0x123"))
+    assert applied == []
+
+
+def test_effects_outside_unit_of_work_run_immediately() -> None:
+    applied: list[str] = []
+    unit_of_work.defer(create_session(), lambda: applied.append("0x123"))
+    assert applied == ["0x123"]
@@ -1,8 +1,11 @@
+import contextlib
+import typing
 from datetime import datetime
 from unittest import mock
 
 import dotenv
 import pytest
+import sqlalchemy
 from defi_common.database import db, models
 from defi_common.dbconfig import db_config
 from sqlalchemy import orm
@@ -78,6 +81,26 @@ async def test_database_session() -> orm.sessionmaker:
     return async_session
 
 
+@contextlib.contextmanager
+def count_statements(
+        session_maker: orm.sessionmaker
+) -> typing.Iterator[list[str]]:
+    """
+    Collects SQL statements sent by sessions of session maker
+    """
+    engine = session_maker.kw["bind"].sync_engine
+    statements: list[str] = []
+
+    def on_execute(*args: typing.Any) -> None:
+        statements.append(args[2])
+
+    sqlalchemy.event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(engine, "before_cursor_execute", on_execute)
+
+
 def mock_finding_address(model_address: models.Address) -> mock.AsyncMock:
     session = mock.AsyncMock()
     find_mock = mock.MagicMock()